@@ -18,7 +18,6 @@ from xarray import DataArray
 from xarray import zeros_like
 
 from indica.utilities import FIG_PATH
-from indica.utilities import intersection
 from indica.utilities import save_figure
 from indica.utilities import set_plot_rcparams
 from ..equilibrium import Equilibrium
@@ -619,6 +618,37 @@ def plot_geometry(
         plt.plot(x, y, color=col, marker=marker)
 
 
+def _cylinder_crossings(
+    x: np.ndarray,
+    y: np.ndarray,
+    dx: np.ndarray,
+    dy: np.ndarray,
+    radius: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Path parameters at which the rays ``(x, y) + s * (dx, dy)`` enter and
+    leave the vertical cylinder of the given radius.
+
+    Rays missing the cylinder get the empty interval ``(inf, -inf)``, vertical
+    rays inside it the interval ``(-inf, inf)``.
+    """
+    a = dx**2 + dy**2
+    b = x * dx + y * dy
+    c = x**2 + y**2 - radius**2
+    discriminant = b**2 - a * c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = np.sqrt(discriminant)
+        s_in = (-b - root) / a
+        s_out = (-b + root) / a
+    vertical = a == 0
+    inside = c <= 0
+    s_in = np.where(vertical, np.where(inside, -np.inf, np.inf), s_in)
+    s_out = np.where(vertical, np.where(inside, np.inf, -np.inf), s_out)
+    miss = ~vertical & (discriminant < 0)
+    s_in = np.where(miss, np.inf, s_in)
+    s_out = np.where(miss, -np.inf, s_out)
+    return s_in, s_out
+
+
 def find_wall_intersections(
     origin: Tuple,
     direction: Tuple,
@@ -630,11 +660,19 @@ def find_wall_intersections(
     """Function for calculating "start" and "end" positions of the line-of-sight
     given the machine dimensions.
 
-    The end coordinate is calculated by finding the intersections with the
-    machine dimensions. If the intersection hits the inner column, the first
-    intersection point becomes the "end" position of the line-of-sight. If the
-    intersection misses the inner column, the last intersection point with the
-    outer column becomes the "end" position.
+    The machine is modelled as an annular box bounded by the inner and outer
+    cylinders and the top and bottom planes, and its intersections with the
+    line-of-sight are calculated analytically. The "start" position is where
+    the line-of-sight enters the box. If the line-of-sight hits the inner
+    column, the first intersection with it becomes the "end" position,
+    otherwise the point where it leaves the box.
+
+    Lines-of-sight which miss the box start at the origin and end a fixed
+    distance (five times the largest machine dimension) along the direction.
+
+    The components of origin and direction can be scalars or arrays (which
+    are broadcast against each other), so that the intersections of many
+    lines-of-sight can be calculated in a single call.
 
     Parameters
     ----------
@@ -653,79 +691,47 @@ def find_wall_intersections(
     end_coordinates
         A Tuple (1x3) giving the X, Y and Z end positions of the line-of-sight
     """
+    (R_min, R_max), (z_min, z_max) = np.asarray(machine_dimensions, dtype=float)
+    x, y, z, dx, dy, dz = np.broadcast_arrays(
+        *[np.asarray(value, dtype=float) for value in (*origin, *direction)]
+    )
+    length = np.ceil(np.max([R_max * 2, z_max - z_min])) * 5
+
+    # Path interval between the top and bottom planes
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s_bottom = (z_min - z) / dz
+        s_top = (z_max - z) / dz
+    horizontal = dz == 0
+    between = (z >= z_min) & (z <= z_max)
+    s_z_in = np.where(
+        horizontal,
+        np.where(between, -np.inf, np.inf),
+        np.minimum(s_bottom, s_top),
+    )
+    s_z_out = np.where(
+        horizontal,
+        np.where(between, np.inf, -np.inf),
+        np.maximum(s_bottom, s_top),
+    )
 
-    def line(_start, _end):
-        return np.linspace(_start, _end, npts)
+    # Path interval inside the outer wall and between the planes
+    s_outer_in, s_outer_out = _cylinder_crossings(x, y, dx, dy, R_max)
+    s_start = np.maximum.reduce([np.zeros_like(x), s_z_in, s_outer_in])
+    s_end = np.minimum.reduce([np.full_like(x, length), s_z_out, s_outer_out])
 
-    def extremes(_start, _end):
-        return np.array(
-            [_start, _end],
-            dtype=float,
-        )
+    # Move start out of the inner column, if inside it
+    s_inner_in, s_inner_out = _cylinder_crossings(x, y, dx, dy, R_min)
+    in_column = (s_start > s_inner_in) & (s_start < s_inner_out)
+    s_start = np.where(in_column, s_inner_out, s_start)
 
-    # Define XYZ lines for inner and outer walls
-    npts = 1000
-    angles = np.linspace(0.0, 2 * np.pi, npts)
-    x_wall_inner = machine_dimensions[0][0] * np.cos(angles)
-    y_wall_inner = machine_dimensions[0][0] * np.sin(angles)
-
-    # Define XYZ lines for LOS from origin and direction vectors
-    length = (
-        np.ceil(
-            np.max(
-                [
-                    machine_dimensions[0][1] * 2,
-                    machine_dimensions[1][1] - machine_dimensions[1][0],
-                ]
-            )
-        )
-        * 5
-    )
-    x_start = origin[0]
-    x_end = origin[0] + length * direction[0]
-    y_start = origin[1]
-    y_end = origin[1] + length * direction[1]
-    z_start = origin[2]
-    z_end = origin[2] + length * direction[2]
-
-    # Find intersections in R, z plane
-    x_line = line(x_start, x_end)
-    y_line = line(y_start, y_end)
-    z_line = line(z_start, z_end)
-    R_line = np.sqrt(x_line**2 + y_line**2)
-    indices = np.where(
-        (R_line >= machine_dimensions[0][0])
-        * (R_line <= machine_dimensions[0][1])
-        * (z_line >= machine_dimensions[1][0])
-        * (z_line <= machine_dimensions[1][1])
-    )[0]
-    if len(indices) > 0:
-        x_start = x_line[indices][0]
-        x_end = x_line[indices][-1]
-        y_start = y_line[indices][0]
-        y_end = y_line[indices][-1]
-        z_start = z_line[indices][0]
-        z_end = z_line[indices][-1]
-
-    # Find intersections with inner wall
-    xx, yx, ix, jx = intersection(
-        extremes(x_start, x_end), extremes(y_start, y_end), x_wall_inner, y_wall_inner
-    )
-    if len(xx) > 0:
-        x_line = line(x_start, x_end)
-        y_line = line(y_start, y_end)
-        z_line = line(z_start, z_end)
-        index = []
-        for i in range(len(xx)):
-            index.append(
-                np.argmin(np.sqrt((xx[i] - x_line) ** 2 + (yx[i] - y_line) ** 2))
-            )
-        indices = np.arange(np.min(index))
-        x_start = x_line[indices][0]
-        x_end = x_line[indices][-1]
-        y_start = y_line[indices][0]
-        y_end = y_line[indices][-1]
-        z_start = z_line[indices][0]
-        z_end = z_line[indices][-1]
-
-    return (x_start, y_start, z_start), (x_end, y_end, z_end)
+    hit = s_start <= s_end
+    s_start = np.where(hit, s_start, 0.0)
+    s_end = np.where(hit, s_end, length)
+
+    # Stop at the inner column
+    hits_column = (s_inner_in > s_start) & (s_inner_in < s_end)
+    s_end = np.where(hits_column, s_inner_in, s_end)
+
+    start = (x + s_start * dx, y + s_start * dy, z + s_start * dz)
+    end = (x + s_end * dx, y + s_end * dy, z + s_end * dz)
+    return tuple(value[()] for value in start), tuple(value[()] for value in end)
@@ -380,79 +380,23 @@ class LineOfSightTransform(CoordinateTransform):
         if hasattr(self, "rhop"):
             delattr(self, "rhop")
 
-        # Calculate start and end coordinates, R, z and phi for all LOS
-        x_start: list = []
-        y_start: list = []
-        z_start: list = []
-        x_end: list = []
-        y_end: list = []
-        z_end: list = []
-        for channel in self.x1:
-            x_start.append([])
-            y_start.append([])
-            z_start.append([])
-            x_end.append([])
-            y_end.append([])
-            z_end.append([])
-            for beamlet in range(self.beamlets):
-                # origin = (
-                #     self.origin_x[channel] + self.delta_origin_x[channel, beamlet],
-                #     self.origin_y[channel] + self.delta_origin_y[channel, beamlet],
-                #     self.origin_z[channel] + self.delta_origin_z[channel, beamlet],
-                # )
-                # direction = (
-                #     self.direction_x[channel]
-                #     + self.delta_direction_x[channel, beamlet],
-                #     self.direction_y[channel]
-                #     + self.delta_direction_y[channel, beamlet],
-                #     self.direction_z[channel]
-                #     + self.delta_direction_z[channel, beamlet],
-                # )
-                origin = (
-                    self.beamlet_origin_x[channel, beamlet],
-                    self.beamlet_origin_y[channel, beamlet],
-                    self.beamlet_origin_z[channel, beamlet],
-                )
-                direction = (
-                    self.beamlet_direction_x[channel, beamlet],
-                    self.beamlet_direction_y[channel, beamlet],
-                    self.beamlet_direction_z[channel, beamlet],
-                )
-                _start, _end = find_wall_intersections(
-                    origin, direction, machine_dimensions=self._machine_dims
-                )
-                x_start[channel].append(_start[0])
-                y_start[channel].append(_start[1])
-                z_start[channel].append(_start[2])
-                x_end[channel].append(_end[0])
-                y_end[channel].append(_end[1])
-                z_end[channel].append(_end[2])
-
-        self.x_start = DataArray(
-            x_start,
-            coords=[(self.x1_name, self.x1), ("beamlet", np.arange(0, self.beamlets))],
-        )
-        self.y_start = DataArray(
-            y_start,
-            coords=[(self.x1_name, self.x1), ("beamlet", np.arange(0, self.beamlets))],
-        )
-        self.z_start = DataArray(
-            z_start,
-            coords=[(self.x1_name, self.x1), ("beamlet", np.arange(0, self.beamlets))],
-        )
-
-        x_end = DataArray(
-            x_end,
-            coords=[(self.x1_name, self.x1), ("beamlet", np.arange(0, self.beamlets))],
-        )
-        y_end = DataArray(
-            y_end,
-            coords=[(self.x1_name, self.x1), ("beamlet", np.arange(0, self.beamlets))],
-        )
-        z_end = DataArray(
-            z_end,
-            coords=[(self.x1_name, self.x1), ("beamlet", np.arange(0, self.beamlets))],
+        # Calculate start and end coordinates for all LOS and beamlets
+        _start, _end = find_wall_intersections(
+            (self.beamlet_origin_x, self.beamlet_origin_y, self.beamlet_origin_z),
+            (
+                self.beamlet_direction_x,
+                self.beamlet_direction_y,
+                self.beamlet_direction_z,
+            ),
+            machine_dimensions=self._machine_dims,
         )
+        coords = [(self.x1_name, self.x1), ("beamlet", np.arange(0, self.beamlets))]
+        self.x_start = DataArray(_start[0], coords=coords)
+        self.y_start = DataArray(_start[1], coords=coords)
+        self.z_start = DataArray(_start[2], coords=coords)
+        x_end = DataArray(_end[0], coords=coords)
+        y_end = DataArray(_end[1], coords=coords)
+        z_end = DataArray(_end[2], coords=coords)
 
         # Fix identical length of all lines of sight
         los_lengths = np.sqrt(
@@ -469,51 +413,13 @@ class LineOfSightTransform(CoordinateTransform):
         self.y_end = self.y_start + factor * (y_end - self.y_start)
 
         # Calculate coordinates, set to Nan values beyond nominal length
-        x: list = []
-        y: list = []
-        z: list = []
-        R: list = []
-        phi: list = []
         _x2 = np.linspace(0, 1, npts, dtype=float)
         x2 = DataArray(_x2, coords=[(self.x2_name, _x2)])
-        for x1 in self.x1:
-
-            _x, _y = self.convert_to_xy(x1, x2, 0)
-            _R, _z = self.convert_to_Rz(x1, x2, 0)
-            dist = self.distance(self.x2_name, x1, x2, 0)
-
-            x.append(_x)
-            y.append(_y)
-            z.append(_z)
-            R.append(_R)
-            _phi = np.arctan2(_y, _x)
-            phi.append(_phi)
-
-        # TODO: Loop over DataArray to NaN where los length > LOS distance
-        for x1 in self.x1:
-
-            for beamlet in range(self.beamlets):
-                dist = self.distance(self.x2_name, x1, x2, 0)
-                _x = x[x1].sel(beamlet=beamlet)
-                _y = y[x1].sel(beamlet=beamlet)
-                _z = z[x1].sel(beamlet=beamlet)
-                _R = R[x1].sel(beamlet=beamlet)
-                _phi = phi[x1].sel(beamlet=beamlet)
-                x[x1][beamlet] = xr.where(
-                    dist[beamlet, :] <= los_lengths[x1, beamlet].values, _x, np.nan
-                )
-                y[x1][beamlet] = xr.where(
-                    dist[beamlet, :] <= los_lengths[x1, beamlet].values, _y, np.nan
-                )
-                z[x1][beamlet] = xr.where(
-                    dist[beamlet, :] <= los_lengths[x1, beamlet].values, _z, np.nan
-                )
-                R[x1][beamlet] = xr.where(
-                    dist[beamlet, :] <= los_lengths[x1, beamlet].values, _R, np.nan
-                )
-                phi[x1][beamlet] = xr.where(
-                    dist[beamlet, :] <= los_lengths[x1, beamlet].values, _phi, np.nan
-                )
+        _x = self.x_start + (self.x_end - self.x_start) * x2
+        _y = self.y_start + (self.y_end - self.y_start) * x2
+        _z = self.z_start + (self.z_end - self.z_start) * x2
+        dist = self.distance(self.x2_name, self.x1, x2, 0)
+        inside = dist <= los_lengths
 
         # Reset end coordinates to values intersecting the machine walls
         self.x_end = x_end
@@ -521,11 +427,11 @@ class LineOfSightTransform(CoordinateTransform):
         self.z_end = z_end
 
         self.x2 = x2
-        self.dl = float(dist[0, 1] - dist[0, 0])
-        self.x = xr.concat(x, "channel")
-        self.y = xr.concat(y, "channel")
-        self.z = xr.concat(z, "channel")
-        self.phi = xr.concat(phi, "channel")
+        self.dl = float(dist[-1, 0, 1] - dist[-1, 0, 0])
+        self.x = xr.where(inside, _x, np.nan)
+        self.y = xr.where(inside, _y, np.nan)
+        self.z = xr.where(inside, _z, np.nan)
+        self.phi = xr.where(inside, np.arctan2(_y, _x), np.nan)
         self.R = np.sqrt(self.x**2 + self.y**2)
         self.impact_parameter = self.calc_impact_parameter()
 
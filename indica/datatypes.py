@@ -68,6 +68,7 @@ DATATYPES: Dict[str, Tuple[str, str]] = {
     "dim_2": ("dim_2", "none"),
     "index": ("Index", "none"),
     "label": ("Label", "none"),
+    "sample": ("Sample", "none"),
     "t": ("Time", "time"),
     "time_to_calculate": ("Time", "time"),
     "channel": ("Channel", "number"),
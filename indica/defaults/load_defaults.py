@@ -12,14 +12,15 @@ def get_filename_default_objects(machine: str):
         DEFAULTS_PATH + f"{machine}_default_geometry_transform_objects.pkl"
     )
     _files["equilibrium"] = DEFAULTS_PATH + f"{machine}_default_equilibrium_object.pkl"
-    _files["plasma"] = DEFAULTS_PATH + f"{machine}_default_plasma_object.pkl"
+    _files["plasma"] = DEFAULTS_PATH + f"{machine}_default_plasma.nc"
 
     return _files
 
 
 def load_default_objects(machine: str, identifier: str = "geometry"):
     """
-    Load default objects from local pickle files
+    Load default objects from local pickle files, or from the snapshot file for
+    the plasma (see Plasma.write_snapshot)
 
     Parameters
     ----------
@@ -29,6 +30,10 @@ def load_default_objects(machine: str, identifier: str = "geometry"):
     _file = get_filename_default_objects(machine)[identifier]
 
     try:
+        if identifier == "plasma":
+            from indica.plasma import Plasma
+
+            return Plasma.read_snapshot(_file)
         return pickle.load(open(_file, "rb"))
     except FileNotFoundError:
         to_print = f"""
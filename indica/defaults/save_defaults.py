@@ -69,8 +69,10 @@ def save_default_objects(
     fract_abu, power_loss_tot = default_atomic_data(plasma.elements)
     plasma.fract_abu = fract_abu
     plasma.power_loss_tot = power_loss_tot
-    print(f"\n Writing plasma object to: {plasma_file}. \n")
-    pickle.dump(plasma, open(plasma_file, "wb"))
+    print(f"\n Writing plasma snapshot to: {plasma_file}. \n")
+    plasma.write_snapshot(
+        plasma_file, equilibrium_reference=f"{equilibrium_instrument} {pulse}"
+    )
 
     return plasma
 
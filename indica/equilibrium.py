@@ -1,10 +1,13 @@
+from collections import OrderedDict
 from typing import Dict
 from typing import Optional
 from typing import Tuple
 
 import numpy as np
+from scipy.integrate import cumulative_trapezoid
+from scipy.interpolate import interp1d
+from scipy.interpolate import RegularGridInterpolator
 import xarray as xr
-from xarray import apply_ufunc
 from xarray import DataArray
 from xarray import where
 
@@ -14,6 +17,268 @@ from .numpy_typing import LabeledArray
 from .numpy_typing import OnlyArray
 
 _FLUX_TYPES = ["poloidal", "toroidal"]
+# Interpolation of the equilibrium quantities in time
+T_METHODS = ["nearest", "linear"]
+# Maximum number of time slices kept with their interpolants
+TIME_SLICE_CACHE_SIZE = 128
+# Resolution of the flux surface contour tables (see flux_surface_contours)
+CONTOUR_N_THETA = 256
+CONTOUR_N_RAY = 500
+CONTOUR_N_RHOP = 401
+# Subsampling in (rhop, theta) of the contour tables for flux surface averages
+AVERAGE_STRIDE = (4, 2)
+# Gradients of psi(R, z) used for the magnetic field and their direction
+PSI_GRADIENTS = {"dpsi_dR": "R", "dpsi_dz": "z"}
+# Resolution of the rhop <-> rhot conversion table (see build_rhot_table)
+FLUX_TABLE_N_RHOP = 2001
+
+
+def interpolate_in_time(
+    name: str, before: DataArray, after: DataArray, weight: FloatOrDataArray
+) -> DataArray:
+    """
+    Linear interpolation in time between two equilibrium time slices, rhop being
+    interpolated as psin which is linear close to the magnetic axis
+
+    name - Name of the quantity (see Equilibrium.field)
+    before - Quantity at the time slice before.
+    after - Quantity at the time slice after.
+    weight - Weight of the time slice after.
+    """
+    if name == "rhop":
+        return np.sqrt(before**2 * (1 - weight) + after**2 * weight)
+    return before * (1 - weight) + after * weight
+
+
+def bilinear_weights(
+    x: np.ndarray, y: np.ndarray, x_points: np.ndarray, y_points: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices in the flattened (y, x) grid of the four neighbours of each point and
+    their bilinear interpolation weights, NaN for points outside the grid
+
+    x - Ascending grid coordinate along the last axis.
+    y - Ascending grid coordinate along the first axis.
+    x_points - x coordinate of the points.
+    y_points - y coordinate of the points.
+    """
+
+    def locate(grid: np.ndarray, points: np.ndarray):
+        i = np.clip(np.searchsorted(grid, points) - 1, 0, grid.size - 2)
+        weight = (points - grid[i]) / (grid[i + 1] - grid[i])
+        return i, np.where((weight >= 0.0) & (weight <= 1.0), weight, np.nan)
+
+    i, w_x = locate(x, x_points)
+    j, w_y = locate(y, y_points)
+    index = np.stack(
+        [
+            j * x.size + i,
+            j * x.size + i + 1,
+            (j + 1) * x.size + i,
+            (j + 1) * x.size + i + 1,
+        ]
+    )
+    weights = np.stack(
+        [(1 - w_x) * (1 - w_y), w_x * (1 - w_y), (1 - w_x) * w_y, w_x * w_y]
+    )
+    return index, weights
+
+
+class EquilibriumTimeSlice:
+    """Equilibrium quantities at one time, selected or interpolated from the
+    equilibrium time slices on first use and cached with their interpolants.
+
+    equilibrium
+        Equilibrium the quantities are taken from
+    t
+        Time (s)
+    index
+        Indices of the equilibrium time slices before and after t
+    weight
+        Weight of the time slice after t (0 if the slices are the same)
+    """
+
+    def __init__(
+        self,
+        equilibrium: "Equilibrium",
+        t: float,
+        index: Tuple[int, int],
+        weight: float,
+    ):
+        self.equilibrium = equilibrium
+        self.t = t
+        self.index = index
+        self.weight = weight
+        self._data: Dict[str, DataArray] = {}
+        self._interpolants: Dict[str, RegularGridInterpolator] = {}
+        self._contours: Optional[DataArray] = None
+        self._geometry: Optional[Dict[str, np.ndarray]] = None
+        self._bilinear_weights: Dict[tuple, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def select(self, name: str) -> DataArray:
+        """
+        Equilibrium quantity (see Equilibrium.field) at the time of the slice
+
+        name - Name of the quantity, e.g. "rhop", "dpsi_dR", "rmag" or "f"
+        """
+        if name not in self._data:
+            data = self.equilibrium.field(name)
+            before = data.isel(t=self.index[0]).drop_vars("t")
+            if self.weight == 0.0:
+                value = before
+            else:
+                after = data.isel(t=self.index[1]).drop_vars("t")
+                value = interpolate_in_time(name, before, after, self.weight)
+            self._data[name] = value.assign_coords(t=self.t)
+        return self._data[name]
+
+    def value(self, name: str) -> float:
+        """Scalar equilibrium quantity (e.g. "rmag") at the time of the slice"""
+        return float(self.select(name))
+
+    def interpolant(self, name: str) -> RegularGridInterpolator:
+        """
+        Bilinear interpolant in (z, R) of a map at the time of the slice
+
+        name - "rhop", "dpsi_dR" or "dpsi_dz"
+        """
+        if name not in self._interpolants:
+            data = self.select(name).transpose("z", "R")
+            self._interpolants[name] = RegularGridInterpolator(
+                (data.z.values, data.R.values),
+                data.values,
+                bounds_error=False,
+                fill_value=np.nan,
+            )
+        return self._interpolants[name]
+
+    def flux_surface_contours(self) -> DataArray:
+        """
+        Minor radius of the flux surfaces on a (rhop, theta) grid, built on first
+        use by sampling rhop along rays from the magnetic axis to the edge of the
+        equilibrium grid
+        """
+        if self._contours is not None:
+            return self._contours
+
+        equilibrium = self.equilibrium
+        R0 = self.value("rmag")
+        z0 = self.value("zmag")
+        theta = np.linspace(0, 2 * np.pi, CONTOUR_N_THETA, endpoint=False)
+        cos, sin = np.cos(theta), np.sin(theta)
+        # Distance from the axis to the edge of the grid for each angle
+        with np.errstate(divide="ignore"):
+            distances = np.stack(
+                [
+                    np.where(cos > 0, (float(equilibrium.Rmax) - R0) / cos, np.inf),
+                    np.where(cos < 0, (float(equilibrium.Rmin) - R0) / cos, np.inf),
+                    np.where(sin > 0, (float(equilibrium.zmax) - z0) / sin, np.inf),
+                    np.where(sin < 0, (float(equilibrium.zmin) - z0) / sin, np.inf),
+                ]
+            )
+        minor_rad_max = distances.min(axis=0)
+        minor_rads = (
+            np.linspace(0.0, 1.0, CONTOUR_N_RAY)[np.newaxis, :]
+            * minor_rad_max[:, np.newaxis]
+        )
+        rhop_ray = self.interpolant("rhop")(
+            (z0 + minor_rads * sin[:, np.newaxis], R0 + minor_rads * cos[:, np.newaxis])
+        )
+        rhop_ray[:, 0] = 0.0
+        # Flux surfaces are nested: invert the monotonic envelope of rhop(r)
+        rhop_ray = np.fmax.accumulate(np.nan_to_num(rhop_ray, nan=0.0), axis=1)
+
+        rhop = np.linspace(0.0, rhop_ray[:, -1].max(), CONTOUR_N_RHOP)
+        values = np.stack(
+            [
+                np.interp(rhop, _rhop, _minor_rads, right=np.nan)
+                for _rhop, _minor_rads in zip(rhop_ray, minor_rads)
+            ],
+            axis=-1,
+        )
+        self._contours = DataArray(
+            values,
+            coords={"rhop": rhop, "theta": theta, "t": self.t},
+            dims=("rhop", "theta"),
+            name="minor_radius",
+        )
+        return self._contours
+
+    def flux_surface_geometry(self) -> Dict[str, np.ndarray]:
+        """
+        Geometry of the flux surface contours (see flux_surface_contours)
+        subsampled by AVERAGE_STRIDE: (R, z) of the (rhop, theta) grid, volume
+        element dV / drhop at each point and the volume and cross-sectional area
+        enclosed by each flux surface
+        """
+        if self._geometry is not None:
+            return self._geometry
+
+        contours = self.flux_surface_contours()
+        minor_rad = contours.values
+        theta = contours.theta.values
+        dtheta = 2 * np.pi / theta.size
+        R0 = self.value("rmag")
+        # Exact integrals of r dr dtheta and 2 pi R r dr dtheta up to each contour
+        area = np.sum(minor_rad**2 / 2, axis=1) * dtheta
+        volume = (
+            np.sum(R0 * minor_rad**2 / 2 + minor_rad**3 * np.cos(theta) / 3, axis=1)
+            * 2
+            * np.pi
+            * dtheta
+        )
+        drdrhop = np.gradient(minor_rad, contours.rhop.values, axis=0)
+
+        i_rhop = slice(None, None, AVERAGE_STRIDE[0])
+        i_theta = slice(None, None, AVERAGE_STRIDE[1])
+        minor_rad = minor_rad[i_rhop, i_theta]
+        theta = theta[i_theta]
+        dtheta = 2 * np.pi / theta.size
+        R = R0 + minor_rad * np.cos(theta)
+        z = self.value("zmag") + minor_rad * np.sin(theta)
+        area_element = minor_rad * drdrhop[i_rhop, i_theta] * dtheta
+        self._geometry = {
+            "rhop": contours.rhop.values[i_rhop],
+            "theta": theta,
+            "R": R,
+            "z": z,
+            "volume_element": 2 * np.pi * R * area_element,
+            "area": area[i_rhop],
+            "volume": volume[i_rhop],
+        }
+        return self._geometry
+
+    def contour_values(self, data: DataArray) -> np.ndarray:
+        """
+        Bilinear interpolation of a quantity on the (rhop, theta) grid of the flux
+        surface contours (see flux_surface_geometry), the interpolation weights
+        being calculated once for each grid of the data
+
+        data - Quantity with dimensions (..., z, R) or (..., rhop, theta), theta
+               being periodic.
+        """
+        geometry = self.flux_surface_geometry()
+        if data.dims[-2:] == ("z", "R"):
+            x, y = data.R.values, data.z.values
+            x_points, y_points = geometry["R"], geometry["z"]
+        else:
+            x, y = data.theta.values, data.rhop.values
+            theta0 = x[0]
+            data = xr.concat(
+                [data, data.isel(theta=0).assign_coords(theta=theta0 + 2 * np.pi)],
+                "theta",
+            )
+            x = data.theta.values
+            x_points = (geometry["theta"] - theta0) % (2 * np.pi) + theta0
+            y_points = geometry["rhop"][:, np.newaxis]
+        key = (data.dims[-1], x.tobytes(), y.tobytes())
+        if key not in self._bilinear_weights:
+            self._bilinear_weights[key] = bilinear_weights(
+                x, y, *np.broadcast_arrays(x_points, y_points)
+            )
+        index, weights = self._bilinear_weights[key]
+        values = data.values.reshape(data.shape[:-2] + (-1,))
+        return np.sum(values[..., index] * weights, axis=-3)
 
 
 class Equilibrium:
@@ -27,6 +292,9 @@ class Equilibrium:
     z_shift
         Vertical z shift to test diagnostic mapping (positive for diagnostics)
         Either a float for all time slices or a DataArray with coord 't'
+    t_method
+        Interpolation of the equilibrium in time: "nearest" time slice, or
+        "linear" between the time slices before and after
 
     TODO: should this class go in a sub-folder??
     """
@@ -36,7 +304,11 @@ class Equilibrium:
         equilibrium_data: Dict[str, DataArray],
         R_shift: FloatOrDataArray = 0.0,
         z_shift: FloatOrDataArray = 0.0,
+        t_method: str = "nearest",
     ):
+        if t_method not in T_METHODS:
+            raise ValueError(f"t_method must be one of {T_METHODS}")
+        self.t_method = t_method
         self.f: DataArray
         self.psi: DataArray
         self.psin: DataArray
@@ -49,6 +321,8 @@ class Equilibrium:
         self.zmag: DataArray
 
         self._data = equilibrium_data
+        self._volume: Optional[DataArray] = None
+        self._area: Optional[DataArray] = None
         # Assign all equilibrium data as class attributes
         for k, v in equilibrium_data.items():
             setattr(self, k, v)
@@ -105,15 +379,16 @@ class Equilibrium:
             z_range = slice(z_new.min("z"), z_new.max("z"))
             self.psi = self.psi.interp(R=R_new, z=z_new).sel(R=R_range, z=z_range)
             self.rhop = self.rhop.interp(R=R_new, z=z_new).sel(R=R_range, z=z_range)
-            self.rmag -= self.R_offset
-            self.zmag -= self.z_offset
-            self.rbnd -= self.R_offset
-            self.zbnd -= self.z_offset
-            self.zx_low -= self.z_offset
+            # Not in place, the data may be read-only (e.g. EquilibriumStore)
+            self.rmag = self.rmag - self.R_offset
+            self.zmag = self.zmag - self.z_offset
+            self.rbnd = self.rbnd - self.R_offset
+            self.zbnd = self.zbnd - self.z_offset
+            self.zx_low = self.zx_low - self.z_offset
             if hasattr(self, "rmji"):
-                self.rmji -= self.R_offset
+                self.rmji = self.rmji - self.R_offset
             if hasattr(self, "rmjo"):
-                self.rmjo -= self.R_offset
+                self.rmjo = self.rmjo - self.R_offset
 
         if np.any(np.isnan(self.rhop)):
             self.rhop = xr.where(self.rhop > 0, self.rhop, 0.0)
@@ -128,6 +403,216 @@ class Equilibrium:
             np.arctan2(self.zmax - self.zmag, self.Rmin - self.rmag) % (2 * np.pi),
             np.arctan2(self.zmin - self.zmag, self.Rmin - self.rmag) % (2 * np.pi),
         ]
+        self._time_slices: OrderedDict = OrderedDict()
+        self._psi_gradients: Dict[str, DataArray] = {}
+        self.rhot_table = self.build_rhot_table()
+
+    def __getstate__(self) -> dict:
+        """Pickle without the time-slice cache"""
+        state = self.__dict__.copy()
+        state["_time_slices"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore pickled objects, setting defaults for attributes missing in
+        objects saved with previous versions"""
+        state.pop("_interpolants", None)
+        state.setdefault("_time_slices", OrderedDict())
+        state.setdefault("_psi_gradients", {})
+        state.setdefault("t_method", "nearest")
+        state.setdefault("_volume", state.pop("volume", None))
+        state.setdefault("_area", state.pop("area", None))
+        self.__dict__.update(state)
+        if "rhot_table" not in state:
+            self.rhot_table = self.build_rhot_table()
+
+    def build_rhot_table(self) -> DataArray:
+        """
+        Dense (t, rhop) table of rhot on a uniform rhop grid, cubic interpolation
+        of rhot forced to be monotonic so that it can be inverted by linear
+        interpolation (see convert_flux_coords_values)
+        """
+        rhop = np.linspace(0.0, float(self.rhot.rhop.max()), FLUX_TABLE_N_RHOP)
+        rhot = self.rhot.transpose("t", "rhop")
+        values = interp1d(rhot.rhop.values, rhot.values, kind="cubic", axis=-1)(rhop)
+        values = np.maximum.accumulate(np.nan_to_num(values, nan=0.0), axis=-1)
+        return DataArray(
+            values,
+            coords={"t": rhot.t.values, "rhop": rhop},
+            dims=("t", "rhop"),
+            name="rhot",
+        )
+
+    def time_index(self, t: LabeledArray) -> np.ndarray:
+        """Index of the equilibrium time slices nearest to the given times"""
+        return self.t.indexes["t"].get_indexer(np.ravel(t), method="nearest")
+
+    def time_weights(
+        self, t: LabeledArray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Indices of the equilibrium time slices before and after the given times
+        and weights of the slices after, for interpolation in time with t_method
+
+        t - Times (s).
+        """
+        t = np.ravel(t)
+        if self.t_method == "nearest" or self.t.size == 1:
+            index = self.time_index(t)
+            return index, index, np.zeros(t.shape)
+        times = self.t.values
+        after = np.clip(np.searchsorted(times, t), 1, times.size - 1)
+        before = after - 1
+        weight = np.clip((t - times[before]) / (times[after] - times[before]), 0, 1)
+        before = np.where(weight == 1.0, after, before)
+        weight = np.where(weight == 1.0, 0.0, weight)
+        return before, after, weight
+
+    def time_slice(self, t: float) -> EquilibriumTimeSlice:
+        """
+        Equilibrium quantities at the given time (see EquilibriumTimeSlice), kept
+        for the TIME_SLICE_CACHE_SIZE most recently used times
+
+        t - Time (s).
+        """
+        before, after, weight = (value[0] for value in self.time_weights(t))
+        if weight == 0.0:
+            # Time slices of the equilibrium are shared by all times using them
+            key: tuple = ("nearest", int(before))
+        else:
+            key = ("linear", float(t))
+        if key in self._time_slices:
+            self._time_slices.move_to_end(key)
+            return self._time_slices[key]
+
+        if weight == 0.0:
+            t = float(self.t[before])
+        time_slice = EquilibriumTimeSlice(
+            self, float(t), (int(before), int(after)), float(weight)
+        )
+        self._time_slices[key] = time_slice
+        if len(self._time_slices) > TIME_SLICE_CACHE_SIZE:
+            self._time_slices.popitem(last=False)
+        return time_slice
+
+    def select_time(self, name: str, t: LabeledArray) -> DataArray:
+        """
+        Equilibrium quantity at the given times, interpolated in time with
+        t_method, equivalent of data.interp(t=t, method=t_method) without the
+        overhead of interpolation
+
+        name - Name of the quantity (see field).
+        t - Times (s).
+        """
+        if np.ndim(t) == 0:
+            return self.time_slice(t).select(name).assign_coords(t=t)
+        before, after, weight = self.time_weights(t)
+        data = self.field(name)
+        value = data.isel(t=before).drop_vars("t")
+        if np.any(weight > 0):
+            value = interpolate_in_time(
+                name,
+                value,
+                data.isel(t=after).drop_vars("t"),
+                DataArray(weight, dims="t"),
+            )
+        return value.assign_coords(t=np.ravel(t))
+
+    def field(self, name: str) -> DataArray:
+        """
+        Equilibrium quantity with dimension t, the (t, z, R) maps of the gradients
+        of psi (see PSI_GRADIENTS) being calculated once per equilibrium
+
+        name - Name of the attribute, or "dpsi_dR" or "dpsi_dz"
+        """
+        if name not in PSI_GRADIENTS:
+            return getattr(self, name)
+        if name not in self._psi_gradients:
+            self._psi_gradients[name] = self.psi.differentiate(PSI_GRADIENTS[name])
+        return self._psi_gradients[name]
+
+    def flux_coords_values(
+        self, R: np.ndarray, z: np.ndarray, t: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Normalised poloidal flux coordinate and angle at a given location in space,
+        as flux_coords with kind="poloidal" for numpy arrays without the overhead
+        of xarray
+
+        R - Major radius position (m).
+        z - The vertical position (m).
+        t - Time (s), interpolated with t_method (see time_slice).
+        """
+        time_slice = self.time_slice(t)
+        R, z = np.broadcast_arrays(R, z)
+        rhop = time_slice.interpolant("rhop")((z, R))
+        rhop[(rhop < 0.0) & (rhop > -1e-12)] = 0.0
+        theta = np.arctan2(
+            z - time_slice.value("zmag"),
+            R - time_slice.value("rmag"),
+        )
+        private = (
+            (rhop < 1.0)
+            & (z < time_slice.value("zx_low"))
+            & (z < time_slice.value("zx_up"))
+        )
+        rhop[private] = -rhop[private]
+        return rhop, theta
+
+    def Bfield_values(
+        self, R: np.ndarray, z: np.ndarray, t: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Magnetic field components (b_R, b_z, b_T) at a given location in space, as
+        Bfield for numpy arrays without the overhead of xarray
+
+        R - Major radius position (m).
+        z - The vertical position (m).
+        t - Time (s), interpolated with t_method (see time_slice).
+        """
+        time_slice = self.time_slice(t)
+        R, z = np.broadcast_arrays(R, z)
+        b_R = -time_slice.interpolant("dpsi_dz")((z, R)) / R
+        b_z = time_slice.interpolant("dpsi_dR")((z, R)) / R
+        rhop, _ = self.flux_coords_values(R, z, t)
+        f = time_slice.select("f")
+        b_T = (
+            np.interp(np.abs(rhop), f.rhop.values, f.values, left=np.nan, right=np.nan)
+            / R
+        )
+        return b_R, b_z, b_T
+
+    def _use_interpolants(self, R: LabeledArray, z: LabeledArray) -> bool:
+        """Whether R and z are positions that can be evaluated with the cached
+        interpolants, rather than grids or time-dependent positions"""
+        return (
+            isinstance(R, DataArray)
+            and isinstance(z, DataArray)
+            and not {"t", "R", "z"} & set(R.dims + z.dims)
+            and {"R", "z"} <= set(self.rhop.indexes)
+        )
+
+    def _interp_field(
+        self, name: str, R: DataArray, z: DataArray, t: Optional[LabeledArray]
+    ) -> DataArray:
+        """select_time(name, t).interp(R=R, z=z) using the interpolants of the
+        time slices (see _use_interpolants)"""
+        if R.dims != z.dims or R.shape != z.shape:
+            R, z = xr.broadcast(R, z)
+        if t is None:
+            t = self.rhop.coords["t"]
+        values = np.stack(
+            [
+                self.time_slice(_t).interpolant(name)((z.values, R.values))
+                for _t in np.ravel(t)
+            ]
+        )
+        coords = {**R.coords, **z.coords, "R": R.variable, "z": z.variable}
+        if np.ndim(t) == 0:
+            coords["t"] = t
+            return DataArray(values[0], coords=coords, dims=R.dims, name=name)
+        coords["t"] = np.ravel(t)
+        return DataArray(values, coords=coords, dims=("t",) + R.dims, name=name)
 
     def Bfield(
         self,
@@ -144,23 +629,25 @@ class Equilibrium:
         t - Times (s).
         """
 
+        if self._use_interpolants(R, z):
+            dpsi_dR = self._interp_field("dpsi_dR", R, z, t)
+            dpsi_dz = self._interp_field("dpsi_dz", R, z, t)
+        elif t is not None:
+            dpsi_dR = self.select_time("dpsi_dR", t).interp(R=R, z=z)
+            dpsi_dz = self.select_time("dpsi_dz", t).interp(R=R, z=z)
+        else:
+            dpsi_dR = self.field("dpsi_dR").interp(R=R, z=z)
+            dpsi_dz = self.field("dpsi_dz").interp(R=R, z=z)
+
         if t is not None:
             check_time_present(t, self.t)
-            psi = self.psi.interp(t=t, method="nearest", assume_sorted=True)
-            f = self.f.interp(t=t, method="nearest", assume_sorted=True)
+            f = self.select_time("f", t)
             _rhop, _, _ = self.flux_coords(R, z, t)
         else:
             t = self.rhop.coords["t"]
-            psi = self.psi
             f = self.f
             _rhop, _, _ = self.flux_coords(R, z)
 
-        dpsi_dR = psi.differentiate("R").interp(R=R, z=z)
-        dpsi_dz = psi.differentiate("z").interp(
-            R=R,
-            z=z,
-        )
-
         b_R = -(np.float64(1.0) / R) * dpsi_dz  # type: ignore
         b_R.name = "Radial magnetic field"
         b_R = b_R.T
@@ -280,7 +767,7 @@ class Equilibrium:
             t = self.rmjo.coords["t"]
         else:
             check_time_present(t, self.t)
-            rmjo = self.rmjo.interp(t=t, method="nearest")
+            rmjo = self.select_time("rmjo", t)
         rhop, _ = self.convert_flux_coords(rho, t, from_kind=kind, to_kind="poloidal")
         R = rmjo.indica.interp2d(rhop=rhop, method="cubic")
 
@@ -304,12 +791,42 @@ class Equilibrium:
             t = self.rmji.coords["t"]
         else:
             check_time_present(t, self.t)
-            rmji = self.rmji.interp(t=t, method="nearest")
+            rmji = self.select_time("rmji", t)
         rhop, _ = self.convert_flux_coords(rho, t, from_kind=kind, to_kind="poloidal")
         R = rmji.indica.interp2d(rhop=rhop, method="cubic")
 
         return R, t
 
+    def minor_radius_values(
+        self, rhop: np.ndarray, theta: np.ndarray, t: float
+    ) -> np.ndarray:
+        """
+        Minor radius of the given poloidal flux surfaces at the desired poloidal
+        angles, bilinear interpolation of the flux surface contours (see
+        EquilibriumTimeSlice.flux_surface_contours) for numpy arrays
+
+        rhop - Normalised poloidal flux coordinate values.
+        theta - Poloidal angle.
+        t - Time (s), interpolated with t_method (see time_slice).
+        """
+        contours = self.time_slice(t).flux_surface_contours()
+        values = contours.values
+        n_rhop, n_theta = values.shape
+        drhop = float(contours.rhop[1])
+        rhop, theta = np.broadcast_arrays(np.abs(rhop), theta % (2 * np.pi))
+
+        x_rhop = rhop / drhop
+        i = np.clip(np.floor(x_rhop).astype(int), 0, n_rhop - 2)
+        w_rhop = np.where(x_rhop <= n_rhop - 1, x_rhop - i, np.nan)
+        x_theta = theta / (2 * np.pi / n_theta)
+        j = np.floor(x_theta).astype(int) % n_theta
+        w_theta = x_theta - np.floor(x_theta)
+        j_next = (j + 1) % n_theta
+
+        lower = values[i, j] + (values[i, j_next] - values[i, j]) * w_theta
+        upper = values[i + 1, j] + (values[i + 1, j_next] - values[i + 1, j]) * w_theta
+        return lower + (upper - lower) * w_rhop
+
     def minor_radius(
         self,
         rho: LabeledArray,
@@ -325,63 +842,37 @@ class Equilibrium:
         t - Times (s).
         kind - Type of flux coordinate: "toroidal", "poloidal"
         """
-        ngrid = 100
         rhop, _ = self.convert_flux_coords(rho, t, from_kind=kind, to_kind="poloidal")
-        theta = theta % (2 * np.pi)
-        if t is not None:
+        if t is None:
+            t = self.rhop.coords["t"]
+        else:
             check_time_present(t, self.t)
-            corner_angles = [
-                angle.interp(t=t, method="nearest") for angle in self.corner_angles
-            ]
-            R0 = self.rmag.interp(t=t, method="nearest")
-            z0 = self.zmag.interp(t=t, method="nearest")
-            reference_rhos = self.rhop.interp(t=t, method="nearest")
-            reference_rhos.name = self.rhop.name
+        rhop, theta = xr.broadcast(DataArray(rhop), DataArray(theta))
+        if "t" in rhop.dims:
+            rhop = rhop.transpose("t", ...)
+            theta = theta.transpose("t", ...)
+        dims = tuple(dim for dim in rhop.dims if dim != "t")
+
+        values = []
+        for i, _t in enumerate(np.ravel(t)):
+            _rhop, _theta = rhop, theta
+            if "t" in rhop.dims:
+                _rhop, _theta = rhop.isel(t=i), theta.isel(t=i)
+            values.append(self.minor_radius_values(_rhop.values, _theta.values, _t))
+
+        coords = {
+            name: coord
+            for name, coord in {**theta.coords, **rhop.coords}.items()
+            if name != "t"
+        }
+        if np.ndim(t) == 0:
+            minor_rad = DataArray(values[0], coords=coords, dims=dims)
+            minor_rad = minor_rad.assign_coords(t=t)
         else:
-            corner_angles = self.corner_angles
-            R0 = self.rmag
-            z0 = self.zmag
-            reference_rhos = self.rhop
-            t = self.rhop.coords["t"]
-        minor_rad_max = apply_ufunc(
-            lambda angle, corner1, corner2, corner3, corner4, R0, z0: (self.Rmax - R0)
-            / np.cos(angle)
-            if angle > corner1 or angle <= corner2
-            else (self.zmax - z0) / np.sin(angle)
-            if corner2 < angle <= corner3
-            else (self.Rmin - R0) / np.cos(angle)
-            if corner3 < angle <= corner4
-            else (self.zmin - z0) / np.sin(angle),
-            theta,
-            corner_angles[0],
-            corner_angles[1],
-            corner_angles[2],
-            corner_angles[3],
-            R0,
-            z0,
-            vectorize=True,
-        )
-        minor_rads = DataArray(
-            np.linspace(0.0, minor_rad_max, ngrid),
-            dims=("r",) + minor_rad_max.dims,
-            coords=minor_rad_max.coords,
-        )
-        R_grid = R0 + minor_rads * np.cos(theta)
-        z_grid = z0 + minor_rads * np.sin(theta)
-        fluxes_samples = reference_rhos.indica.interp2d(
-            R=R_grid,
-            z=z_grid,
-            zero_coords={"R": R0, "z": z0},
-            method="cubic",
-            assume_sorted=True,
-        ).rename("rhop")
-        fluxes_samples.loc[{"r": 0}] = 0.0
-
-        indices = fluxes_samples.indica.invert_root(rhop, "r", 0.0, method="cubic")
-        return (
-            minor_rads.indica.interp2d(r=indices, method="cubic", assume_sorted=True),
-            t,
-        )
+            coords["t"] = np.ravel(t)
+            minor_rad = DataArray(np.stack(values), coords=coords, dims=("t",) + dims)
+        minor_rad.name = "minor_radius"
+        return minor_rad, t
 
     def flux_coords(
         self,
@@ -400,22 +891,27 @@ class Equilibrium:
         """
 
         if t is None:
-            rhop = self.rhop
             R_ax = self.rmag
             z_ax = self.zmag
-            t = self.rhop.coords["t"]
             z_x_point_low = self.zx_low
             z_x_point_up = self.zx_up
         else:
             check_time_present(t, self.t)
-            rhop = self.rhop.interp(t=t, method="nearest")
-            R_ax = self.rmag.interp(t=t, method="nearest")
-            z_ax = self.zmag.interp(t=t, method="nearest")
-            z_x_point_low = self.zx_low.interp(t=t, method="nearest")
-            z_x_point_up = self.zx_up.interp(t=t, method="nearest")
+            R_ax = self.select_time("rmag", t)
+            z_ax = self.select_time("zmag", t)
+            z_x_point_low = self.select_time("zx_low", t)
+            z_x_point_up = self.select_time("zx_up", t)
 
         # TODO: rho and theta dimensions not in the same order...
-        rhop = rhop.interp(R=R, z=z)
+        if self._use_interpolants(R, z):
+            # Cached interpolants, avoiding the interpolation of the whole rhop map
+            rhop = self._interp_field("rhop", R, z, t)
+        elif t is None:
+            rhop = self.rhop.interp(R=R, z=z)
+        else:
+            rhop = self.select_time("rhop", t).interp(R=R, z=z)
+        if t is None:
+            t = self.rhop.coords["t"]
         theta = np.arctan2(
             z - z_ax,
             R - R_ax,
@@ -452,10 +948,9 @@ class Equilibrium:
         t - Times (s).
         kind - Type of flux coordinate: "toroidal", "poloidal"
         """
-        rhop, _ = self.convert_flux_coords(rho, t, from_kind=kind, to_kind="poloidal")
-        minor_rad, t = self.minor_radius(rhop, theta, t, kind)
-        R0 = self.rmag.interp(t=t, method="nearest")
-        z0 = self.zmag.interp(t=t, method="nearest")
+        minor_rad, t = self.minor_radius(rho, theta, t, kind)
+        R0 = self.select_time("rmag", t)
+        z0 = self.select_time("zmag", t)
         R = R0 + minor_rad * np.cos(theta)
         z = z0 + minor_rad * np.sin(theta)
         return R, z, t
@@ -482,22 +977,50 @@ class Equilibrium:
         if from_kind not in supported or to_kind not in supported:
             raise ValueError("kind must be either poloidal or toroidal")
 
-        if t is not None:
-            check_time_present(t, self.t)
-            conversion = self.rhot.interp(t=t, method="nearest")
-        else:
-            conversion = self.rhot
+        if t is None:
             t = self.rhot.t
+        else:
+            check_time_present(t, self.t)
 
-        if to_kind == "toroidal":
-            _rho = conversion.indica.interp2d(
-                rhop=np.abs(rho), method="cubic", assume_sorted=True
+        _rho = DataArray(rho)
+        if "t" in _rho.dims:
+            _rho = _rho.transpose("t", ...)
+        dims = tuple(dim for dim in _rho.dims if dim != "t")
+        values = [
+            self.convert_flux_coords_values(
+                _rho.isel(t=i).values if "t" in _rho.dims else _rho.values,
+                _t,
+                to_kind,
             )
-        elif to_kind == "poloidal":
-            _rho = conversion.indica.invert_interp(np.abs(rho), "rhop", method="cubic")
+            for i, _t in enumerate(np.ravel(t))
+        ]
 
+        coords = {name: coord for name, coord in _rho.coords.items() if name != "t"}
+        name = "rhop" if to_kind == "poloidal" else "rhot"
+        if np.ndim(t) == 0:
+            _rho = DataArray(values[0], coords=coords, dims=dims, name=name)
+            return _rho.assign_coords(t=t), t
+        coords["t"] = np.ravel(t)
+        _rho = DataArray(np.stack(values), coords=coords, dims=("t",) + dims, name=name)
         return _rho, t
 
+    def convert_flux_coords_values(
+        self, rho: np.ndarray, t: float, to_kind: str = "toroidal"
+    ) -> np.ndarray:
+        """
+        Convert between normalized flux coordinates for numpy arrays, linear
+        interpolation of the rhot table (see build_rhot_table) in either direction
+
+        rho - Normalized flux coordinate values, NaN is returned outside [0, 1].
+        t - Time (s), interpolated with t_method (see time_slice).
+        to_kind - Output flux coordinate: "poloidal", "toroidal"
+        """
+        rhop = self.rhot_table.rhop.values
+        rhot = self.time_slice(t).select("rhot_table").values
+        if to_kind == "toroidal":
+            return np.interp(np.abs(rho), rhop, rhot, left=np.nan, right=np.nan)
+        return np.interp(np.abs(rho), rhot, rhop, left=np.nan, right=np.nan)
+
     def cross_sectional_area(
         self,
         rho: LabeledArray,
@@ -537,9 +1060,212 @@ class Equilibrium:
             t = self.rhop.coords["t"]
         else:
             check_time_present(t, self.t)
-        volume = self.area.interp(rhop=rhop).interp(t=t)
+        volume = self.volume.interp(rhop=rhop).interp(t=t)
         return volume, t
 
-    def write_to_geqdsk(self):
-        # TODO: Implement writing to geqdsk
-        raise NotImplementedError("Method not yet implemented")
+    def flux_surface_average(
+        self,
+        data: DataArray,
+        t: Optional[LabeledArray] = None,
+        rhop: Optional[LabeledArray] = None,
+    ) -> DataArray:
+        """
+        Flux surface average <f> = dV-weighted average of a quantity over each
+        flux surface, evaluated on the flux surface contours of the equilibrium
+
+        data - Quantity with dimensions (R, z) or (rhop, theta), and optionally t.
+        t - Times (s), by default those of data or of the equilibrium.
+        rhop - Flux surfaces, by default the rhop grid of the equilibrium.
+        """
+        return self._flux_surface_operator(data, t, rhop, average=True)
+
+    def volume_integral(
+        self,
+        data: DataArray,
+        t: Optional[LabeledArray] = None,
+        rhop: Optional[LabeledArray] = None,
+    ) -> DataArray:
+        """
+        Integral of a quantity over the volume enclosed by each flux surface,
+        evaluated on the flux surface contours of the equilibrium
+
+        data - Quantity with dimensions (R, z) or (rhop, theta), and optionally t.
+        t - Times (s), by default those of data or of the equilibrium.
+        rhop - Flux surfaces, by default the rhop grid of the equilibrium.
+        """
+        return self._flux_surface_operator(data, t, rhop, average=False)
+
+    def _flux_surface_operator(
+        self,
+        data: DataArray,
+        t: Optional[LabeledArray],
+        rhop: Optional[LabeledArray],
+        average: bool,
+    ) -> DataArray:
+        """Flux surface average or volume integral (see flux_surface_average)"""
+        if {"R", "z"} <= set(data.dims):
+            spatial_dims: Tuple[str, ...] = ("z", "R")
+        elif {"rhop", "theta"} <= set(data.dims):
+            spatial_dims = ("rhop", "theta")
+        else:
+            raise ValueError("data must have dimensions (R, z) or (rhop, theta)")
+        if t is None:
+            t = data.coords["t"] if "t" in data.dims else self.rhop.coords["t"]
+        else:
+            check_time_present(t, self.t)
+        if rhop is None:
+            rhop = self.rhot.rhop.values
+        dims = tuple(dim for dim in data.dims if dim not in spatial_dims + ("t",))
+
+        values = []
+        for _t in np.ravel(t):
+            _data = data.sel(t=_t, method="nearest") if "t" in data.dims else data
+            time_slice = self.time_slice(_t)
+            geometry = time_slice.flux_surface_geometry()
+            _values = time_slice.contour_values(_data.transpose(*dims, *spatial_dims))
+            volume_element = geometry["volume_element"]
+            integral = np.sum(_values * volume_element, axis=-1)
+            if average:
+                weight = np.sum(volume_element, axis=-1)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    result = np.where(
+                        weight > 0, integral / weight, np.mean(_values, axis=-1)
+                    )
+            else:
+                result = cumulative_trapezoid(
+                    integral, geometry["rhop"], axis=-1, initial=0.0
+                )
+            values.append(
+                interp1d(geometry["rhop"], result, bounds_error=False)(np.ravel(rhop))
+            )
+
+        coords = {
+            name: coord
+            for name, coord in data.coords.items()
+            if set(coord.dims) <= set(dims)
+        }
+        coords["rhop"] = np.ravel(rhop)
+        if np.ndim(t) == 0:
+            result = DataArray(values[0], coords=coords, dims=dims + ("rhop",))
+            result = result.assign_coords(t=t)
+        else:
+            coords["t"] = np.ravel(t)
+            result = DataArray(
+                np.stack(values, axis=-2), coords=coords, dims=dims + ("t", "rhop")
+            )
+        result.name = data.name
+        return result
+
+    @property
+    def volume(self) -> DataArray:
+        """Volume enclosed by the flux surfaces, calculated from the flux surface
+        contours on first use if not given in the equilibrium data"""
+        if self._volume is None:
+            self._set_flux_surface_volume_area()
+        return self._volume
+
+    @volume.setter
+    def volume(self, value: DataArray):
+        self._volume = value
+
+    @property
+    def area(self) -> DataArray:
+        """Cross-sectional area enclosed by the flux surfaces, calculated from the
+        flux surface contours on first use if not given in the equilibrium data"""
+        if self._area is None:
+            self._set_flux_surface_volume_area()
+        return self._area
+
+    @area.setter
+    def area(self, value: DataArray):
+        self._area = value
+
+    def _set_flux_surface_volume_area(self):
+        """Set volume and area which are not given, in one pass over the flux
+        surfaces"""
+        volume, area = self.flux_surface_volume_area()
+        if self._volume is None:
+            self._volume = volume
+        if self._area is None:
+            self._area = area
+
+    def flux_surface_volume_area(
+        self, rhop: Optional[LabeledArray] = None
+    ) -> Tuple[DataArray, DataArray]:
+        """
+        Volume and cross-sectional area enclosed by the flux surfaces at all times
+        of the equilibrium, from the flux surface contours
+
+        rhop - Flux surfaces, by default the rhop grid of the equilibrium.
+        """
+        if rhop is None:
+            rhop = self.rhot.rhop.values
+        quantities = {}
+        for name in ["volume", "area"]:
+            values = []
+            for _t in self.t.values:
+                geometry = self.time_slice(_t).flux_surface_geometry()
+                values.append(
+                    np.interp(
+                        np.ravel(rhop),
+                        geometry["rhop"],
+                        geometry[name],
+                        right=np.nan,
+                    )
+                )
+            quantities[name] = DataArray(
+                np.stack(values),
+                coords={"t": self.t.values, "rhop": np.ravel(rhop)},
+                dims=("t", "rhop"),
+                name=name,
+            )
+        return quantities["volume"], quantities["area"]
+
+    def write_to_geqdsk(self, filename: str, t: float, description: str = "indica"):
+        """
+        Write the equilibrium time slice nearest to the given time to a G-EQDSK
+        file, the pressure profiles (not available) being written as zeros
+
+        filename - Path of the file.
+        t - Time (s).
+        description - Description written in the header of the file.
+        """
+        from indica.readers.geqdsk import write_geqdsk
+
+        index = self.time_index(t)[0]
+        psi = self.psi.isel(t=index).transpose("z", "R")
+        R, z = psi.R.values, psi.z.values
+        psi_axis = float(self.psi_axis[index])
+        psi_boundary = float(self.psi_boundary[index])
+        psin = np.linspace(0.0, 1.0, R.size)
+        f = self.f.isel(t=index).interp(rhop=np.sqrt(psin)).values
+        ftor = self.ftor.isel(t=index).interp(rhop=np.sqrt(psin)).values
+        rbnd, zbnd = self.rbnd.isel(t=index).values, self.zbnd.isel(t=index).values
+        rcentr = (rbnd.max() + rbnd.min()) / 2
+        zeros = np.zeros(R.size)
+        geqdsk = {
+            "description": description,
+            "nw": R.size,
+            "nh": z.size,
+            "rdim": R[-1] - R[0],
+            "zdim": z[-1] - z[0],
+            "rcentr": rcentr,
+            "rleft": R[0],
+            "zmid": (z[-1] + z[0]) / 2,
+            "rmaxis": float(self.rmag[index]),
+            "zmaxis": float(self.zmag[index]),
+            "simag": psi_axis,
+            "sibry": psi_boundary,
+            "bcentr": f[-1] / rcentr,
+            "current": float(self.ipla[index]),
+            "fpol": f,
+            "pres": zeros,
+            "ffprim": zeros,
+            "pprime": zeros,
+            "psirz": psi.values,
+            # q = dftor / dpsi, psi in Wb/2pi
+            "qpsi": np.gradient(ftor, psin) / (2 * np.pi * (psi_boundary - psi_axis)),
+            "rbbbs": rbnd,
+            "zbbbs": zbnd,
+        }
+        write_geqdsk(filename, geqdsk)
@@ -192,25 +192,13 @@ class HelikeSpectrometer(AbstractDiagnostic):
         _spectra = _spectra.sum("line_name")
         # extend spectra to same coords as self.window.wavelength with NaNs
         # to maintain same shape as mds data
-        if "t" in _spectra.dims:
-            empty = xr.DataArray(
-                np.nan,
-                dims=_spectra.dims,
-                coords=dict(
-                    wavelength=self.window[self.window < 1].wavelength,
-                    rhop=_spectra.rhop,
-                    t=_spectra.t,
-                ),
-            )
-        else:
-            empty = xr.DataArray(
-                np.nan,
-                dims=_spectra.dims,
-                coords=dict(
-                    wavelength=self.window[self.window < 1].wavelength,
-                    rhop=_spectra.rhop,
-                ),
-            )
+        wavelength = self.window[self.window < 1].wavelength
+        empty = (
+            xr.full_like(_spectra.isel(wavelength=0, drop=True), np.nan)
+            .expand_dims(wavelength=wavelength.size)
+            .assign_coords(wavelength=wavelength)
+            .transpose(*_spectra.dims)
+        )
         spectra = xr.concat([_spectra, empty], "wavelength")
         self.spectra = spectra
 
@@ -450,9 +438,11 @@ class HelikeSpectrometer(AbstractDiagnostic):
         self.measured_spectra = self.measured_spectra / dt
 
         if norm_spectra is not None:
+            # each sample of an ensemble plasma is normalised separately
+            max_dims = [dim for dim in self.measured_spectra.dims if dim != "sample"]
             self.measured_spectra = (
                 self.measured_spectra
-                / self.measured_spectra.max()
+                / self.measured_spectra.max(max_dims)
                 * (norm_spectra.sel(t=t) * scale_spectra - background)
             )
 
@@ -1,7 +1,11 @@
+from .atomic_data import AtomicDataRegistry
 from .atomic_data import FractionalAbundance
 from .atomic_data import PowerLoss
+from .atomic_data_tables import AtomicDataTable
 
 __all__ = [
+    "AtomicDataRegistry",
+    "AtomicDataTable",
     "FractionalAbundance",
     "PowerLoss",
 ]
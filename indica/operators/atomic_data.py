@@ -1,6 +1,10 @@
+from collections import OrderedDict
 import copy
+import threading
 from typing import cast
+from typing import Dict
 from typing import List
+from typing import Optional
 from typing import Tuple
 
 import matplotlib.pylab as plt
@@ -8,6 +12,7 @@ import numpy as np
 from numpy.core.numeric import zeros_like
 from pandas import DataFrame
 import scipy
+from scipy.interpolate import RectBivariateSpline
 import xarray as xr
 from xarray import DataArray
 
@@ -21,6 +26,72 @@ from .abstractoperator import Operator
 
 np.set_printoptions(edgeitems=10, linewidth=100)
 
+SOLVERS = ["tridiagonal", "null_space"]
+
+
+class RateInterpolator:
+    """Bicubic splines of an ADF11 rate table in log-space, built once and
+    evaluated at any number of (Te, Ne) points.
+
+    One spline of log10(rate) as a function of log10(Te) and log10(Ne) is
+    calculated per ion charge at initialisation. Points outside the table
+    are set to NaN.
+
+    rate
+        ADF11 rate table with dimensions (ion_charge, electron_temperature,
+        electron_density)
+    degree
+        Degree of the splines
+    """
+
+    def __init__(self, rate: DataArray, degree: int = 3):
+        self.ion_charge = rate.ion_charge
+        log_Te = np.log10(rate.electron_temperature.values)
+        log_Ne = np.log10(rate.electron_density.values)
+        log_rate = np.log10(
+            np.maximum(
+                rate.transpose(
+                    "ion_charge", "electron_temperature", "electron_density"
+                ).values,
+                np.finfo(float).tiny,
+            )
+        )
+        self.splines = [
+            RectBivariateSpline(log_Te, log_Ne, log_rate[i], kx=degree, ky=degree)
+            for i in range(log_rate.shape[0])
+        ]
+        self.domain = ((log_Te[0], log_Te[-1]), (log_Ne[0], log_Ne[-1]))
+
+    def __call__(self, Te: DataArray, Ne: DataArray) -> DataArray:
+        """Evaluates the rates at the points given, with dimensions
+        ("ion_charge", *Te.dims) after broadcasting Te and Ne."""
+        Te, Ne = xr.broadcast(Te, Ne)
+        Ne = Ne.transpose(*Te.dims)
+        log_Te = np.log10(np.ravel(Te.values))
+        log_Ne = np.log10(np.ravel(Ne.values))
+        with np.errstate(over="ignore"):
+            result = 10 ** np.array(
+                [spline(log_Te, log_Ne, grid=False) for spline in self.splines]
+            )
+        out_of_domain = (
+            (log_Te < self.domain[0][0])
+            | (log_Te > self.domain[0][1])
+            | (log_Ne < self.domain[1][0])
+            | (log_Ne > self.domain[1][1])
+        )
+        result[:, out_of_domain] = np.nan
+
+        coords = {"ion_charge": self.ion_charge}
+        coords.update(Te.coords)
+        return DataArray(
+            result.reshape((len(self.splines),) + Te.shape),
+            dims=("ion_charge",) + Te.dims,
+            coords=coords,
+        ).assign_coords(
+            electron_temperature=(Te.dims, Te.values),
+            electron_density=(Te.dims, Ne.values),
+        )
+
 
 class FractionalAbundance(Operator):
     """Calculate fractional abundance for all ionisation charges of a given element.
@@ -31,6 +102,12 @@ class FractionalAbundance(Operator):
         effective recombination rate coefficients
     ccd
         charge exchange recombination coefficients
+
+    The equilibrium fractional abundance can be evaluated with two solvers:
+    "tridiagonal" (default) solves all points at once from the detailed balance
+    between neighbouring charges, "null_space" calculates the null space of the
+    ionisation balance matrix point by point and is kept as reference. The same
+    choice selects the batched or point by point time evolution when tau is given.
     """
 
     def __init__(
@@ -47,6 +124,22 @@ class FractionalAbundance(Operator):
         self.scd = scd
         self.acd = acd
         self.ccd = ccd
+        self.build_interpolators()
+
+    def build_interpolators(self):
+        """Precomputes the splines of the rate tables used by interpolate_rates"""
+        self.scd_interpolator = RateInterpolator(self.scd)
+        self.acd_interpolator = RateInterpolator(self.acd)
+        self.ccd_interpolator = (
+            RateInterpolator(self.ccd) if self.ccd is not None else None
+        )
+
+    def __setstate__(self, state: dict):
+        """Restore pickled objects, building the interpolators if missing in
+        objects saved with previous versions"""
+        self.__dict__.update(state)
+        if "scd_interpolator" not in state:
+            self.build_interpolators()
 
     def interpolate_rates(
         self,
@@ -64,45 +157,26 @@ class FractionalAbundance(Operator):
 
         self.Ne, self.Te = Ne, Te  # type: ignore
 
-        scd_spec = self.scd.indica.interp2d(
-            electron_temperature=Te,
-            electron_density=Ne,
-            method="cubic",
-            assume_sorted=True,
-        )
-
-        if self.ccd is not None:
-            ccd_spec = self.ccd.indica.interp2d(
-                electron_temperature=Te,
-                electron_density=Ne,
-                method="cubic",
-                assume_sorted=True,
-            )
+        scd_spec = self.scd_interpolator(Te, Ne)
+        acd_spec = self.acd_interpolator(Te, Ne)
+        if self.ccd_interpolator is not None:
+            ccd_spec = self.ccd_interpolator(Te, Ne)
         else:
             ccd_spec = None
 
-        acd_spec = self.acd.indica.interp2d(
-            electron_temperature=Te,
-            electron_density=Ne,
-            method="cubic",
-            assume_sorted=True,
-        )
-
         self.scd_spec, self.acd_spec, self.ccd_spec = scd_spec, acd_spec, ccd_spec
         self.num_of_ion_charge = self.scd_spec.shape[0] + 1
 
         return scd_spec, acd_spec, ccd_spec, self.num_of_ion_charge
 
-    def calc_ionisation_balance_matrix(
+    def _check_neutral_density(
         self,
         Ne: DataArray,
         Nh: DataArray = None,
     ):
-        """Calculates the ionisation balance matrix
-        Ne
-            electron density profile
-        Nh
-            thermal neutral hydrogen profile
+        """Checks consistency of the thermal neutral hydrogen density with the
+        charge exchange rates given at initialisation, defaulting it to zero
+        when ccd is available.
         """
         if Nh is not None:
             if self.ccd is None:
@@ -114,6 +188,21 @@ class FractionalAbundance(Operator):
         elif self.ccd is not None:
             Nh = cast(DataArray, zeros_like(Ne))
 
+        return Nh
+
+    def calc_ionisation_balance_matrix(
+        self,
+        Ne: DataArray,
+        Nh: DataArray = None,
+    ):
+        """Calculates the ionisation balance matrix
+        Ne
+            electron density profile
+        Nh
+            thermal neutral hydrogen profile
+        """
+        Nh = self._check_neutral_density(Ne, Nh)
+
         self.Ne, self.Nh = Ne, Nh  # type: ignore
 
         num_of_ion_charge = self.num_of_ion_charge
@@ -209,6 +298,75 @@ class FractionalAbundance(Operator):
 
         return np.real(F_z_tinf)
 
+    def calc_F_z_tinf_tridiagonal(
+        self,
+        Ne: DataArray,
+        Nh: DataArray = None,
+    ):
+        """Calculates the equilibrium fractional abundance of all ionisation charges
+        for all points in a single vectorised pass.
+
+        The ionisation balance matrix is tridiagonal, so in equilibrium the net
+        flux between neighbouring charges vanishes and
+        F_z+1 / F_z = Ne * scd_z / (Ne * acd_z + Nh * ccd_z).
+        The ratios are accumulated in log-space to avoid over/underflow for
+        high-z elements.
+
+        Ne
+            electron density profile
+        Nh
+            thermal neutral hydrogen profile
+        """
+        Nh = self._check_neutral_density(Ne, Nh)
+
+        self.Ne, self.Nh = Ne, Nh  # type: ignore
+
+        scd, acd, ccd = self.scd_spec, self.acd_spec, self.ccd_spec
+
+        x1_coord = scd.coords[[k for k in scd.dims if k != "ion_charge"][0]]
+        self.x1_coord = x1_coord
+
+        ionisation = (Ne * scd).transpose("ion_charge", ...)
+        recombination = Ne * acd
+        if Nh is not None and ccd is not None:
+            recombination = recombination + Nh * ccd
+        recombination = recombination.transpose(*ionisation.dims)
+
+        # Negative rates can only result from spline overshoots close to zero
+        ionisation_rates = np.maximum(ionisation.values, 0.0)
+        recombination_rates = np.maximum(recombination.values, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_ratio = np.log(ionisation_rates) - np.log(recombination_rates)
+        # A charge which neither ionises nor recombines decouples the higher
+        # charges from the chain, these are left empty
+        log_ratio[(ionisation_rates == 0) & (recombination_rates == 0)] = -np.inf
+        log_F_z = np.zeros((self.num_of_ion_charge,) + log_ratio.shape[1:])
+        with np.errstate(invalid="ignore"):
+            log_F_z[1:] = np.cumsum(log_ratio, axis=0)
+        log_F_z[np.isnan(log_F_z)] = -np.inf
+        log_F_z -= np.max(log_F_z, axis=0)
+        F_z_tinf = np.exp(log_F_z)
+        F_z_tinf /= np.sum(F_z_tinf, axis=0)
+
+        F_z_tinf = DataArray(
+            # Complex type casting for compatibility with eigen calculation results
+            data=F_z_tinf.astype(dtype=np.complex128),
+            coords={
+                dim: ionisation.coords[dim]
+                for dim in ionisation.dims[1:]
+                if dim in ionisation.coords
+            },
+            dims=ionisation.dims,
+        ).assign_coords(
+            ion_charge=np.linspace(
+                0, self.num_of_ion_charge - 1, self.num_of_ion_charge
+            )
+        )
+
+        self.F_z_tinf = F_z_tinf
+
+        return np.real(F_z_tinf)
+
     def calc_eigen_vals_and_vecs(
         self,
     ):
@@ -234,12 +392,12 @@ class FractionalAbundance(Operator):
 
         return eig_vals, eig_vecs
 
-    def calc_eigen_coeffs(
+    def _format_F_z_t0(
         self,
         F_z_t0: DataArray = None,
     ):
-        """Calculates the coefficients from the eigenvalues and eigenvectors for the
-        time evolution equation.
+        """Formats the initial fractional abundance for the time evolution equation,
+        defaulting to all of the element being neutral.
 
         F_z_t0
             Initial fractional abundance for given impurity element. (Optional)
@@ -273,7 +431,7 @@ class FractionalAbundance(Operator):
                 raise ValueError("F_z_t0 must be at most 2-dimensional.")
 
             F_z_t0 = F_z_t0 / np.sum(F_z_t0, axis=0)
-            F_z_t0 = F_z_t0.as_type(dtype=np.complex128)  # type: ignore
+            F_z_t0 = F_z_t0.astype(dtype=np.complex128)  # type: ignore
 
             F_z_t0 = DataArray(
                 data=F_z_t0.values,  # type: ignore
@@ -289,6 +447,22 @@ class FractionalAbundance(Operator):
                 dims=["ion_charge", x1_coord.dims[0]],
             )
 
+        return F_z_t0
+
+    def calc_eigen_coeffs(
+        self,
+        F_z_t0: DataArray = None,
+    ):
+        """Calculates the coefficients from the eigenvalues and eigenvectors for the
+        time evolution equation.
+
+        F_z_t0
+            Initial fractional abundance for given impurity element. (Optional)
+        """
+        x1_coord = self.x1_coord
+
+        F_z_t0 = self._format_F_z_t0(F_z_t0)
+
         eig_vals = self.eig_vals
         eig_vecs_inv = np.zeros(self.eig_vecs.shape, dtype=np.complex128)
         for ix1 in range(x1_coord.size):
@@ -343,6 +517,97 @@ class FractionalAbundance(Operator):
 
         return F_z_t
 
+    def calc_eigen_vals_and_vecs_batched(
+        self,
+    ):
+        """Calculates the eigenvalues and eigenvectors of the ionisation balance
+        matrix for all points at once, stacking the matrices along the first axis.
+        """
+        x1_coord = self.x1_coord
+        matrices = np.reshape(
+            self.ionisation_balance_matrix,
+            (self.num_of_ion_charge, self.num_of_ion_charge, x1_coord.size),
+        )
+
+        eig_vals, eig_vecs = np.linalg.eig(np.moveaxis(matrices, -1, 0))
+
+        self.eig_vals = np.moveaxis(eig_vals, 0, -1).astype(dtype=np.complex128)
+        self.eig_vecs = np.moveaxis(eig_vecs, 0, -1).astype(dtype=np.complex128)
+
+        return self.eig_vals, self.eig_vecs
+
+    def calc_eigen_coeffs_batched(
+        self,
+        F_z_t0: DataArray = None,
+    ):
+        """Calculates the coefficients from the eigenvalues and eigenvectors for the
+        time evolution equation for all points at once.
+
+        F_z_t0
+            Initial fractional abundance for given impurity element. (Optional)
+        """
+        F_z_t0 = self._format_F_z_t0(F_z_t0)
+
+        eig_vecs_inv = np.linalg.pinv(np.transpose(self.eig_vecs, (2, 1, 0)))
+
+        boundary_conds = np.asarray(F_z_t0 - self.F_z_tinf)
+
+        self.eig_coeffs = np.einsum("ix,xij->jx", boundary_conds, eig_vecs_inv)
+
+        F_z_t0 = np.abs(np.real(F_z_t0))  # type: ignore
+
+        self.F_z_t0 = F_z_t0  # type: ignore
+
+        return self.eig_coeffs, F_z_t0
+
+    def calculate_abundance_batched(self, tau: LabeledArray):
+        """Calculates the fractional abundance of all ionisation charges at time tau
+        for all points at once through broadcasting.
+
+        tau
+            Time after t0 (t0 is defined as the time at which F_z_t0 is taken).
+            Either a scalar, an array with one value per point, or a DataArray
+            with additional dimensions (e.g. a scan of tau values for each point),
+            which are added to the output without redoing the eigendecomposition.
+        """
+        x1_coord = self.x1_coord
+        x1_dim = x1_coord.dims[0]
+
+        if isinstance(tau, DataArray):
+            _tau = tau
+            if x1_dim in tau.dims:
+                # Same positional correspondence to x1 as the reference method
+                _tau = tau.assign_coords({x1_dim: x1_coord.values})
+        elif np.ndim(tau) == 0:
+            _tau = DataArray(tau)
+        elif np.ndim(tau) == 1:
+            _tau = DataArray(np.asarray(tau), coords=[(x1_dim, x1_coord.values)])
+        else:
+            raise ValueError(
+                "tau must be a scalar, a 1D array along x1 or a DataArray."
+            )
+
+        eig_vals = DataArray(
+            self.eig_vals,
+            coords=[("eig", np.arange(self.num_of_ion_charge)), x1_coord],
+        )
+        eig_coeffs = DataArray(self.eig_coeffs, coords=eig_vals.coords)
+        eig_vecs = DataArray(
+            self.eig_vecs,
+            coords=[self.F_z_tinf.coords["ion_charge"]]
+            + list(eig_vals.coords.values()),
+        )
+
+        F_z_t = self.F_z_tinf + xr.dot(
+            eig_coeffs * np.exp(eig_vals * _tau), eig_vecs, dim="eig"
+        )
+        F_z_t = np.abs(np.real(F_z_t)).transpose("ion_charge", x1_dim, ...)
+
+        self.F_z_t = F_z_t
+        self.tau = tau  # type: ignore
+
+        return F_z_t
+
     def __call__(  # type: ignore
         self,
         Te: DataArray,
@@ -351,6 +616,7 @@ class FractionalAbundance(Operator):
         tau: LabeledArray = None,
         F_z_t0: DataArray = None,
         full_run: bool = False,
+        solver: str = "tridiagonal",
     ) -> DataArray:
         """Executes all functions in correct order to calculate the fractional
         abundance.
@@ -367,24 +633,36 @@ class FractionalAbundance(Operator):
             Initial fractional abundance at t0
         full_run
             Boolean specifying whether to run the entire ordered workflow
+        solver
+            "tridiagonal" (vectorised equilibrium and batched time evolution) or
+            "null_space" (point by point reference implementation)
         """
+        if solver not in SOLVERS:
+            raise ValueError(f"solver must be one of {SOLVERS}")
+
         if full_run or not hasattr(self, "F_z_t"):
             self.interpolate_rates(Ne, Te)
 
-            self.calc_ionisation_balance_matrix(Ne, Nh)
-
-            self.calc_F_z_tinf()
+            if solver == "tridiagonal":
+                self.calc_F_z_tinf_tridiagonal(Ne, Nh)
+            else:
+                self.calc_ionisation_balance_matrix(Ne, Nh)
+                self.calc_F_z_tinf()
 
             if tau is None:
                 F_z_t = np.real(self.F_z_tinf)
                 self.F_z_t = F_z_t
                 return F_z_t
 
-            self.calc_eigen_vals_and_vecs()
-
-            self.calc_eigen_coeffs(F_z_t0)
-
-            F_z_t = self.calculate_abundance(tau)
+            if solver == "tridiagonal":
+                self.calc_ionisation_balance_matrix(Ne, Nh)
+                self.calc_eigen_vals_and_vecs_batched()
+                self.calc_eigen_coeffs_batched(F_z_t0)
+                F_z_t = self.calculate_abundance_batched(tau)
+            else:
+                self.calc_eigen_vals_and_vecs()
+                self.calc_eigen_coeffs(F_z_t0)
+                F_z_t = self.calculate_abundance(tau)
 
             self.F_z_t = F_z_t
         else:
@@ -424,6 +702,22 @@ class PowerLoss(Operator):
         imported_data["prb"] = self.prb
         if self.prc is not None:
             imported_data["prc"] = self.prc
+        self.build_interpolators()
+
+    def build_interpolators(self):
+        """Precomputes the splines of the rate tables used by interpolate_power"""
+        self.plt_interpolator = RateInterpolator(self.plt)
+        self.prb_interpolator = RateInterpolator(self.prb)
+        self.prc_interpolator = (
+            RateInterpolator(self.prc) if self.prc is not None else None
+        )
+
+    def __setstate__(self, state: dict):
+        """Restore pickled objects, building the interpolators if missing in
+        objects saved with previous versions"""
+        self.__dict__.update(state)
+        if "plt_interpolator" not in state:
+            self.build_interpolators()
 
     def interpolate_power(
         self,
@@ -439,22 +733,14 @@ class PowerLoss(Operator):
         """
 
         self.Ne, self.Te = Ne, Te  # type: ignore
-        plt_spec = self.plt.interp(electron_temperature=Te, method="cubic").interp(
-            electron_density=Ne, method="linear"
-        )
-
-        if self.prc is not None:
-            prc_spec = self.prc.interp(electron_temperature=Te, method="cubic").interp(
-                electron_density=Ne, method="linear"
-            )
 
+        plt_spec = self.plt_interpolator(Te, Ne)
+        prb_spec = self.prb_interpolator(Te, Ne)
+        if self.prc_interpolator is not None:
+            prc_spec = self.prc_interpolator(Te, Ne)
         else:
             prc_spec = None
 
-        prb_spec = self.prb.interp(electron_temperature=Te, method="cubic").interp(
-            electron_density=Ne, method="linear"
-        )
-
         self.plt_spec, self.prc_spec, self.prb_spec = plt_spec, prc_spec, prb_spec
         self.num_of_ion_charge = self.plt_spec.shape[0] + 1
 
@@ -505,41 +791,29 @@ class PowerLoss(Operator):
             [k for k in self.plt_spec.dims if k != "ion_charge"][0]
         ]
 
-        x1_coord = self.x1_coord
-
         plt, prb, prc = self.plt_spec, self.prb_spec, self.prc_spec
 
-        # TODO: make this faster by using DataArray methods
-        cooling_factor = xr.zeros_like(self.F_z_t)
-        for ix1 in range(x1_coord.size):
-            icharge = 0
-            cooling_factor[icharge, ix1] = (
-                plt[icharge, ix1] * self.F_z_t[icharge, ix1]  # type: ignore
+        F_z_t = self.F_z_t
+        if set(F_z_t.dims) == set(plt.dims):
+            F_z_t = F_z_t.transpose(*plt.dims)
+
+        # Shift coefficients so that index z of the ion_charge axis holds the
+        # contributions of the charge state z: line emission from z,
+        # recombination and charge exchange from z+1 -> z
+        zeros = np.zeros((1,) + plt.shape[1:])
+        plt_shifted = np.concatenate([np.asarray(plt), zeros])
+        prb_shifted = np.concatenate([zeros, np.asarray(prb)])
+        if (prc is not None) and (Nh is not None):
+            prc_shifted = np.concatenate(
+                [zeros, np.asarray((Nh / Ne * prc).transpose(*prc.dims))]
             )
-            for icharge in range(1, self.num_of_ion_charge - 1):
-                cooling_factor[icharge, ix1] = (
-                    plt[icharge, ix1]
-                    + (
-                        (Nh[ix1] / Ne[ix1]) * prc[icharge - 1, ix1]
-                        if (prc is not None) and (Nh is not None)
-                        else 0.0
-                    )
-                    + prb[icharge - 1, ix1]
-                ) * self.F_z_t[
-                    icharge, ix1
-                ]  # type: ignore
-
-            icharge = self.num_of_ion_charge - 1
-            cooling_factor[icharge, ix1] = (
-                (
-                    (Nh[ix1] / Ne[ix1]) * prc[icharge - 1, ix1]
-                    if (prc is not None) and (Nh is not None)
-                    else 0.0
-                )
-                + prb[icharge - 1, ix1]
-            ) * self.F_z_t[
-                icharge, ix1
-            ]  # type: ignore
+        else:
+            prc_shifted = 0.0
+
+        cooling_factor = xr.zeros_like(F_z_t)
+        cooling_factor.values = (plt_shifted + prc_shifted + prb_shifted) * np.asarray(
+            F_z_t
+        )
 
         self.cooling_factor = cooling_factor
 
@@ -583,7 +857,8 @@ def interpolate_results(
 ):
     """
     Interpolate fractional abundance or cooling factor on electron
-    temperature for fast processing
+    temperature for fast processing. Points of repeated electron temperature
+    (e.g. profiles of many times flattened together) are only used once.
 
     atomic_data
         Fractional abundance or cooling factor DataArrays
@@ -591,7 +866,9 @@ def interpolate_results(
         Electron temperature on which interpolation is to be performed
     """
     dim_old = [d for d in data.dims if d != "ion_charge"][0]
-    _data = data.assign_coords(electron_temperature=(dim_old, Te_data.data))
+    Te_values, unique = np.unique(np.asarray(Te_data), return_index=True)
+    _data = data.isel({dim_old: unique})
+    _data = _data.assign_coords(electron_temperature=(dim_old, Te_values))
     _data = _data.swap_dims({dim_old: "electron_temperature"}).drop_vars(dim_old)
     result = _data.interp(electron_temperature=Te_interp).drop_vars(
         ("electron_temperature",)
@@ -599,45 +876,132 @@ def interpolate_results(
     return result
 
 
+ADF11_QUANTITIES = ["scd", "acd", "ccd", "plt", "prb", "prc"]
+
+
+class AtomicDataRegistry:
+    """Process-wide store of ADAS rate tables and pre-built atomic data objects.
+
+    Entries are keyed by element and set of ADF11 years. Each entry holds the
+    rate tables (read-only, shared by all objects handed out) and templates of
+    FractionalAbundance and PowerLoss already evaluated on the default profiles.
+    Users receive shallow copies of the templates, which can be called freely
+    without affecting the templates or each other.
+
+    Parameters
+    ----------
+    maxsize
+        Maximum number of entries kept in memory, least recently used entries
+        are dropped first. None for no limit.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 16):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def key(element: str, adf11: Dict[str, str] = None) -> tuple:
+        """Registry key of an element with its ADF11 years (default from ADF11)"""
+        if adf11 is None:
+            adf11 = ADF11[element]
+        return (element, tuple((quant, adf11[quant]) for quant in ADF11_QUANTITIES))
+
+    def _get_entry(self, element: str, adf11: Dict[str, str] = None) -> dict:
+        key = self.key(element, adf11)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            adas_reader = ADASReader()
+            rates = {}
+            for quant, year in key[1]:
+                rate = adas_reader.get_adf11(quant, element, year)
+                rate.values.setflags(write=False)
+                rates[quant] = rate
+
+            Te, Ne, Nh, tau = default_profiles()
+            fract_abu = FractionalAbundance(
+                rates["scd"], rates["acd"], ccd=rates["ccd"]
+            )
+            F_z_t = fract_abu(Ne=Ne, Te=Te, Nh=Nh, tau=tau)
+            power_loss = PowerLoss(rates["plt"], rates["prb"], prc=rates["prc"])
+            power_loss(Te, F_z_t, Ne=Ne, Nh=Nh)
+
+            entry = {"rates": rates, "fract_abu": fract_abu, "power_loss": power_loss}
+            self._entries[key] = entry
+            self._evict()
+            return entry
+
+    def _evict(self):
+        if self.maxsize is None:
+            return
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def rates(self, element: str, adf11: Dict[str, str] = None) -> Dict[str, DataArray]:
+        """Shared read-only ADF11 rate tables of an element"""
+        return dict(self._get_entry(element, adf11)["rates"])
+
+    def get(
+        self, element: str, adf11: Dict[str, str] = None
+    ) -> Tuple["FractionalAbundance", "PowerLoss"]:
+        """FractionalAbundance and PowerLoss objects of an element, evaluated
+        on the default profiles and sharing the registry's rate tables"""
+        entry = self._get_entry(element, adf11)
+        return copy.copy(entry["fract_abu"]), copy.copy(entry["power_loss"])
+
+    def invalidate(self, element: str = None, adf11: Dict[str, str] = None):
+        """Drop the entry of an element (all year sets if adf11 not given),
+        or all entries if element is None"""
+        with self._lock:
+            if element is None:
+                self._entries.clear()
+            elif adf11 is not None:
+                self._entries.pop(self.key(element, adf11), None)
+            else:
+                for key in [key for key in self._entries if key[0] == element]:
+                    self._entries.pop(key)
+
+    def set_maxsize(self, maxsize: Optional[int]):
+        """Change the maximum number of entries, dropping entries if needed"""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def __contains__(self, element: str) -> bool:
+        return self.key(element) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+ATOMIC_DATA_REGISTRY = AtomicDataRegistry()
+
+
 def default_atomic_data(
     elements: Tuple[str, ...],
     Te: DataArray = None,
     Ne: DataArray = None,
     Nh: DataArray = None,
     tau: DataArray = None,
+    registry: AtomicDataRegistry = ATOMIC_DATA_REGISTRY,
 ):
     """
     Initialises atomic data classes with default ADAS files and runs the
-    __call__ with default plasma parameters
+    __call__ with default plasma parameters, or with the profiles given.
+    Rate tables and evaluations on the default profiles are shared through
+    the atomic data registry.
     """
-    if Te is None or Ne is None:
-        Te, Ne, Nh, tau = default_profiles()
-
-    # print_like("Initialize fractional abundance and power loss objects")
-    # fract_abu, power_loss_tot, power_loss_sxr = {}, {}, {}
     fract_abu, power_loss_tot = {}, {}
-    adas_reader = ADASReader()
     for elem in elements:
-        scd = adas_reader.get_adf11("scd", elem, ADF11[elem]["scd"])
-        acd = adas_reader.get_adf11("acd", elem, ADF11[elem]["acd"])
-        ccd = adas_reader.get_adf11("ccd", elem, ADF11[elem]["ccd"])
-        fract_abu[elem] = FractionalAbundance(scd, acd, ccd=ccd)
-        F_z_t = fract_abu[elem](Ne=Ne, Te=Te, Nh=Nh, tau=tau)
-        plt = adas_reader.get_adf11("plt", elem, ADF11[elem]["plt"])
-        prb = adas_reader.get_adf11("prb", elem, ADF11[elem]["prb"])
-        prc = adas_reader.get_adf11("prc", elem, ADF11[elem]["prc"])
-        power_loss_tot[elem] = PowerLoss(plt, prb, prc=prc)
-        power_loss_tot[elem](Te, F_z_t, Ne=Ne, Nh=Nh)
-
-        # try:
-        #     pls = adas_reader.get_adf11("pls", elem, ADF11[elem]["pls"])
-        #     prs = adas_reader.get_adf11("prs", elem, ADF11[elem]["prs"])
-        #     power_loss_sxr[elem] = PowerLoss(pls, prs)
-        #     power_loss_sxr[elem](Te, F_z_t, Ne=Ne, Nh=Nh)
-        # except Exception:
-        #     print(f"No SXR-filtered data available for element {elem}")
-
-    return fract_abu, power_loss_tot  # , power_loss_sxr
+        fract_abu[elem], power_loss_tot[elem] = registry.get(elem)
+        if Te is not None and Ne is not None:
+            F_z_t = fract_abu[elem](Ne=Ne, Te=Te, Nh=Nh, tau=tau)
+            power_loss_tot[elem](Te, F_z_t, Ne=Ne, Nh=Nh)
+
+    return fract_abu, power_loss_tot
 
 
 def default_profiles(n_rad: int = 20):
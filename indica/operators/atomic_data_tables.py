@@ -0,0 +1,357 @@
+"""Lookup tables of fractional abundance and cooling factors precomputed on a
+regular (Te, Ne, Nh/Ne, tau) grid."""
+
+from itertools import product
+from pathlib import Path
+from typing import Dict
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+import xarray as xr
+from xarray import DataArray
+
+from indica.numpy_typing import LabeledArray
+from indica.readers.adas import ADASReader
+from indica.readers.adas import ADF11
+from indica.utilities import CACHE_DIR
+from indica.utilities import hash_vals
+from .atomic_data import ATOMIC_DATA_REGISTRY
+from .atomic_data import FractionalAbundance
+from .atomic_data import PowerLoss
+
+TABLES_PATH = Path.home() / CACHE_DIR / "atomic_data_tables"
+DEFAULT_NH_NE = np.array([0.0, 1.0e-6, 1.0e-5, 1.0e-4, 1.0e-3, 1.0e-2])
+DEFAULT_TAU = np.logspace(-6.0, 0.0, 13)
+
+# Grid dimensions and whether the interpolation is performed in log-space
+GRID_DIMS = {
+    "electron_temperature": True,
+    "electron_density": True,
+    "neutral_fraction": False,
+    "residence_time": True,
+}
+
+
+class AtomicDataTable:
+    """Fractional abundance and cooling factors of a given element precomputed
+    on a regular grid and served through multilinear interpolation in
+    log(Te), log(Ne), Nh/Ne and log(tau). Values outside of the grid are
+    clamped to its edges.
+
+    fract_abu
+        FractionalAbundance operator of the element
+    power_loss
+        PowerLoss operator of the element
+    Te
+        Electron temperature grid (eV), default log-spaced over the ADF11 range
+        with 20 points per decade
+    Ne
+        Electron density grid (m**-3), default log-spaced over the ADF11 range
+        with 4 points per decade (finer grids are needed for accurate tau tables)
+    Nh_Ne
+        Thermal neutral to electron density ratio grid
+    tau
+        Residence time grid (s), if None only equilibrium tables are calculated
+    """
+
+    def __init__(
+        self,
+        fract_abu: FractionalAbundance,
+        power_loss: PowerLoss,
+        Te: np.ndarray = None,
+        Ne: np.ndarray = None,
+        Nh_Ne: np.ndarray = None,
+        tau: np.ndarray = None,
+    ):
+        self.fract_abu = fract_abu
+        self.power_loss = power_loss
+        self.include_neutrals = fract_abu.ccd is not None
+
+        rates = [fract_abu.scd, fract_abu.acd, power_loss.plt, power_loss.prb]
+        if Te is None:
+            Te = _default_grid(rates, "electron_temperature", 20)
+        if Ne is None:
+            Ne = _default_grid(rates, "electron_density", 4)
+        if Nh_Ne is None or not self.include_neutrals:
+            Nh_Ne = DEFAULT_NH_NE if self.include_neutrals else np.array([0.0])
+
+        self.Te = np.sort(np.asarray(Te, dtype=float))
+        self.Ne = np.sort(np.asarray(Ne, dtype=float))
+        self.Nh_Ne = np.sort(np.asarray(Nh_Ne, dtype=float))
+        self.tau = None if tau is None else np.sort(np.asarray(tau, dtype=float))
+        self.data: xr.Dataset = None
+
+    def build(self) -> xr.Dataset:
+        """Calculates fractional abundance and cooling factors on all grid points
+        in a single vectorised call to the atomic data operators.
+        """
+        grid_shape = (self.Te.size, self.Ne.size, self.Nh_Ne.size)
+        _Te, _Ne, _Nh_Ne = np.meshgrid(self.Te, self.Ne, self.Nh_Ne, indexing="ij")
+        index = np.arange(_Te.size)
+        Te = DataArray(_Te.ravel(), coords=[("index", index)])
+        Ne = DataArray(_Ne.ravel(), coords=[("index", index)])
+        Nh = Ne * _Nh_Ne.ravel() if self.include_neutrals else None
+        Nh_power = Nh if self.power_loss.prc is not None else None
+
+        fz = self.fract_abu(Te, Ne, Nh, full_run=True)
+        self.power_loss.interpolate_power(Ne, Te)
+        cooling_factor = self.power_loss.calculate_power_loss(Ne, fz, Nh_power)
+
+        coords = {
+            "electron_temperature": self.Te,
+            "electron_density": self.Ne,
+            "neutral_fraction": self.Nh_Ne,
+            "ion_charge": fz.coords["ion_charge"].values,
+        }
+        dims = ("electron_temperature", "electron_density", "neutral_fraction")
+        data_vars = {
+            "fz": (dims + ("ion_charge",), _to_table(fz.values, grid_shape)),
+            "cooling_factor": (
+                dims + ("ion_charge",),
+                _to_table(cooling_factor.values, grid_shape),
+            ),
+        }
+
+        if self.tau is not None:
+            # Time evolution for all tau re-using the same eigendecomposition
+            self.fract_abu.calc_ionisation_balance_matrix(Ne, Nh)
+            self.fract_abu.calc_eigen_vals_and_vecs_batched()
+            self.fract_abu.calc_eigen_coeffs_batched()
+            fz_tau = self.fract_abu.calculate_abundance_batched(
+                DataArray(self.tau, dims="residence_time")
+            )
+            cooling_factor_tau = xr.concat(
+                [
+                    self.power_loss.calculate_power_loss(
+                        Ne, fz_tau.isel(residence_time=itau), Nh_power
+                    )
+                    for itau in range(self.tau.size)
+                ],
+                "residence_time",
+            ).transpose(*fz_tau.dims)
+            coords["residence_time"] = self.tau
+            dims_tau = dims + ("residence_time", "ion_charge")
+            data_vars["fz_tau"] = (dims_tau, _to_table(fz_tau.values, grid_shape))
+            data_vars["cooling_factor_tau"] = (
+                dims_tau,
+                _to_table(cooling_factor_tau.values, grid_shape),
+            )
+
+        attrs = {
+            "element": str(self.fract_abu.scd.attrs.get("element", "")),
+            "filenames": ", ".join(
+                str(rate.attrs.get("filename", ""))
+                for rate in [
+                    self.fract_abu.scd,
+                    self.fract_abu.acd,
+                    self.fract_abu.ccd,
+                    self.power_loss.plt,
+                    self.power_loss.prb,
+                    self.power_loss.prc,
+                ]
+                if rate is not None
+            ),
+        }
+        self.data = xr.Dataset(data_vars, coords=coords, attrs=attrs)
+
+        return self.data
+
+    def write(self, filename: Union[str, Path]):
+        """Writes the tables to a netCDF file."""
+        if self.data is None:
+            self.build()
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        self.data.to_netcdf(filename)
+
+    def read(self, filename: Union[str, Path]) -> xr.Dataset:
+        """Reads tables from a netCDF file, replacing the current grid."""
+        self.data = xr.load_dataset(filename)
+        self.Te = self.data.electron_temperature.values
+        self.Ne = self.data.electron_density.values
+        self.Nh_Ne = self.data.neutral_fraction.values
+        self.tau = None
+        if "residence_time" in self.data.coords:
+            self.tau = self.data.residence_time.values
+
+        return self.data
+
+    def __call__(
+        self,
+        Te: DataArray,
+        Ne: DataArray,
+        Nh: DataArray = None,
+        tau: LabeledArray = None,
+    ) -> Tuple[DataArray, DataArray]:
+        """Interpolates fractional abundance and cooling factors from the tables.
+
+        Te
+            electron temperature profile
+        Ne
+            electron density profile
+        Nh
+            thermal neutral hydrogen profile
+        tau
+            residence time, if None returns equilibrium values
+
+        Returns
+        -------
+        Fractional abundance and cooling factors with dimensions
+        ("ion_charge", *Te.dims)
+        """
+        if self.data is None:
+            self.build()
+
+        if Nh is not None and not self.include_neutrals:
+            raise ValueError(
+                "Nh (Thermal hydrogen density) cannot be given when the table "
+                "is calculated without ccd (effective charge exchange recombination)."
+            )
+        if tau is not None and self.tau is None:
+            raise ValueError("tau cannot be given when the table has no tau grid.")
+
+        to_broadcast = [Te, Ne]
+        if Nh is not None:
+            to_broadcast.append(Nh)
+        if tau is not None:
+            to_broadcast.append(tau if isinstance(tau, DataArray) else DataArray(tau))
+        broadcast = xr.broadcast(*to_broadcast)
+        _Te, _Ne = broadcast[0], broadcast[1]
+
+        points = {
+            "electron_temperature": _Te.values,
+            "electron_density": _Ne.values,
+            "neutral_fraction": np.zeros_like(_Te.values),
+        }
+        if Nh is not None:
+            points["neutral_fraction"] = broadcast[2].values / _Ne.values
+        if tau is None:
+            fz_table, cooling_table = self.data.fz, self.data.cooling_factor
+        else:
+            points["residence_time"] = broadcast[-1].values
+            fz_table, cooling_table = self.data.fz_tau, self.data.cooling_factor_tau
+
+        indices, weights = [], []
+        for dim in fz_table.dims[:-1]:
+            _index, _weight = _linear_weights(
+                self.data.coords[dim].values, points[dim], GRID_DIMS[dim]
+            )
+            indices.append(_index)
+            weights.append(_weight)
+
+        dims = ("ion_charge",) + _Te.dims
+        coords = {dim: _Te.coords[dim] for dim in _Te.dims if dim in _Te.coords}
+        coords["ion_charge"] = fz_table.coords["ion_charge"]
+        fz = DataArray(
+            _multilinear_interp(fz_table.values, indices, weights),
+            dims=dims,
+            coords=coords,
+        )
+        cooling_factor = DataArray(
+            _multilinear_interp(cooling_table.values, indices, weights),
+            dims=dims,
+            coords=coords,
+        )
+
+        return fz, cooling_factor
+
+
+def _default_grid(rates: list, dim: str, points_per_decade: int) -> np.ndarray:
+    """Log-spaced grid spanning the range common to all rates"""
+    vmin = np.log10(np.max([rate.coords[dim].min() for rate in rates]))
+    vmax = np.log10(np.min([rate.coords[dim].max() for rate in rates]))
+    npoints = int(np.ceil((vmax - vmin) * points_per_decade)) + 1
+    return np.logspace(vmin, vmax, npoints)
+
+
+def _to_table(data: np.ndarray, grid_shape: tuple) -> np.ndarray:
+    """Reshape (ion_charge, index, ...) to (*grid_shape, ..., ion_charge)"""
+    data = np.moveaxis(data, 0, -1)
+    return data.reshape(grid_shape + data.shape[1:])
+
+
+def _linear_weights(
+    grid: np.ndarray, values: np.ndarray, log: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Lower grid index and weight of upper neighbour for linear interpolation,
+    clamping values to the grid edges"""
+    if log:
+        grid = np.log(grid)
+        with np.errstate(divide="ignore"):
+            values = np.log(values)
+    values = np.clip(values, grid[0], grid[-1])
+    if grid.size == 1:
+        return np.zeros(values.shape, dtype=int), np.zeros(values.shape)
+
+    index = np.clip(np.searchsorted(grid, values, side="right") - 1, 0, grid.size - 2)
+    weight = (values - grid[index]) / (grid[index + 1] - grid[index])
+    return index, weight
+
+
+def _multilinear_interp(table: np.ndarray, indices: list, weights: list) -> np.ndarray:
+    """Multilinear interpolation of table (*grid_shape, ion_charge) summing the
+    contributions of all corners of the enclosing grid cells
+
+    Returns
+    -------
+    Interpolated values with shape (ion_charge, *points_shape)
+    """
+    result = np.zeros(indices[0].shape + table.shape[-1:])
+    for corner in product((0, 1), repeat=len(indices)):
+        corner_weight = np.ones(indices[0].shape)
+        corner_index = []
+        for shift, index, weight, size in zip(
+            corner, indices, weights, table.shape[:-1]
+        ):
+            corner_weight = corner_weight * (weight if shift else 1.0 - weight)
+            corner_index.append(np.minimum(index + shift, size - 1))
+        result += corner_weight[..., np.newaxis] * table[tuple(corner_index)]
+    return np.moveaxis(result, -1, 0)
+
+
+def default_atomic_data_tables(
+    elements: Tuple[str, ...],
+    Te: np.ndarray = None,
+    Ne: np.ndarray = None,
+    Nh_Ne: np.ndarray = None,
+    tau: np.ndarray = None,
+    path: Union[str, Path] = TABLES_PATH,
+) -> Dict[str, AtomicDataTable]:
+    """
+    Initialises atomic data tables with default ADAS files, reading them from
+    disk if already calculated on the same grid from the same ADAS files,
+    otherwise calculating and writing them for later use.
+    """
+    adf11_path = ADASReader().path / "adf11"
+    tables: dict = {}
+    for elem in elements:
+        fract_abu, power_loss = ATOMIC_DATA_REGISTRY.get(elem)
+        sources = []
+        for rate in ATOMIC_DATA_REGISTRY.rates(elem).values():
+            filepath = adf11_path / rate.attrs["filename"]
+            if filepath.exists():
+                stat = filepath.stat()
+                sources.append([str(filepath), stat.st_mtime_ns, stat.st_size])
+        filename = Path(path) / (
+            elem
+            + "_"
+            + hash_vals(
+                adf11=ADF11[elem],
+                sources=sources,
+                Te=None if Te is None else np.asarray(Te).tolist(),
+                Ne=None if Ne is None else np.asarray(Ne).tolist(),
+                Nh_Ne=None if Nh_Ne is None else np.asarray(Nh_Ne).tolist(),
+                tau=None if tau is None else np.asarray(tau).tolist(),
+            )[:16]
+            + ".nc"
+        )
+        tables[elem] = AtomicDataTable(
+            fract_abu, power_loss, Te=Te, Ne=Ne, Nh_Ne=Nh_Ne, tau=tau
+        )
+        if filename.exists():
+            tables[elem].read(filename)
+        else:
+            tables[elem].write(filename)
+
+    return tables
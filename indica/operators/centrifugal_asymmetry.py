@@ -1,6 +1,7 @@
 from copy import deepcopy
 
 import numpy as np
+import xarray as xr
 from xarray import DataArray
 
 from indica import Equilibrium
@@ -43,6 +44,117 @@ def centrifugal_asymmetry_parameter(
     return asymmetry_parameter
 
 
+class FluxSurfaceMap:
+    """
+    Linear interpolation of 1D (rhop) profiles on a 2D (R, z) grid, with the
+    indices and weights of the interpolation calculated once and reused for
+    any profile, element or sample
+
+    Parameters
+    ----------
+    rhop_2d
+        rhop on the 2D grid, with dimensions (z, R) or (t, z, R)
+    rhop
+        rhop grid of the profiles to map
+    R_0
+        Major radius on the low-field side of the flux surfaces of the 2D grid,
+        with the dimensions of rhop_2d, required to map centrifugal asymmetries
+    """
+
+    def __init__(self, rhop_2d: DataArray, rhop: LabeledArray, R_0: DataArray = None):
+        self.rhop = np.asarray(rhop)
+        self.dims = rhop_2d.dims
+        self.coords = {dim: rhop_2d.coords[dim] for dim in rhop_2d.dims}
+        if "t" in rhop_2d.coords and "t" not in self.dims:
+            self.coords["t"] = rhop_2d.coords["t"]
+        self.coords["rhop"] = rhop_2d.variable
+
+        _rhop_2d = rhop_2d.values
+        index = np.clip(
+            np.searchsorted(self.rhop, _rhop_2d, side="right") - 1,
+            0,
+            self.rhop.size - 2,
+        )
+        weight = (_rhop_2d - self.rhop[index]) / np.diff(self.rhop)[index]
+        outside = ~((_rhop_2d >= self.rhop[0]) & (_rhop_2d <= self.rhop[-1]))
+        # NaN weights give NaN outside the profile grid, as xarray interp
+        weight[outside] = np.nan
+        self.index = index
+        self.weight = weight
+        self.time_index = None
+        if "t" in self.dims:
+            # Index of the flattened (t, rhop) profiles, to map each time slice
+            # of the 2D grid from the profile at the same time
+            t_axis = self.dims.index("t")
+            shape = [1] * index.ndim
+            shape[t_axis] = -1
+            t_offset = np.arange(index.shape[t_axis]) * self.rhop.size
+            self.time_index = index + t_offset.reshape(shape)
+
+        self.asymmetry_weight = None
+        if R_0 is not None:
+            R = rhop_2d.coords["R"]
+            self.asymmetry_weight = (R**2 - R_0**2).transpose(*self.dims).values
+
+    def _gather(self, profile: DataArray) -> tuple:
+        """Profile values interpolated on the 2D grid and the profile dimensions
+        not mapped"""
+        if not np.array_equal(profile.rhop, self.rhop):
+            profile = profile.interp(rhop=self.rhop)
+        if self.time_index is not None and "t" in profile.dims:
+            if not np.array_equal(profile.t, self.coords["t"]):
+                profile = profile.interp(t=self.coords["t"])
+            profile = profile.transpose(..., "t", "rhop")
+            index = self.time_index
+            lead_dims = profile.dims[:-2]
+        else:
+            profile = profile.transpose(..., "rhop")
+            index = self.index
+            lead_dims = profile.dims[:-1]
+
+        values = profile.values.reshape(profile.shape[: len(lead_dims)] + (-1,))
+        lower = values[..., index]
+        upper = values[..., index + 1]
+        return lower + (upper - lower) * self.weight, lead_dims, profile
+
+    def __call__(
+        self, profile: DataArray, asymmetry_parameter: DataArray = None
+    ) -> DataArray:
+        """
+        Map profiles to 2D
+
+        Parameters
+        ----------
+        profile
+            Profiles with dimension rhop, and t if the map has a time dimension
+        asymmetry_parameter
+            Centrifugal asymmetry parameter with the dimensions of the profile
+            (see centrifugal_asymmetry_parameter)
+        """
+        if asymmetry_parameter is not None:
+            if self.asymmetry_weight is None:
+                raise ValueError("R_0 is required to map asymmetric profiles")
+            profile, asymmetry_parameter = xr.broadcast(profile, asymmetry_parameter)
+            asymmetry_parameter = asymmetry_parameter.transpose(*profile.dims)
+
+        values, lead_dims, _profile = self._gather(profile)
+        if asymmetry_parameter is not None:
+            asymmetry, _, _ = self._gather(asymmetry_parameter)
+            values = values * np.exp(asymmetry * self.asymmetry_weight)
+
+        coords = {
+            name: coord
+            for name, coord in _profile.coords.items()
+            if name != "rhop" and (name in lead_dims or name not in self.coords)
+        }
+        coords.update(
+            {name: coord for name, coord in self.coords.items() if name not in coords}
+        )
+        return DataArray(
+            values, coords=coords, dims=lead_dims + self.dims, attrs=profile.attrs
+        )
+
+
 def centrifugal_asymmetry_2d_map(
     profile_to_map: DataArray,
     asymmetry_parameter: DataArray,
@@ -50,25 +162,46 @@ def centrifugal_asymmetry_2d_map(
     t: LabeledArray = None,
 ):
     """Map centrifugal asymmetric profiles to 2D"""
-
     if t is None:
         t = profile_to_map.t.values
 
-    if "t" in profile_to_map.dims:
-        _profile_to_map = profile_to_map.interp(t=t)
-    else:
-        _profile_to_map = profile_to_map
-    if "t" in asymmetry_parameter.dims:
-        _asymmetry_parameter = asymmetry_parameter.interp(t=t)
-    else:
-        _asymmetry_parameter = asymmetry_parameter
-
-    rho_2d = equilibrium.rhop.interp(t=t)
-    R_0 = equilibrium.rmjo.interp(t=t).interp(rhop=rho_2d).drop_vars("rhop")
-
-    _profile_2d = _profile_to_map.interp(rhop=rho_2d).drop_vars("rhop")
-    profile_2d = _profile_2d * np.exp(
-        _asymmetry_parameter.interp(rhop=rho_2d) * (rho_2d.R**2 - R_0**2)
+    return centrifugal_asymmetry_2d_mapping(profile_to_map.rhop, equilibrium, t=t)(
+        profile_to_map, asymmetry_parameter
     )
 
-    return profile_2d
+
+def centrifugal_asymmetry_2d_mapping(
+    rhop: LabeledArray,
+    equilibrium: Equilibrium,
+    t: LabeledArray = None,
+    R: DataArray = None,
+    z: DataArray = None,
+) -> FluxSurfaceMap:
+    """
+    Mapping of profiles on the rhop grid to the (R, z) grid of the equilibrium,
+    or to the (R, z) grid given, at times t
+
+    Parameters
+    ----------
+    rhop
+        rhop grid of the profiles to map
+    equilibrium
+        Equilibrium object
+    t
+        Times of the mapping, default all equilibrium times
+    R, z
+        2D grid of the mapping, default the equilibrium grid
+    """
+    rho_2d = equilibrium.rhop
+    if t is not None:
+        rho_2d = rho_2d.interp(t=t)
+    if R is not None and z is not None:
+        rho_2d = rho_2d.interp(R=R, z=z)
+    rho_2d = rho_2d.drop_vars(
+        [coord for coord in rho_2d.coords if coord not in rho_2d.dims + ("t",)]
+    )
+    rmjo = equilibrium.rmjo
+    if t is not None:
+        rmjo = rmjo.interp(t=t)
+    R_0 = rmjo.interp(rhop=rho_2d).drop_vars("rhop")
+    return FluxSurfaceMap(rho_2d, rhop, R_0=R_0)
@@ -10,7 +10,7 @@ from xarray import DataArray
 from indica.converters import LineOfSightTransform
 from indica.numpy_typing import ArrayLike
 from indica.numpy_typing import LabeledArray
-from indica.operators.centrifugal_asymmetry import centrifugal_asymmetry_2d_map
+from indica.operators.centrifugal_asymmetry import centrifugal_asymmetry_2d_mapping
 
 DataArrayCoords = Tuple[DataArray, DataArray]
 
@@ -123,12 +123,7 @@ class InvertPoloidalAsymmetry:
                 bc_asymmetry,
             )
             asymmetry_parameter = DataArray(asymmetry_spline(xspl), coords=coords)
-            profile_2d = centrifugal_asymmetry_2d_map(
-                profile_to_map,
-                asymmetry_parameter,
-                equilibrium=equilibrium,
-                t=t,
-            )
+            profile_2d = mapping(profile_to_map, asymmetry_parameter)
             return profile_2d, profile_to_map, asymmetry_parameter
 
         def residuals(yknots_concat):
@@ -181,6 +176,8 @@ class InvertPoloidalAsymmetry:
             _data = data.sel(t=t).values
             _error = error.sel(t=t).values
             _x = np.arange(len(_data))
+            # 2D mapping of the time slice, reused by all iterations of the fit
+            mapping = centrifugal_asymmetry_2d_mapping(xspl, equilibrium, t=t)
 
             if debug:
                 plt.ioff()
@@ -1,10 +1,17 @@
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-from functools import lru_cache
+from functools import partial
 import hashlib
+import json
+from pathlib import Path
 import pickle
 from typing import Callable
 from typing import Optional
 from typing import Tuple
+from typing import Union
+from warnings import warn
 
 import numpy as np
 import xarray as xr
@@ -14,12 +21,45 @@ from indica.configs import MACHINE_CONFS
 from indica.converters.time import get_tlabels_dt
 from indica.numpy_typing import LabeledArray
 from indica.operators.atomic_data import default_atomic_data
+from indica.operators.atomic_data_tables import default_atomic_data_tables
+from indica.operators.atomic_data_tables import DEFAULT_TAU
+from indica.operators.centrifugal_asymmetry import centrifugal_asymmetry_2d_mapping
+from indica.operators.centrifugal_asymmetry import FluxSurfaceMap
 import indica.physics as ph
 from indica.profilers.profiler_base import ProfilerBase
+from indica.utilities import assign_datatype
 from indica.utilities import format_coord
 from indica.utilities import format_dataarray
 from indica.utilities import get_element_info
 
+# Independent plasma quantities, whose modification invalidates the cached
+# dependent quantities, and other attributes the latter depend on
+INDEPENDENT_QUANTITIES = [
+    "electron_temperature",
+    "electron_density",
+    "neutral_density",
+    "tau",
+    "ion_temperature",
+    "toroidal_rotation",
+    "impurity_density",
+    "fast_ion_density",
+    "parallel_fast_ion_pressure",
+    "perpendicular_fast_ion_pressure",
+]
+TRACKED_QUANTITIES = INDEPENDENT_QUANTITIES + [
+    "fract_abu",
+    "power_loss_tot",
+    "atomic_data_tables",
+    "full_run",
+    "use_atomic_data_tables",
+]
+# Atomic data attributes, default ones assigned on first use if not set
+ATOMIC_DATA = ["fract_abu", "power_loss_tot", "atomic_data_tables"]
+# Version of the format written by Plasma.write_snapshot
+SNAPSHOT_VERSION = 1
+# Pools available to evaluate the atomic data of the elements concurrently
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
 
 class Plasma:
     def __init__(
@@ -32,10 +72,16 @@ class Plasma:
         impurity_concentration: Tuple[float, ...] = (0.02, 0.001),  # should be deleted!
         main_ion: str = "h",
         full_run: bool = False,
+        use_atomic_data_tables: bool = False,
+        atomic_data_tables_grid: dict = None,
         n_rad: int = 41,
         n_R: int = 100,
         n_z: int = 100,
         verbose: bool = False,
+        hash_check: bool = False,
+        n_samples: int = None,
+        n_workers: int = None,
+        executor: str = "thread",
     ):
         """
         Class for plasma objects.
@@ -59,14 +105,48 @@ class Plasma:
         full_run
             If True: compute ionisation balance at every iteration
             If False: calculate default and interpolate
+        use_atomic_data_tables
+            If True: interpolate fractional abundance and cooling factors from
+            tables precomputed on a (Te, Ne, Nh/Ne, tau) grid (see
+            default_atomic_data_tables), overrides full_run
+        atomic_data_tables_grid
+            Grid of the atomic data tables, dictionary with any of the keys Te,
+            Ne, Nh_Ne and tau passed to default_atomic_data_tables, default
+            {"tau": DEFAULT_TAU}
+        hash_check
+            If True: also hash the content of the independent quantities when
+            reading dependent ones, recalculating them (with a warning) if
+            quantities have been modified in place without bump_generation
+        n_samples
+            If given, plasma quantities have a leading "sample" dimension of this
+            length, to evaluate an ensemble of plasmas (e.g. the walkers of an
+            ensemble sampler) at once
+        n_workers
+            If given, evaluate the fractional abundance and power loss of the
+            different elements concurrently with this number of workers
+        executor
+            "thread" or "process", pool used with n_workers. The pool is
+            restarted when n_workers or executor are changed, use close() or
+            the plasma as a context manager to shut it down
         """
+        self._generations = {name: 0 for name in TRACKED_QUANTITIES}
+        self.hash_check = hash_check
         self.equilibrium: Equilibrium
+        self.machine = machine
         self.machine_conf = MACHINE_CONFS[machine]()
         self.tstart = tstart
         self.tend = tend
         self.dt = dt
         self.full_run = full_run
+        self.use_atomic_data_tables = use_atomic_data_tables
+        if atomic_data_tables_grid is None:
+            atomic_data_tables_grid = {"tau": DEFAULT_TAU}
+        self.atomic_data_tables_grid = atomic_data_tables_grid
         self.verbose = verbose
+        self.n_samples = n_samples
+        self.n_workers = n_workers
+        self.executor = executor
+        self._executor_pool: Optional[Executor] = None
         elements: Tuple[str, ...] = (main_ion,)
         for elem in impurities:
             elements += (elem,)
@@ -116,89 +196,75 @@ class Plasma:
         nr = len(self.rhop)
         nel = len(self.elements)
         nimp = len(self.impurities)
-        data1d_time = np.zeros(nt)
-        data2d = np.zeros((nt, nr))
-        data2d_elem = np.zeros((nel, nt))
-        data3d = np.zeros((nel, nt, nr))
-        data3d_imp = np.zeros((nimp, nt, nr))
-
-        coords1d_time = {"t": self.t}
-        coords2d = {"t": self.t, self.rho_type: self.rhop}
-        coords2d_elem = {"element": list(self.elements), "t": self.t}
+        coords_sample: dict = {}
+        shape_sample: tuple = ()
+        if n_samples is not None:
+            coords_sample = {"sample": format_coord(np.arange(n_samples), "sample")}
+            shape_sample = (n_samples,)
+        coords1d_time = {**coords_sample, "t": self.t}
+        coords2d = {**coords_sample, "t": self.t, self.rho_type: self.rhop}
+        coords2d_elem = {**coords_sample, "element": list(self.elements), "t": self.t}
         coords3d = {
+            **coords_sample,
             "element": list(self.elements),
             "t": self.t,
             self.rho_type: self.rhop,
         }
         coords3d_imp = {
+            **coords_sample,
             "element": list(self.impurities),
             "t": self.t,
             self.rho_type: self.rhop,
         }
 
-        # Independent plasma quantities
-        self.electron_temperature = format_dataarray(
-            data2d, "electron_temperature", coords2d, make_copy=True
-        )
-        self.electron_density = format_dataarray(
-            data2d, "electron_density", coords2d, make_copy=True
+        # Build the coordinates once per shape and share them between quantities
+        template1d_time = format_dataarray(
+            np.zeros(shape_sample + (nt,)), "stored_energy", coords1d_time
         )
-        self.neutral_density = format_dataarray(
-            data2d, "neutral_density", coords2d, make_copy=True
+        template2d = format_dataarray(
+            np.zeros(shape_sample + (nt, nr)), "electron_temperature", coords2d
         )
-        self.tau = format_dataarray(data2d, "residence_time", coords2d, make_copy=True)
-        self.ion_temperature = format_dataarray(
-            data2d, "ion_temperature", coords2d, make_copy=True
+        template2d_elem = format_dataarray(
+            np.zeros(shape_sample + (nel, nt)), "total_radiated_power", coords2d_elem
         )
-        self.toroidal_rotation = format_dataarray(
-            data2d, "toroidal_rotation", coords2d, make_copy=True
+        template3d = format_dataarray(
+            np.zeros(shape_sample + (nel, nt, nr)), "ion_density", coords3d
         )
-        self.impurity_density = format_dataarray(
-            data3d_imp, "impurity_density", coords3d_imp, make_copy=True
+        template3d_imp = format_dataarray(
+            np.zeros(shape_sample + (nimp, nt, nr)), "impurity_density", coords3d_imp
         )
-        self.fast_ion_density = format_dataarray(
-            data2d, "fast_ion_density", coords2d, make_copy=True
+
+        # Independent plasma quantities
+        self.electron_temperature = zeros_like_template(
+            template2d, "electron_temperature"
         )
-        self.parallel_fast_ion_pressure = format_dataarray(
-            data2d, "parallel_fast_ion_pressure", coords2d, make_copy=True
+        self.electron_density = zeros_like_template(template2d, "electron_density")
+        self.neutral_density = zeros_like_template(template2d, "neutral_density")
+        self.tau = zeros_like_template(template2d, "residence_time")
+        self.ion_temperature = zeros_like_template(template2d, "ion_temperature")
+        self.toroidal_rotation = zeros_like_template(template2d, "toroidal_rotation")
+        self.impurity_density = zeros_like_template(template3d_imp, "impurity_density")
+        self.fast_ion_density = zeros_like_template(template2d, "fast_ion_density")
+        self.parallel_fast_ion_pressure = zeros_like_template(
+            template2d, "parallel_fast_ion_pressure"
         )
-        self.perpendicular_fast_ion_pressure = format_dataarray(
-            data2d, "perpendicular_fast_ion_pressure", coords2d, make_copy=True
+        self.perpendicular_fast_ion_pressure = zeros_like_template(
+            template2d, "perpendicular_fast_ion_pressure"
         )
 
         # Private variables for class property variables
-        self._fast_ion_pressure = format_dataarray(
-            data2d, "fast_ion_pressure", coords2d, make_copy=True
-        )
-        self._electron_pressure = format_dataarray(
-            data2d, "electron_pressure", coords2d, make_copy=True
-        )
-        self._thermal_pressure = format_dataarray(
-            data2d, "thermal_pressure", coords2d, make_copy=True
-        )
-        self._pressure = format_dataarray(data2d, "pressure", coords2d, make_copy=True)
-        self._wth = format_dataarray(
-            data1d_time, "thermal_stored_energy", coords1d_time, make_copy=True
-        )
-        self._wfast = format_dataarray(
-            data1d_time, "fast_ion_stored_energy", coords1d_time, make_copy=True
-        )
-        self._wp = format_dataarray(
-            data1d_time, "stored_energy", coords1d_time, make_copy=True
-        )
-        self._zeff = format_dataarray(
-            data3d, "effective_charge", coords3d, make_copy=True
-        )
-        self._ion_density = format_dataarray(
-            data3d, "ion_density", coords3d, make_copy=True
-        )
-        self._meanz = format_dataarray(data3d, "mean_charge", coords3d, make_copy=True)
-        self._total_radiation = format_dataarray(
-            data3d, "total_radiation", coords3d, make_copy=True
-        )
-        self._prad_tot = format_dataarray(
-            data2d_elem, "total_radiated_power", coords2d_elem, make_copy=True
-        )
+        self._fast_ion_pressure = zeros_like_template(template2d, "fast_ion_pressure")
+        self._electron_pressure = zeros_like_template(template2d, "electron_pressure")
+        self._thermal_pressure = zeros_like_template(template2d, "thermal_pressure")
+        self._pressure = zeros_like_template(template2d, "pressure")
+        self._wth = zeros_like_template(template1d_time, "thermal_stored_energy")
+        self._wfast = zeros_like_template(template1d_time, "fast_ion_stored_energy")
+        self._wp = zeros_like_template(template1d_time, "stored_energy")
+        self._zeff = zeros_like_template(template3d, "effective_charge")
+        self._ion_density = zeros_like_template(template3d, "ion_density")
+        self._meanz = zeros_like_template(template3d, "mean_charge")
+        self._total_radiation = zeros_like_template(template3d, "total_radiation")
+        self._prad_tot = zeros_like_template(template2d_elem, "total_radiated_power")
 
         _fz = {}
         _lz_tot = {}
@@ -206,79 +272,157 @@ class Plasma:
             nz = self.element_z.sel(element=elem).values + 1
             ion_charge = format_coord(np.arange(nz), "ion_charge")
             coords3d_fract = {
+                **coords_sample,
                 "t": self.t,
                 "rhop": self.rhop,
                 "ion_charge": ion_charge,
             }
-            data3d_fz = np.full((len(self.t), len(self.rhop), nz), 0.0)
-            _fz[elem] = format_dataarray(
-                data3d_fz, "fractional_abundance", coords3d_fract, make_copy=True
-            )
-            _lz_tot[elem] = format_dataarray(
-                data3d_fz,
-                "total_radiation_loss_parameter",
+            template3d_fz = format_dataarray(
+                np.zeros(shape_sample + (nt, nr, nz)),
+                "fractional_abundance",
                 coords3d_fract,
-                make_copy=True,
+            )
+            _fz[elem] = zeros_like_template(template3d_fz, "fractional_abundance")
+            _lz_tot[elem] = zeros_like_template(
+                template3d_fz, "total_radiation_loss_parameter"
             )
         self._fz = _fz
         self._lz_tot = _lz_tot
 
-        # Parameter dependencies relating dependant to independent quantities
+        self._build_cached_calculations()
+
+    def _build_cached_calculations(self):
+        """Parameter dependencies relating dependant to independent quantities"""
         self.Fz = CachedCalculation(
             self.calc_fz,
             [
-                self.electron_density,
-                self.electron_temperature,
-                self.neutral_density,
-                self.tau,
+                "electron_density",
+                "electron_temperature",
+                "neutral_density",
+                "tau",
+                "fract_abu",
+                "atomic_data_tables",
+                "full_run",
+                "use_atomic_data_tables",
             ],
+            plasma=self,
+            time_slices=True,
         )
 
         self.Meanz = CachedCalculation(
             self.calc_meanz,
             [
-                self.fz,
+                self.Fz,
             ],
+            plasma=self,
+            time_slices=True,
         )
 
         self.Ion_density = CachedCalculation(
             self.calc_ion_density,
             [
-                self.electron_density,
-                self.electron_temperature,
-                self.impurity_density,
-                self.fast_ion_density,
+                "electron_density",
+                "impurity_density",
+                "fast_ion_density",
+                self.Meanz,
             ],
+            plasma=self,
+            time_slices=True,
         )
 
         self.Zeff = CachedCalculation(
             self.calc_zeff,
             [
-                self.electron_density,
-                self.ion_density,
-                self.meanz,
+                "electron_density",
+                self.Ion_density,
+                self.Meanz,
             ],
+            plasma=self,
+            time_slices=True,
         )
 
         self.Lz_tot = CachedCalculation(
             self.calc_lz_tot,
             [
-                self.electron_density,
-                self.electron_temperature,
-                self.fz,
-                self.neutral_density,
+                "electron_density",
+                "electron_temperature",
+                "neutral_density",
+                "power_loss_tot",
+                self.Fz,
             ],
+            plasma=self,
+            time_slices=True,
         )
 
         self.Total_radiation = CachedCalculation(
             self.calc_total_radiation,
             [
-                self.electron_density,
-                self.ion_density,
-                self.lz_tot,
+                "electron_density",
+                self.Ion_density,
+                self.Lz_tot,
             ],
+            plasma=self,
+            time_slices=True,
         )
 
+        self._cached_calculations = [
+            self.Fz,
+            self.Meanz,
+            self.Ion_density,
+            self.Zeff,
+            self.Lz_tot,
+            self.Total_radiation,
+        ]
+
+    def __getattr__(self, name):
+        """Assigns the default atomic data on first use if not set (see
+        build_atomic_data)"""
+        if name in ATOMIC_DATA and "elements" in self.__dict__:
+            if name == "atomic_data_tables":
+                self.__dict__[name] = default_atomic_data_tables(
+                    self.elements, **self.atomic_data_tables_grid
+                )
+            else:
+                fract_abu, power_loss_tot = default_atomic_data(self.elements)
+                self.__dict__.setdefault("fract_abu", fract_abu)
+                self.__dict__.setdefault("power_loss_tot", power_loss_tot)
+            return self.__dict__[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
+    def __setattr__(self, name, value):
+        if name == "executor" and value not in EXECUTORS:
+            raise ValueError(f"executor must be one of {list(EXECUTORS)}")
+        if name in ("n_workers", "executor"):
+            self.close()
+        super().__setattr__(name, value)
+        if name in TRACKED_QUANTITIES and "_generations" in self.__dict__:
+            self.bump_generation(name)
+        if name in ("equilibrium", "rhop", "t"):
+            self.__dict__["_geometry"] = {}
+
+    def bump_generation(self, *names: str, t: Optional[LabeledArray] = None):
+        """
+        Mark quantities as modified, invalidating the cached dependent quantities.
+        Must be called after modifying independent quantities in place (e.g. via
+        .loc), assigning new values to the attributes does it automatically.
+
+        Parameters
+        ----------
+        names
+            Names of the modified attributes
+        t
+            Times at which the attributes have been modified, so that only these
+            time slices of the dependent quantities are recalculated.
+            Default: all times
+        """
+        for name in names:
+            self._generations[name] = self._generations.get(name, 0) + 1
+        for calculation in self.__dict__.get("_cached_calculations", []):
+            if calculation.dependency_names().intersection(names):
+                calculation.mark_dirty(t)
+
     @property
     def time_to_calculate(self):
         return self._time_to_calculate
@@ -321,18 +465,18 @@ class Plasma:
 
     @property
     def wth(self):
-        for t in np.array(self.time_to_calculate, ndmin=1):
-            self._wth.loc[dict(t=t)] = (
-                3 / 2 * np.trapz(self.thermal_pressure.sel(t=t), self.volume.sel(t=t))
-            )
+        t = np.array(self.time_to_calculate, ndmin=1)
+        self._wth.loc[dict(t=t)] = (
+            3 / 2 * self.volume_integral(self.thermal_pressure, t)
+        )
         return self._wth
 
     @property
     def wfast(self):
-        for t in np.array(self.time_to_calculate, ndmin=1):
-            self._wfast.loc[dict(t=t)] = (
-                3 / 2 * np.trapz(self.fast_ion_pressure.sel(t=t), self.volume.sel(t=t))
-            )
+        t = np.array(self.time_to_calculate, ndmin=1)
+        self._wfast.loc[dict(t=t)] = (
+            3 / 2 * self.volume_integral(self.fast_ion_pressure, t)
+        )
         return self._wfast
 
     @property
@@ -343,37 +487,145 @@ class Plasma:
     def fz(self):
         return self.Fz()
 
-    def calc_fz(self):
-        for elem in self.elements:
-            for t in np.array(self.time_to_calculate, ndmin=1):
-                electron_temperature = self.electron_temperature.sel(t=t)
-                electron_density = self.electron_density.sel(t=t)
-                tau = None
-                if np.any(self.tau != 0):
-                    tau = self.tau.sel(t=t)
-                neutral_density = None
-                if np.any(self.neutral_density != 0):
-                    neutral_density = self.neutral_density.sel(t=t)
-                if any(
-                    np.logical_not((electron_temperature > 0) * (electron_density > 0))
-                ):
-                    continue
-                fz_tmp = self.fract_abu[elem](
-                    electron_temperature,
-                    Ne=electron_density,
-                    Nh=neutral_density,
-                    tau=tau,
-                    full_run=self.full_run,
-                )
-                self._fz[elem].loc[dict(t=t)] = fz_tmp.transpose()
+    def calc_fz(self, t: Optional[np.ndarray] = None):
+        (
+            t,
+            electron_temperature,
+            electron_density,
+            neutral_density,
+            tau,
+        ) = self._flatten_profiles(t)
+        if len(t) == 0:
+            return self._fz
+
+        if self.use_atomic_data_tables:
+            operators = [self.atomic_data_tables[elem] for elem in self.elements]
+        else:
+            operators = [self.fract_abu[elem] for elem in self.elements]
+        results = self.map_elements(
+            partial(
+                evaluate_fz,
+                Te=electron_temperature,
+                Ne=electron_density,
+                Nh=neutral_density,
+                tau=tau,
+                full_run=self.full_run,
+                use_atomic_data_tables=self.use_atomic_data_tables,
+            ),
+            operators,
+        )
+        for elem, (fz_tmp, operator) in zip(self.elements, results):
+            self._fz[elem].loc[dict(t=t)] = self._unflatten(fz_tmp, t)
+            if not self.use_atomic_data_tables:
+                # keep the state of operators evaluated in a process pool
+                self.fract_abu[elem] = operator
         return self._fz
 
+    def map_elements(self, function: Callable, *iterables) -> list:
+        """
+        Apply a function to per-element arguments, concurrently if n_workers is
+        set. Results are returned in the order of the arguments, so that they
+        are identical to the sequential evaluation.
+        """
+        if self.n_workers is None:
+            return list(map(function, *iterables))
+        if self._executor_pool is None:
+            self._executor_pool = EXECUTORS[self.executor](max_workers=self.n_workers)
+        return list(self._executor_pool.map(function, *iterables))
+
+    def close(self, wait: bool = True):
+        """Shut down the executor pool of map_elements, restarted on demand"""
+        executor_pool = self.__dict__.get("_executor_pool")
+        if executor_pool is not None:
+            executor_pool.shutdown(wait=wait)
+        self.__dict__["_executor_pool"] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close(wait=False)
+
+    @property
+    def profile_dims(self) -> Tuple[str, ...]:
+        """Dimensions of the independent profiles"""
+        if self.n_samples is None:
+            return ("t", self.rho_type)
+        return ("sample", "t", self.rho_type)
+
+    def _flatten_profiles(self, t: Optional[np.ndarray] = None) -> tuple:
+        """
+        Select the times to calculate where electron temperature and density are
+        positive, flattening (sample, t, rhop) profiles to a single "index"
+        dimension to evaluate the atomic data in one call
+
+        Parameters
+        ----------
+        t
+            Times to calculate, default time_to_calculate
+
+        Returns
+        -------
+        t
+            Selected times
+        electron_temperature, electron_density
+            Flattened profiles
+        neutral_density, tau
+            Flattened profiles, None if all zero
+        """
+        if t is None:
+            t = self.time_to_calculate
+        t = np.array(t, ndmin=1)
+        electron_temperature = self.electron_temperature.sel(t=t)
+        electron_density = self.electron_density.sel(t=t)
+        valid = ((electron_temperature > 0) * (electron_density > 0)).all(
+            [dim for dim in self.profile_dims if dim != "t"]
+        )
+        t = t[valid.values]
+
+        def flatten(data: xr.DataArray):
+            values = data.sel(t=t).transpose(*self.profile_dims).values.ravel()
+            return xr.DataArray(
+                values, coords={"index": np.arange(values.size)}, dims=["index"]
+            )
+
+        neutral_density = None
+        if np.any(self.neutral_density != 0):
+            neutral_density = flatten(self.neutral_density)
+        tau = None
+        if np.any(self.tau != 0):
+            tau = flatten(self.tau)
+        return (
+            t,
+            flatten(electron_temperature),
+            flatten(electron_density),
+            neutral_density,
+            tau,
+        )
+
+    def _unflatten(self, data: xr.DataArray, t: np.ndarray) -> np.ndarray:
+        """Reshape (ion_charge, index) data to ([sample,] t, rhop, ion_charge)"""
+        values = np.asarray(data.transpose("ion_charge", "index"))
+        shape = (len(t), len(self.rhop))
+        if self.n_samples is not None:
+            shape = (self.n_samples,) + shape
+        values = values.reshape((values.shape[0],) + shape)
+        return np.moveaxis(values, 0, -1)
+
     @property
     def zeff(self):
         return self.Zeff()
 
-    def calc_zeff(self):
-        self._zeff.values = self.ion_density * self.meanz**2 / self.electron_density
+    def calc_zeff(self, t: Optional[np.ndarray] = None):
+        sel = {} if t is None else {"t": t}
+        self._zeff.loc[sel] = (
+            self.ion_density.sel(sel)
+            * self.meanz.sel(sel) ** 2
+            / self.electron_density.sel(sel)
+        )
         return self._zeff
 
     @property
@@ -381,16 +633,19 @@ class Plasma:
         return self.Ion_density()
         # return self.calc_ion_density()
 
-    def calc_ion_density(self):
+    def calc_ion_density(self, t: Optional[np.ndarray] = None):
+        sel = {} if t is None else {"t": t}
+        impurity_density = self.impurity_density.sel(sel)
+        meanz = self.meanz.sel(sel)
         for elem in self.impurities:
-            self._ion_density.loc[dict(element=elem)] = self.impurity_density.sel(
+            self._ion_density.loc[dict(element=elem, **sel)] = impurity_density.sel(
                 element=elem
             )
 
-        self._ion_density.loc[dict(element=self.main_ion)] = (
-            self.electron_density
-            - self.fast_ion_density * self.meanz.sel(element=self.main_ion)
-            - (self.impurity_density * self.meanz).sum("element")
+        self._ion_density.loc[dict(element=self.main_ion, **sel)] = (
+            self.electron_density.sel(sel)
+            - self.fast_ion_density.sel(sel) * meanz.sel(element=self.main_ion)
+            - (impurity_density * meanz).sum("element")
         )
         return self._ion_density
 
@@ -398,43 +653,72 @@ class Plasma:
     def lz_tot(self):
         return self.Lz_tot()
 
-    def calc_lz_tot(self):
+    def calc_lz_tot(self, t: Optional[np.ndarray] = None):
         fz = self.fz
+        (
+            t,
+            electron_temperature,
+            electron_density,
+            neutral_density,
+            tau,
+        ) = self._flatten_profiles(t)
+        if len(t) == 0:
+            return self._lz_tot
+
+        operators, fz_flat = [], []
         for elem in self.elements:
-            for t in np.array(self.time_to_calculate, ndmin=1):
-                electron_density = self.electron_density.sel(t=t)
-                electron_temperature = self.electron_temperature.sel(t=t)
-                if any(
-                    np.logical_not((electron_temperature > 0) * (electron_density > 0))
-                ):
-                    continue
-                Fz = fz[elem].sel(t=t).transpose()
-                neutral_density = None
-                if np.any(self.neutral_density.sel(t=t) != 0):
-                    neutral_density = self.neutral_density.sel(t=t)
-                self._lz_tot[elem].loc[dict(t=t)] = self.power_loss_tot[elem](
-                    electron_temperature,
-                    Fz,
-                    Ne=electron_density,
-                    Nh=neutral_density,
-                    full_run=self.full_run,
-                ).transpose()
+            if self.use_atomic_data_tables:
+                operators.append(self.atomic_data_tables[elem])
+                fz_flat.append(None)
+                continue
+            _fz = fz[elem].sel(t=t).transpose("ion_charge", *self.profile_dims)
+            operators.append(self.power_loss_tot[elem])
+            fz_flat.append(
+                xr.DataArray(
+                    _fz.values.reshape((_fz.shape[0], -1)),
+                    coords={
+                        "ion_charge": _fz.ion_charge,
+                        "index": electron_temperature.index,
+                    },
+                    dims=["ion_charge", "index"],
+                )
+            )
+        results = self.map_elements(
+            partial(
+                evaluate_lz_tot,
+                Te=electron_temperature,
+                Ne=electron_density,
+                Nh=neutral_density,
+                tau=tau,
+                full_run=self.full_run,
+                use_atomic_data_tables=self.use_atomic_data_tables,
+            ),
+            operators,
+            fz_flat,
+        )
+        for elem, (lz_tmp, operator) in zip(self.elements, results):
+            self._lz_tot[elem].loc[dict(t=t)] = self._unflatten(lz_tmp, t)
+            if not self.use_atomic_data_tables:
+                # keep the state of operators evaluated in a process pool
+                self.power_loss_tot[elem] = operator
         return self._lz_tot
 
     @property
     def total_radiation(self):
         return self.Total_radiation()
 
-    def calc_total_radiation(self):
+    def calc_total_radiation(self, t: Optional[np.ndarray] = None):
+        sel = {} if t is None else {"t": t}
         lz_tot = self.lz_tot
-        ion_density = self.ion_density
+        ion_density = self.ion_density.sel(sel)
+        electron_density = self.electron_density.sel(sel)
         for elem in self.elements:
             total_radiation = (
-                lz_tot[elem].sum("ion_charge")
-                * self.electron_density
+                lz_tot[elem].sel(sel).sum("ion_charge")
+                * electron_density
                 * ion_density.sel(element=elem)
             )
-            self._total_radiation.loc[dict(element=elem)] = xr.where(
+            self._total_radiation.loc[dict(element=elem, **sel)] = xr.where(
                 total_radiation >= 0,
                 total_radiation,
                 0.0,
@@ -445,47 +729,99 @@ class Plasma:
     def meanz(self):
         return self.Meanz()
 
-    def calc_meanz(self):
+    def calc_meanz(self, t: Optional[np.ndarray] = None):
+        sel = {} if t is None else {"t": t}
         fz = self.fz
         for elem in self.elements:
-            self._meanz.loc[dict(element=elem)] = (fz[elem] * fz[elem].ion_charge).sum(
+            _fz = fz[elem].sel(sel)
+            self._meanz.loc[dict(element=elem, **sel)] = (_fz * _fz.ion_charge).sum(
                 "ion_charge"
             )
         return self._meanz
 
     @property
     def prad_tot(self):
-        total_radiation = self.total_radiation
-        for elem in self.elements:
-            for t in np.array(self.time_to_calculate, ndmin=1):
-                self._prad_tot.loc[dict(element=elem, t=t)] = np.trapz(
-                    total_radiation.sel(element=elem, t=t), self.volume.sel(t=t)
-                )
+        t = np.array(self.time_to_calculate, ndmin=1)
+        self._prad_tot.loc[dict(t=t)] = self.volume_integral(
+            self.total_radiation, t
+        ).transpose(*self._prad_tot.dims)
         return self._prad_tot
 
+    @property
+    def volume_weights(self):
+        """
+        Trapezoidal weights of the volume integral over rhop, such that
+        (data * volume_weights).sum("rhop") == np.trapz(data, volume), calculated
+        once per geometry
+        """
+        if "volume_weights" not in self._geometry:
+            volume = self.volume.transpose(..., self.rho_type)
+            dvolume = np.diff(volume.values, axis=-1) / 2.0
+            weights = np.zeros_like(volume.values)
+            weights[..., :-1] += dvolume
+            weights[..., 1:] += dvolume
+            self._geometry["volume_weights"] = volume.copy(data=weights)
+        return self._geometry["volume_weights"]
+
+    def volume_integral(self, data: xr.DataArray, t: np.ndarray = None):
+        """
+        Integrate data over the plasma volume for all times at once
+
+        Parameters
+        ----------
+        data
+            Quantity to integrate, with dimensions including (t, rhop)
+        t
+            Times at which to integrate, default all
+        """
+        weights = self.volume_weights
+        if t is not None:
+            data = data.sel(t=t)
+            weights = weights.sel(t=t)
+        return (data * weights).sum(self.rho_type, skipna=False)
+
     @property
     def volume(self):
-        return self.equilibrium.volume.interp(rhop=self.rhop, t=self.t)
+        return self.get_geometry("volume")
 
     @property
     def area(self):
-        return self.equilibrium.area.interp(rhop=self.rhop, t=self.t)
+        return self.get_geometry("area")
 
     @property
     def rmjo(self):
-        return self.equilibrium.rmjo.interp(rhop=self.rhop, t=self.t)
+        return self.get_geometry("rmjo")
 
     @property
     def rmji(self):
-        return self.equilibrium.rmji.interp(rhop=self.rhop, t=self.t)
+        return self.get_geometry("rmji")
 
     @property
     def rmag(self):
-        return self.equilibrium.rmag.interp(t=self.t)
+        return self.get_geometry("rmag")
 
     @property
     def zmag(self):
-        return self.equilibrium.zmag.interp(t=self.t)
+        return self.get_geometry("zmag")
+
+    def get_geometry(self, name: str) -> xr.DataArray:
+        """
+        Equilibrium quantity interpolated on the plasma (rhop, t) grid, calculated
+        on first access and cached until the equilibrium or grids are changed
+
+        Parameters
+        ----------
+        name
+            Name of the equilibrium attribute (e.g. "volume")
+        """
+        if name not in self._geometry:
+            data = getattr(self.equilibrium, name)
+            coords = {}
+            if self.rho_type in data.dims:
+                coords[self.rho_type] = self.rhop
+            coords["t"] = self.t
+            self._geometry[name] = data.interp(coords)
+        return self._geometry[name]
 
     @property
     def rmin(self):
@@ -527,37 +863,293 @@ class Plasma:
                 imp_dens = _imp_dens
 
             self.impurity_density.loc[dict(element=element, t=t)] = imp_dens.values
+            self.bump_generation("impurity_density", t=t)
 
     def set_equilibrium(self, equilibrium: Equilibrium):
-        """Assign equilibrium object and associated private variables"""
+        """Assign equilibrium object and associated private variables,
+        resetting the cached geometry quantities"""
         self.equilibrium = equilibrium
+        self._geometry: dict = {}
 
     def set_adf11(self, adf11: dict):
         self.adf11 = adf11
 
     def build_atomic_data(self):
         """
-        Assigns default atomic fractional abundance and radiated power operators
+        Assigns default atomic fractional abundance and radiated power operators,
+        and atomic data tables on atomic_data_tables_grid if these are used.
+        Tables already assigned to atomic_data_tables are kept (delete the
+        attribute to rebuild them on a new grid). Atomic data which is not
+        assigned is otherwise built on first use.
         """
         fract_abu, power_loss_tot = default_atomic_data(self.elements)
         self.fract_abu = fract_abu
         self.power_loss_tot = power_loss_tot
+        if self.use_atomic_data_tables:
+            atomic_data_tables = dict(self.__dict__.get("atomic_data_tables", {}))
+            missing = tuple(
+                elem for elem in self.elements if elem not in atomic_data_tables
+            )
+            if len(missing) > 0:
+                atomic_data_tables.update(
+                    default_atomic_data_tables(missing, **self.atomic_data_tables_grid)
+                )
+            self.atomic_data_tables = atomic_data_tables
+
+    @property
+    def flux_surface_map(self) -> FluxSurfaceMap:
+        """
+        Mapping of plasma profiles to the (R, z) grid of the plasma, calculated
+        once per geometry
+        """
+        if "flux_surface_map" not in self._geometry:
+            self._geometry["flux_surface_map"] = centrifugal_asymmetry_2d_mapping(
+                self.rhop, self.equilibrium, t=self.t, R=self.R, z=self.z
+            )
+        return self._geometry["flux_surface_map"]
 
-    # TODO: if ion asymmetry parameters are not == 0, calculate 2D (R, z) maps
-    def map_to_2d(self):
+    def map_to_2d(
+        self,
+        profile: xr.DataArray = None,
+        asymmetry_parameter: xr.DataArray = None,
+    ) -> xr.DataArray:
         """
-        Calculate total radiated power on a 2D poloidal plane
-        including effects from poloidal asymmetries
+        Map profiles to the (R, z) grid of the plasma, including effects from
+        centrifugal poloidal asymmetries
+
+        Parameters
+        ----------
+        profile
+            Profiles with dimensions (..., t, rhop), default total_radiation
+        asymmetry_parameter
+            Centrifugal asymmetry parameter of the profiles (see
+            indica.operators.centrifugal_asymmetry.centrifugal_asymmetry_parameter)
         """
-        print("\n Not implemented yet")
+        if profile is None:
+            profile = self.total_radiation
+        return self.flux_surface_map(profile, asymmetry_parameter=asymmetry_parameter)
+
+    def __getstate__(self) -> dict:
+        """Pickle without the executor pool, restarted on demand"""
+        state = self.__dict__.copy()
+        state["_executor_pool"] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore pickled objects, setting defaults for attributes missing in
+        objects saved with previous versions"""
+        state.setdefault("use_atomic_data_tables", False)
+        state.setdefault("atomic_data_tables_grid", {"tau": DEFAULT_TAU})
+        state.setdefault("hash_check", False)
+        state.setdefault("_geometry", {})
+        state.setdefault("n_samples", None)
+        state.setdefault("n_workers", None)
+        state.setdefault("executor", "thread")
+        state["_executor_pool"] = None
+        if "machine" not in state:
+            state["machine"] = [
+                machine
+                for machine, conf in MACHINE_CONFS.items()
+                if isinstance(state["machine_conf"], conf)
+            ][0]
+        self.__dict__.update(state)
+        if "_generations" not in state:
+            self.__dict__["_generations"] = {name: 0 for name in TRACKED_QUANTITIES}
+        if "_cached_calculations" not in state:
+            self._build_cached_calculations()
 
     def write_to_pickle(self, pulse: int = None):
+        warn(
+            "write_to_pickle is deprecated, use write_snapshot instead",
+            DeprecationWarning,
+        )
         with open(f"data_{pulse}.pkl", "wb") as f:
             pickle.dump(
                 self,
                 f,
             )
 
+    def write_snapshot(
+        self, filename: Union[str, Path], equilibrium_reference: str = None
+    ):
+        """
+        Write the settings and independent quantities to a netCDF file, chunked
+        by time slice. Dependent quantities, atomic data and the equilibrium are
+        not saved, see read_snapshot.
+
+        Parameters
+        ----------
+        filename
+            Path of the netCDF file
+        equilibrium_reference
+            Description of the equilibrium (e.g. pulse and code) saved with the
+            snapshot to identify which equilibrium to assign when reading it
+        """
+        settings = {
+            "machine": self.machine,
+            "tstart": self.tstart,
+            "tend": self.tend,
+            "dt": self.dt,
+            "main_ion": self.main_ion,
+            "impurities": list(self.impurities),
+            "impurity_concentration": list(self.impurity_concentration),
+            "full_run": self.full_run,
+            "use_atomic_data_tables": self.use_atomic_data_tables,
+            "atomic_data_tables_grid": {
+                key: np.asarray(value).tolist()
+                for key, value in self.atomic_data_tables_grid.items()
+            },
+            "n_rad": len(self.rhop),
+            "n_R": len(self.R),
+            "n_z": len(self.z),
+            "verbose": self.verbose,
+            "hash_check": self.hash_check,
+            "n_samples": self.n_samples,
+            "n_workers": self.n_workers,
+            "executor": self.executor,
+        }
+        attrs = {
+            "snapshot_version": SNAPSHOT_VERSION,
+            "settings": json.dumps(settings),
+            "time_to_calculate": np.array(self.time_to_calculate, ndmin=1),
+        }
+        if equilibrium_reference is not None:
+            attrs["equilibrium_reference"] = equilibrium_reference
+
+        snapshot = xr.Dataset(
+            {name: getattr(self, name) for name in INDEPENDENT_QUANTITIES},
+            attrs=attrs,
+        )
+        encoding = {
+            name: {
+                "chunksizes": tuple(
+                    1 if dim == "t" else size
+                    for dim, size in zip(data.dims, data.shape)
+                )
+            }
+            for name, data in snapshot.data_vars.items()
+        }
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        snapshot.to_netcdf(filename, encoding=encoding)
+
+    @classmethod
+    def read_snapshot(
+        cls,
+        filename: Union[str, Path],
+        equilibrium: Equilibrium = None,
+        build_atomic_data: bool = False,
+    ):
+        """
+        Read a Plasma written with write_snapshot. The atomic data is attached
+        from the shared atomic data registry on first use
+
+        Parameters
+        ----------
+        filename
+            Path of the netCDF file
+        equilibrium
+            Equilibrium to assign, e.g. the one identified by the
+            equilibrium_reference attribute of the snapshot
+        build_atomic_data
+            If True: assign the default atomic data operators when reading
+        """
+        with xr.open_dataset(filename) as snapshot:
+            version = snapshot.attrs.get("snapshot_version")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"Snapshot version {version} of {filename} not supported"
+                )
+            settings = json.loads(snapshot.attrs["settings"])
+            settings["impurities"] = tuple(settings["impurities"])
+            settings["impurity_concentration"] = tuple(
+                settings["impurity_concentration"]
+            )
+            plasma = cls(**settings)
+            for name in INDEPENDENT_QUANTITIES:
+                data = getattr(plasma, name)
+                _data = snapshot[name]
+                for dim in data.dims:
+                    if not np.array_equal(_data[dim].values, data[dim].values):
+                        raise ValueError(
+                            f"Coordinate {dim} of {name} in {filename} "
+                            "does not match the plasma settings"
+                        )
+                data.values[...] = _data.transpose(*data.dims).values
+            plasma.time_to_calculate = snapshot.attrs["time_to_calculate"]
+        plasma.bump_generation(*INDEPENDENT_QUANTITIES)
+
+        if build_atomic_data:
+            plasma.build_atomic_data()
+        if equilibrium is not None:
+            plasma.set_equilibrium(equilibrium)
+        return plasma
+
+
+def evaluate_fz(
+    operator: Callable,
+    Te: xr.DataArray,
+    Ne: xr.DataArray,
+    Nh: Optional[xr.DataArray],
+    tau: Optional[xr.DataArray],
+    full_run: bool,
+    use_atomic_data_tables: bool,
+) -> Tuple[xr.DataArray, Callable]:
+    """Fractional abundance of one element, at module level so that it can be
+    evaluated in a process pool. The operator is returned with the result since
+    in a process pool its state (e.g. after a full_run) is set on a copy"""
+    if use_atomic_data_tables:
+        fz, _ = operator(Te, Ne, Nh=Nh, tau=tau)
+        return fz, operator
+    return operator(Te, Ne=Ne, Nh=Nh, tau=tau, full_run=full_run), operator
+
+
+def evaluate_lz_tot(
+    operator: Callable,
+    fz: Optional[xr.DataArray],
+    Te: xr.DataArray,
+    Ne: xr.DataArray,
+    Nh: Optional[xr.DataArray],
+    tau: Optional[xr.DataArray],
+    full_run: bool,
+    use_atomic_data_tables: bool,
+) -> Tuple[xr.DataArray, Callable]:
+    """Total radiation loss parameter of one element, at module level so that it
+    can be evaluated in a process pool. The operator is returned with the result
+    since in a process pool its state (e.g. after a full_run) is set on a copy"""
+    if use_atomic_data_tables:
+        _, lz_tot = operator(Te, Ne, Nh=Nh, tau=tau)
+        return lz_tot, operator
+    return operator(Te, fz, Ne=Ne, Nh=Nh, full_run=full_run), operator
+
+
+def read_only_view(result):
+    """
+    Read-only view of a DataArray, or dictionary of DataArrays, sharing its data,
+    coordinates and attributes, so that cached results can be returned without
+    copying. The view reflects later in place recalculations of the result: use
+    .copy() to keep or modify the values.
+    """
+    if isinstance(result, dict):
+        return {key: read_only_view(value) for key, value in result.items()}
+    if isinstance(result, xr.DataArray):
+        data = result.data.view()
+        data.flags.writeable = False
+        return result.copy(deep=False, data=data)
+    return result
+
+
+def zeros_like_template(template: xr.DataArray, datatype: str) -> xr.DataArray:
+    """
+    Zero-filled DataArray of the given datatype sharing the (immutable)
+    coordinates of a template built with format_dataarray, avoiding the cost
+    of rebuilding the coordinate indexes for every plasma quantity
+    """
+    data_array = template.copy(deep=False, data=np.zeros(template.shape))
+    data_array.name = datatype
+    assign_datatype(data_array, datatype)
+    return data_array
+
 
 # Generalized dependency caching
 class TrackDependecies:
@@ -565,65 +1157,192 @@ class TrackDependecies:
         self,
         operator: Callable,
         dependencies: list,
+        plasma: Plasma = None,
+        hash_check: bool = None,
     ):
         """
         Call operator only if dependencies variables have changed.
-        Currently using np array, can change if needed
 
         Parameters
         ----------
         operator
             Function to be called
         dependencies
-            Tuple of variables to be tracked
+            List of variables to be tracked: names of Plasma attributes, whose
+            modification is tracked with generation counters, other
+            TrackDependecies objects, or arrays whose content is hashed
+        plasma
+            Plasma object owning the attributes named in dependencies
+        hash_check
+            If True: also hash the content of the named attributes as a safety
+            check against in place modifications without bump_generation.
+            Defaults to plasma.hash_check
         """
         self.operator = operator
         self.dependencies = dependencies
+        self.plasma = plasma
+        self.hash_check = hash_check
 
     def numpyhash(
         self,
         nparray: np.array,
     ):
-        a = nparray.view(np.uint8)
+        a = np.ascontiguousarray(nparray).view(np.uint8)
         return hashlib.sha1(a).hexdigest()
 
-    def __hash__(self):
+    def generation_key(self) -> tuple:
         """
-        Caching of dependencies
+        Generations of the dependencies, changing whenever any of them (or of
+        the dependencies of dependent quantities) is modified
+
+        xr.DataArray, np.ndarray and dictionaries of xr.DataArrays are
+        identified by the hash of their content
+        """
+        key: list = []
+        for dependency in self.dependencies:
+            if isinstance(dependency, str):
+                key.append(self.plasma._generations.get(dependency, 0))
+            elif isinstance(dependency, TrackDependecies):
+                key.append(dependency.generation_key())
+            else:
+                key.append(self.content_hash([dependency]))
+        return tuple(key)
+
+    def dependency_names(self) -> set:
+        """Names of the plasma attributes this and nested dependencies track"""
+        names: set = set()
+        for dependency in self.dependencies:
+            if isinstance(dependency, str):
+                names.add(dependency)
+            elif isinstance(dependency, TrackDependecies):
+                names.update(dependency.dependency_names())
+        return names
+
+    def content_hash(self, dependencies: list = None) -> tuple:
+        """
+        Hash of the content of the dependencies, including the independent
+        plasma quantities named in this and in nested dependencies
 
         xr.DataArray, np.ndarray and dictionaries of xr.DataArrays currently permitted
 
         TODO: upgrade so other objects being tracked, e.g. Equilibrium
         """
-        _dependencies = []
-        for dependency in self.dependencies:
-            if type(dependency) == dict:
+        if dependencies is None:
+            dependencies = self.dependencies
+
+        hashes: list = []
+        for dependency in dependencies:
+            if isinstance(dependency, str):
+                if dependency in INDEPENDENT_QUANTITIES:
+                    hashes.append(self.numpyhash(getattr(self.plasma, dependency).data))
+            elif isinstance(dependency, TrackDependecies):
+                hashes.append(dependency.content_hash())
+            elif isinstance(dependency, dict):
                 for data in dependency.values():
-                    _dependencies.append(data.data)
-            elif type(dependency) == xr.DataArray:
-                _dependencies.append(dependency.data)
-            elif type(dependency) == np.ndarray:
-                _dependencies.append(dependency)
+                    hashes.append(self.numpyhash(data.data))
+            elif isinstance(dependency, xr.DataArray):
+                hashes.append(self.numpyhash(dependency.data))
+            elif isinstance(dependency, np.ndarray):
+                hashes.append(self.numpyhash(dependency))
             else:
                 print(type(dependency))
                 raise NotImplementedError(
                     "Hashing implemented for xr.DataArray, np.ndarray"
                 )
 
-        hashable = tuple((self.numpyhash(dependency),) for dependency in _dependencies)
-        return hash(hashable)
+        return tuple(hashes)
+
+    def __hash__(self):
+        return hash(self.generation_key())
+
+    def __setstate__(self, state: dict):
+        """Restore pickled objects, setting defaults for attributes missing in
+        objects saved with previous versions"""
+        state.setdefault("plasma", None)
+        state.setdefault("hash_check", False)
+        self.__dict__.update(state)
 
 
 class CachedCalculation(TrackDependecies):
-    def __init__(self, operator: Callable, dependencies: list, verbose: bool = False):
+    def __init__(
+        self,
+        operator: Callable,
+        dependencies: list,
+        verbose: bool = False,
+        plasma: Plasma = None,
+        hash_check: bool = None,
+        time_slices: bool = False,
+    ):
+        """
+        Call operator only if dependencies variables have changed, returning
+        read-only views of its result (see read_only_view).
+
+        Parameters
+        ----------
+        time_slices
+            If True: the operator accepts the times to recalculate as argument t,
+            and when the dependencies have only been modified at some times
+            (see Plasma.bump_generation) only those time slices are recalculated
+        """
         self.verbose = verbose
-        super(CachedCalculation, self).__init__(operator, dependencies)
+        self.time_slices = time_slices
+        self._key: Optional[tuple] = None
+        self._content_hash: Optional[tuple] = None
+        self._result = None
+        self._dirty_times: Optional[set] = None
+        super(CachedCalculation, self).__init__(
+            operator, dependencies, plasma=plasma, hash_check=hash_check
+        )
 
-    @lru_cache()
     def __call__(self):
-        if self.verbose:
-            print("Calculating")
-        return deepcopy(self.operator())
+        key = self.generation_key()
+        hash_check = self.hash_check
+        if hash_check is None:
+            hash_check = getattr(self.plasma, "hash_check", False)
+
+        content_hash = None
+        if hash_check:
+            content_hash = self.content_hash()
+            if key == self._key and content_hash != self._content_hash:
+                warn(
+                    "Plasma quantities modified in place without bump_generation, "
+                    f"recalculating {self.operator.__name__}"
+                )
+                self._key = None
+                self._dirty_times = None
+
+        if key != self._key:
+            if self.verbose:
+                print("Calculating")
+            if self.time_slices and self._result is not None and self._dirty_times:
+                t = np.array(sorted(self._dirty_times))
+                self._result = read_only_view(self.operator(t=t))
+            else:
+                self._result = read_only_view(self.operator())
+            self._key = key
+            self._content_hash = content_hash
+            self._dirty_times = set()
+        return self._result
+
+    def mark_dirty(self, t: Optional[LabeledArray] = None):
+        """
+        Record times at which the dependencies have been modified,
+        all times if t is None
+        """
+        if t is None:
+            self._dirty_times = None
+        elif self._dirty_times is not None:
+            self._dirty_times.update(np.array(t, ndmin=1, dtype=float).ravel())
+
+    def __setstate__(self, state: dict):
+        """Restore pickled objects, setting defaults for attributes missing in
+        objects saved with previous versions"""
+        state.setdefault("_key", None)
+        state.setdefault("_content_hash", None)
+        state.setdefault("_result", None)
+        state.setdefault("time_slices", False)
+        state.setdefault("_dirty_times", None)
+        super().__setstate__(state)
 
 
 class PlasmaProfiler:
@@ -683,6 +1402,7 @@ class PlasmaProfiler:
             _prof_identifiers = profile_name.split(
                 ":"
             )  # impurities have ':' to identify elements
+            self.plasma.bump_generation(_prof_identifiers[0], t=t)
             if profile_name.__contains__(":"):
                 if _prof_identifiers[1] in self.plasma.elements:
                     getattr(self.plasma, _prof_identifiers[0]).loc[
@@ -699,7 +1419,12 @@ class PlasmaProfiler:
     def save_phantoms(self, phantom=False):
         #  if phantoms return profiles otherwise return empty arrays
         self.phantom = phantom
-        phantom_profiles = {"PSI_NORM": self.plasma_attributes()}
+        # copy since plasma attributes are views of the (changing) plasma profiles
+        phantom_profiles = {
+            "PSI_NORM": {
+                key: value.copy() for key, value in self.plasma_attributes().items()
+            }
+        }
         if not phantom:
             for key, value in phantom_profiles["PSI_NORM"].items():
                 phantom_profiles["PSI_NORM"][key] = value * 0
@@ -1,6 +1,9 @@
 from abc import ABC
 
 import matplotlib.pylab as plt
+import numpy as np
+
+from indica.utilities import format_dataarray
 
 
 class ProfilerBase(ABC):
@@ -25,6 +28,17 @@ class ProfilerBase(ABC):
         """
         return {key: getattr(self, key) for key in self.parameters.keys()}
 
+    def format_profile(self, yspl: np.ndarray):
+        """
+        Format profile evaluated on xspl, of shape ([sample,] xspl), adding a
+        leading "sample" dimension when the parameters are arrays describing an
+        ensemble of profiles
+        """
+        coords = {self.coord: self.xspl}
+        if np.ndim(yspl) > 1:
+            coords = {"sample": np.arange(np.shape(yspl)[0]), **coords}
+        return format_dataarray(yspl, self.datatype, coords=coords)
+
     def plot(self, fig=True, **kwargs):
         self.__call__()
         if fig:
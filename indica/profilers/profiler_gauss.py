@@ -8,7 +8,6 @@ import yaml
 import indica
 from indica.profilers.profiler_base import ProfilerBase
 from indica.utilities import format_coord
-from indica.utilities import format_dataarray
 
 
 def gaussian(x, A, B, x_0, w):
@@ -78,48 +77,54 @@ class ProfilerGauss(ProfilerBase):
 
         """
 
+        # Parameters can be arrays of the same length to build an ensemble of
+        # profiles with a leading "sample" dimension in one call
+        y0, y1, yend, peaking, wcenter, wped = (
+            np.asarray(getattr(self, name), dtype=float)[..., np.newaxis]
+            for name in ("y0", "y1", "yend", "peaking", "wcenter", "wped")
+        )
+
         # Add additional peaking with respect to reference shape
-        peaking2 = 1.0
+        peaking2 = np.ones_like(y0)
         if y0_ref is not None:
-            if y0_ref < self.y0:
-                peaking2 = self.y0 / y0_ref
-        self.peaking2 = peaking2
-
-        center = self.y0
-        edge = self.y1
+            peaking2 = np.where(y0_ref < y0, y0 / y0_ref, 1.0)
+        self.peaking2 = np.squeeze(peaking2)[()]
 
-        if peaking2 > 1:
-            center = y0_ref
-            wcenter = self.wcenter - (peaking2**wcenter_exp - 1)
-        else:
-            wcenter = self.wcenter
+        center = np.where(peaking2 > 1, y0_ref if y0_ref is not None else y0, y0)
+        edge = y1
+        wcenter = np.where(
+            peaking2 > 1, wcenter - (peaking2**wcenter_exp - 1), wcenter
+        )
 
-        center = center / self.peaking
+        center = center / peaking
 
         x = self.x[np.where(self.x <= 1.0)[0]]
 
         # baseline profile shape
-        y_baseline = (center - self.y1) * (1 - x**self.wped) + self.y1
-
-        if self.peaking != 1:  # add central peaking
-            sigma = wcenter / (np.sqrt(2 * np.log(2)))
-            y_peaking1 = (
-                gaussian(x, center * (self.peaking - 1), 0, 0, sigma) + y_baseline
-            )
-        else:
-            y_peaking1 = y_baseline
+        y_baseline = (center - y1) * (1 - x**wped) + y1
+
+        # add central peaking (unit width where the gaussian is not used, to
+        # avoid evaluating it with zero width)
+        sigma = wcenter / (np.sqrt(2 * np.log(2)))
+        sigma1 = np.where(peaking != 1, sigma, 1.0)
+        y_peaking1 = np.where(
+            peaking != 1,
+            gaussian(x, center * (peaking - 1), 0, 0, sigma1) + y_baseline,
+            y_baseline,
+        )
 
-        if peaking2 != 1:  # add additional peaking
-            sigma = wcenter / (np.sqrt(2 * np.log(2)))
-            y_peaking2 = (
-                gaussian(x, y_peaking1[0] * (peaking2 - 1), 0, 0, sigma) + y_peaking1
-            )
-        else:
-            y_peaking2 = y_peaking1
+        # add additional peaking
+        sigma2 = np.where(peaking2 != 1, sigma, 1.0)
+        y_peaking2 = np.where(
+            peaking2 != 1,
+            gaussian(x, y_peaking1[..., :1] * (peaking2 - 1), 0, 0, sigma2)
+            + y_peaking1,
+            y_peaking1,
+        )
 
         if y0_fix:
             y = y_peaking2 - edge
-            y = y / y[0]
+            y = y / y[..., :1]
             y = y * (center - edge)
             y = y + edge
 
@@ -127,18 +132,17 @@ class ProfilerGauss(ProfilerBase):
             y = y_peaking2
 
         x = np.append(x, self.xend)
-        y = np.append(y, self.yend)
+        y = np.concatenate([y, np.broadcast_to(yend, y.shape[:-1] + (1,))], axis=-1)
 
         self.cubicspline = CubicSpline(
             x,
             y,
-            0,
+            -1,
             "clamped",
             False,
         )
         _yspl = self.cubicspline(self.xspl)
-        coords = {self.coord: self.xspl}
-        ydata = format_dataarray(_yspl, self.datatype, coords=coords)
+        ydata = self.format_profile(_yspl)
         self.ydata = ydata
 
         if debug:
@@ -8,7 +8,6 @@ import yaml
 import indica
 from indica.profilers.profiler_base import ProfilerBase
 from indica.utilities import format_coord
-from indica.utilities import format_dataarray
 
 
 class ProfilerMonoSpline(ProfilerBase):
@@ -55,10 +54,9 @@ class ProfilerMonoSpline(ProfilerBase):
             for key, _y in dict(sorted(self.parameters.items())).items()
             if "xknot" not in key
         ]
-        self.spline = PchipInterpolator(self.x, self.y)
-        _yspl = self.spline(self.xspl)
-        coords = {self.coord: self.xspl}
-        self.ydata = format_dataarray(_yspl, self.datatype, coords=coords)
+        self.spline = PchipInterpolator(self.x, np.broadcast_arrays(*self.y))
+        _yspl = np.moveaxis(self.spline(self.xspl), 0, -1)
+        self.ydata = self.format_profile(_yspl)
         return self.ydata
 
 
@@ -112,10 +110,9 @@ class ProfilerCubicSpline(ProfilerBase):
             y.append(shapevalue * y[index])
         y.append(self.parameters["y1"])
 
-        self.spline = CubicSpline(self.x, y, bc_type="clamped")
-        _yspl = self.spline(self.xspl)
-        coords = {self.coord: self.xspl}
-        self.ydata = format_dataarray(_yspl, self.datatype, coords=coords)
+        self.spline = CubicSpline(self.x, np.broadcast_arrays(*y), bc_type="clamped")
+        _yspl = np.moveaxis(self.spline(self.xspl), 0, -1)
+        self.ydata = self.format_profile(_yspl)
         return self.ydata
 
 
@@ -6,11 +6,13 @@ functionality for a different format of data.
 """
 from .adas import ADASReader
 from .datareader import DataReader
+from .geqdsk import EquilibriumStore
 from .readerprocessor import ReaderProcessor
 
 __all__ = [
     "ADASReader",
     "DataReader",
+    "EquilibriumStore",
     "ReaderProcessor",
 ]
 
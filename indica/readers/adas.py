@@ -1,14 +1,23 @@
 """Base class for reading in ADAS atomic data."""
 
+from contextlib import contextmanager
 import datetime
+import json
+import os
 from pathlib import Path
 import re
+import tempfile
+from typing import Any
+from typing import IO
+from typing import Iterator
 from typing import List
 from typing import Literal
+from typing import Optional
 from typing import TextIO
 from typing import Union
 from urllib.request import pathname2url
 from urllib.request import urlretrieve
+from warnings import warn
 
 import numpy as np
 from xarray import DataArray
@@ -16,9 +25,12 @@ from xarray import DataArray
 from indica import BaseIO
 from indica.utilities import assign_datatype
 from indica.utilities import CACHE_DIR
+from indica.utilities import hash_vals
+from indica.utilities import to_filename
 
 # TODO: Evaluate this location
 DEFAULT_PATH = Path("")
+CACHE_PATH = Path.home() / CACHE_DIR / "adas_cache"
 
 ADF11: dict = {
     "h": {
@@ -151,13 +163,19 @@ class ADASReader(BaseIO):
         Location from which relative paths should be evaluated.
         Default is to download files from OpenADAS, storing them
         in your home directory for later use.
+    cache: bool
+        Store parsed files in a binary cache in your home directory, keyed
+        by path and modification time of the ADAS file, and read them from
+        there (memory-mapped) instead of re-parsing them.
     """
 
     def __init__(
         self,
         path: Union[str, Path] = DEFAULT_PATH,
+        cache: bool = True,
     ):
         path = Path(path)
+        self.cache = cache
         self.openadas = path == DEFAULT_PATH
         if path == DEFAULT_PATH:
             self.namespace = "openadas"
@@ -195,6 +213,10 @@ class ADASReader(BaseIO):
         now = datetime.datetime.now()
         file_component = f"{quantity}{year}"
         filename = Path(file_component) / f"{file_component}_{element.lower()}.dat"
+        cached = self._read_cache("adf11", filename)
+        if cached is not None:
+            return cached
+
         with self._get_file("adf11", filename) as f:
             header = f.readline().split()
             # z = int(header[0])
@@ -246,6 +268,7 @@ class ADASReader(BaseIO):
             attrs=attrs,
         )
         assign_datatype(_adf11, quantity)
+        self._write_cache("adf11", filename, _adf11)
         return _adf11
 
     def get_adf15(
@@ -336,6 +359,10 @@ class ADASReader(BaseIO):
             f"[{element.lower()}{charge.lower()}.dat"
         )
 
+        cached = self._read_cache("adf15", filename)
+        if cached is not None:
+            return cached
+
         header_match = {
             "compact": r"(\d+).+/(\S+).*\+(.*)photon",
             "expanded": r"(\d+).+/(\S+).*\:(.*)photon",
@@ -445,6 +472,7 @@ class ADASReader(BaseIO):
         pecs = pecs.assign_coords(type=("index", ttype))  # (excit, recomb, cx)
 
         assign_datatype(pecs, "pec")
+        self._write_cache("adf15", filename, pecs)
         return pecs
 
     def _get_file(self, dataclass: str, filename: Union[str, Path]) -> TextIO:
@@ -472,7 +500,125 @@ class ADASReader(BaseIO):
             )
         return filepath.open("r")
 
+    def _get_cache_path(self, filepath: Path) -> Path:
+        """Path (without suffix) of the binary cache of an ADAS file."""
+        return CACHE_PATH / (
+            to_filename(filepath.name) + "_" + hash_vals(path=filepath.resolve())[:16]
+        )
+
+    def _read_cache(
+        self, dataclass: str, filename: Union[str, Path]
+    ) -> Optional[DataArray]:
+        """Reads a previously parsed ADAS file from the binary cache, memory-mapping
+        its data. Returns None if caching is disabled, if the file has not been
+        cached or if it has been modified since.
+
+        Parameters
+        ----------
+        dataclass
+            The format of ADAS data in this file (e.g., ADF11).
+        filename
+            Name of the file to get.
+
+        """
+        filepath = self.path / dataclass / filename
+        if not self.cache or not filepath.exists():
+            return None
+
+        cache_path = self._get_cache_path(filepath)
+        metadata_file = cache_path.with_name(cache_path.name + ".json")
+        data_file = cache_path.with_name(cache_path.name + ".npy")
+        if not metadata_file.exists() or not data_file.exists():
+            return None
+
+        stat = filepath.stat()
+        try:
+            with metadata_file.open("r") as f:
+                metadata = json.load(f)
+            if metadata["source"] != [stat.st_mtime_ns, stat.st_size]:
+                return None
+            values = np.load(data_file, mmap_mode="r")
+            coords = {
+                name: (coord["dims"], np.asarray(coord["values"]))
+                for name, coord in metadata["coords"].items()
+            }
+            attrs = {key: _decode_attr(val) for key, val in metadata["attrs"].items()}
+            return DataArray(values, dims=metadata["dims"], coords=coords, attrs=attrs)
+        except (OSError, ValueError, KeyError) as e:
+            warn(f"Error reading ADAS cache file {cache_path} ({e}), re-parsing file.")
+            return None
+
+    def _write_cache(self, dataclass: str, filename: Union[str, Path], data: DataArray):
+        """Writes a parsed ADAS file to the binary cache, data as .npy and
+        coordinates and attributes as .json.
+
+        Parameters
+        ----------
+        dataclass
+            The format of ADAS data in this file (e.g., ADF11).
+        filename
+            Name of the parsed file.
+        data
+            The parsed data.
+
+        """
+        if not self.cache:
+            return
+
+        filepath = self.path / dataclass / filename
+        stat = filepath.stat()
+        cache_path = self._get_cache_path(filepath)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        metadata = {
+            "source": [stat.st_mtime_ns, stat.st_size],
+            "dims": list(data.dims),
+            "coords": {
+                name: {"dims": list(coord.dims), "values": coord.values.tolist()}
+                for name, coord in data.coords.items()
+            },
+            "attrs": {key: _encode_attr(val) for key, val in data.attrs.items()},
+        }
+        # Files are replaced rather than overwritten, so that arrays memory-mapped
+        # from a previous entry keep their values
+        with _replace_file(cache_path.with_name(cache_path.name + ".npy"), "wb") as f:
+            np.save(f, data.values)
+        # Metadata written last: an entry is complete only if it exists
+        with _replace_file(cache_path.with_name(cache_path.name + ".json"), "w") as f:
+            json.dump(metadata, f)
+
     @property
     def requires_authentication(self) -> Literal[False]:
         """Reading ADAS data never requires authentication."""
         return False
+
+
+@contextmanager
+def _replace_file(path: Path, mode: str) -> Iterator[IO]:
+    """Opens a temporary file in the directory of path, which replaces path
+    once written (removed instead if writing fails)."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _encode_attr(value: Any) -> Any:
+    """Converts attributes of parsed ADAS files to JSON-serialisable values."""
+    if isinstance(value, datetime.date):
+        return {"date": value.isoformat()}
+    if isinstance(value, Path):
+        return {"path": str(value)}
+    return value
+
+
+def _decode_attr(value: Any) -> Any:
+    """Inverse of _encode_attr."""
+    if isinstance(value, dict) and "date" in value:
+        return datetime.date.fromisoformat(value["date"])
+    if isinstance(value, dict) and "path" in value:
+        return Path(value["path"])
+    return value
@@ -0,0 +1,361 @@
+"""Read and write equilibria in G-EQDSK format, and store many equilibrium
+time slices locally in memory-mapped files for offline use.
+
+"""
+
+import json
+from pathlib import Path
+import re
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+from scipy.integrate import cumulative_trapezoid
+from scipy.interpolate import RegularGridInterpolator
+from xarray import DataArray
+
+from indica.available_quantities import READER_QUANTITIES
+from indica.converters import TrivialTransform
+from indica.utilities import build_dataarrays
+from indica.utilities import CACHE_DIR
+from indica.utilities import to_filename
+
+STORE_PATH = Path.home() / CACHE_DIR / "equilibrium_store"
+
+# Scalars of the G-EQDSK header, in file order ("xdum" are unused)
+GEQDSK_SCALARS = [
+    "rdim",
+    "zdim",
+    "rcentr",
+    "rleft",
+    "zmid",
+    "rmaxis",
+    "zmaxis",
+    "simag",
+    "sibry",
+    "bcentr",
+    "current",
+    "simag",
+    "xdum",
+    "rmaxis",
+    "xdum",
+    "zmaxis",
+    "xdum",
+    "sibry",
+    "xdum",
+    "xdum",
+]
+GEQDSK_PROFILES = ["fpol", "pres", "ffprim", "pprime"]
+# Quantities defining the (R, z) grid
+GEQDSK_GRID = ["nw", "nh", "rdim", "zdim", "rleft", "zmid"]
+# Number of points along the midplane used to find R_lfs and R_hfs
+MIDPLANE_N_R = 500
+
+_FLOAT = re.compile(r"[+-]?(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+
+def read_geqdsk(filename: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read a G-EQDSK file
+
+    Parameters
+    ----------
+    filename
+        Path of the file.
+
+    Returns
+    -------
+    Dictionary with the quantities of the file using the G-EQDSK names, 1D
+    profiles on nw points uniform in poloidal flux and psirz with shape (nh, nw)
+    """
+    with open(filename, "r") as f:
+        header = f.readline()
+        lines = f.readlines()
+
+    numbers = re.findall(r"-?\d+", header[48:]) or re.findall(r"-?\d+", header)
+    nw, nh = int(numbers[-2]), int(numbers[-1])
+    geqdsk: Dict[str, Any] = {"description": header[:48].strip(), "nw": nw, "nh": nh}
+
+    # Floats up to qpsi, the integer record of sizes, then boundary and limiter
+    n_floats = len(GEQDSK_SCALARS) + (len(GEQDSK_PROFILES) + 1) * nw + nw * nh
+    floats: List[float] = []
+    i = 0
+    while len(floats) < n_floats:
+        floats.extend(float(value) for value in _FLOAT.findall(lines[i]))
+        i += 1
+    nbbbs, limitr = (int(value) for value in lines[i].split()[:2])
+    floats.extend(
+        float(value) for line in lines[i + 1 :] for value in _FLOAT.findall(line)
+    )
+
+    values = iter(floats)
+    for name in GEQDSK_SCALARS:
+        geqdsk[name] = next(values)
+    geqdsk.pop("xdum")
+    for name in GEQDSK_PROFILES:
+        geqdsk[name] = np.array([next(values) for _ in range(nw)])
+    geqdsk["psirz"] = np.array([next(values) for _ in range(nw * nh)]).reshape(nh, nw)
+    geqdsk["qpsi"] = np.array([next(values) for _ in range(nw)])
+    boundary = np.array([next(values) for _ in range(2 * nbbbs)]).reshape(-1, 2)
+    geqdsk["rbbbs"], geqdsk["zbbbs"] = boundary[:, 0], boundary[:, 1]
+    limiter = np.array([next(values) for _ in range(2 * limitr)]).reshape(-1, 2)
+    geqdsk["rlim"], geqdsk["zlim"] = limiter[:, 0], limiter[:, 1]
+    return geqdsk
+
+
+def write_geqdsk(filename: Union[str, Path], geqdsk: Dict[str, Any]):
+    """
+    Write a G-EQDSK file
+
+    Parameters
+    ----------
+    filename
+        Path of the file.
+    geqdsk
+        Dictionary with the quantities of the file (see read_geqdsk), the limiter
+        being optional.
+    """
+    nw, nh = geqdsk["nw"], geqdsk["nh"]
+    rlim = np.ravel(geqdsk.get("rlim", []))
+    zlim = np.ravel(geqdsk.get("zlim", []))
+    scalars = [0.0 if name == "xdum" else geqdsk[name] for name in GEQDSK_SCALARS]
+    floats = np.concatenate(
+        [
+            scalars,
+            *[np.ravel(geqdsk[name]) for name in GEQDSK_PROFILES],
+            np.ravel(geqdsk["psirz"]),
+            np.ravel(geqdsk["qpsi"]),
+        ]
+    )
+    boundary = np.ravel(np.column_stack([geqdsk["rbbbs"], geqdsk["zbbbs"]]))
+    limiter = np.ravel(np.column_stack([rlim, zlim]))
+
+    with open(filename, "w") as f:
+        f.write(f"{geqdsk.get('description', '')[:48]:<48}{0:4d}{nw:4d}{nh:4d}\n")
+        f.write(_format_floats(floats))
+        f.write(f"{len(geqdsk['rbbbs']):5d}{rlim.size:5d}\n")
+        f.write(_format_floats(boundary))
+        f.write(_format_floats(limiter))
+
+
+def _format_floats(values: np.ndarray) -> str:
+    """G-EQDSK records of floats, five per line"""
+    lines = [
+        "".join(f"{value:16.9E}" for value in values[i : i + 5])
+        for i in range(0, len(values), 5)
+    ]
+    return "".join(line + "\n" for line in lines)
+
+
+def geqdsk_to_database_results(
+    geqdsks: Sequence[Dict[str, Any]], times: Sequence[float]
+) -> Dict[str, np.ndarray]:
+    """
+    Equilibrium quantities in the format returned by the readers for
+    "get_equilibrium" (see READER_QUANTITIES) from G-EQDSK time slices
+
+    Parameters
+    ----------
+    geqdsks
+        G-EQDSK time slices on the same (R, z) grid (see read_geqdsk).
+    times
+        Time (s) of each slice.
+    """
+    first = geqdsks[0]
+    nw, nh = first["nw"], first["nh"]
+    R = first["rleft"] + np.linspace(0, first["rdim"], nw)
+    z = first["zmid"] + np.linspace(-first["zdim"] / 2, first["zdim"] / 2, nh)
+    grid = [first[name] for name in GEQDSK_GRID]
+    for geqdsk in geqdsks:
+        if not np.allclose([geqdsk[name] for name in GEQDSK_GRID], grid):
+            raise ValueError("All G-EQDSK time slices must be on the same (R, z) grid")
+    if len(geqdsks) != len(times):
+        raise ValueError("A time must be given for each G-EQDSK time slice")
+
+    psin = np.linspace(0.0, 1.0, nw)
+    n_boundary = max(len(geqdsk["rbbbs"]) for geqdsk in geqdsks)
+    results: Dict[str, list] = {}
+    for geqdsk in geqdsks:
+        psi_grid = geqdsk["simag"] + psin * (geqdsk["sibry"] - geqdsk["simag"])
+        # Boundaries of different lengths are padded closing the contour
+        pad = n_boundary - len(geqdsk["rbbbs"])
+        rbnd = np.append(geqdsk["rbbbs"], [geqdsk["rbbbs"][0]] * pad)
+        zbnd = np.append(geqdsk["zbbbs"], [geqdsk["zbbbs"][0]] * pad)
+        rmji, rmjo = _midplane_radii(geqdsk, R, z, psin)
+        # Toroidal flux from q = dftor / dpsi, psi in Wb/2pi
+        ftor = 2 * np.pi * cumulative_trapezoid(geqdsk["qpsi"], psi_grid, initial=0)
+        slice_results = {
+            "rgeo": (rbnd.max() + rbnd.min()) / 2,
+            "rmag": geqdsk["rmaxis"],
+            "zmag": geqdsk["zmaxis"],
+            "psi_axis": geqdsk["simag"],
+            "psi_boundary": geqdsk["sibry"],
+            "ipla": geqdsk["current"],
+            "rbnd": rbnd,
+            "zbnd": zbnd,
+            "f": geqdsk["fpol"],
+            "ftor": ftor,
+            "rmji": rmji,
+            "rmjo": rmjo,
+            "psi": geqdsk["psirz"],
+        }
+        for name, value in slice_results.items():
+            results.setdefault(name, []).append(value)
+
+    database_results: Dict[str, np.ndarray] = {
+        name: np.array(values) for name, values in results.items()
+    }
+    database_results.update(
+        t=np.asarray(times, dtype=float),
+        psin=psin,
+        index=np.arange(n_boundary),
+        R=R,
+        z=z,
+    )
+    return database_results
+
+
+def _midplane_radii(geqdsk: Dict[str, Any], R: np.ndarray, z: np.ndarray, psin):
+    """Major radius of the flux surfaces on the high and low field side of the
+    magnetic axis at its height"""
+    interpolant = RegularGridInterpolator(
+        (z, R),
+        (geqdsk["psirz"] - geqdsk["simag"]) / (geqdsk["sibry"] - geqdsk["simag"]),
+        bounds_error=False,
+        fill_value=np.nan,
+    )
+    radii = []
+    for R_edge in [R.min(), R.max()]:
+        R_ray = np.linspace(geqdsk["rmaxis"], R_edge, MIDPLANE_N_R)
+        psin_ray = interpolant((np.full_like(R_ray, geqdsk["zmaxis"]), R_ray))
+        psin_ray[0] = 0.0
+        # Flux surfaces are nested: invert the monotonic envelope of psin(R)
+        psin_ray = np.fmax.accumulate(np.nan_to_num(psin_ray, nan=0.0))
+        radii.append(np.interp(psin, psin_ray, R_ray, right=np.nan))
+    return radii[0], radii[1]
+
+
+def read_equilibrium_data(
+    filenames: Sequence[Union[str, Path]],
+    times: Sequence[float],
+    include_error: bool = True,
+) -> Dict[str, DataArray]:
+    """
+    Read G-EQDSK files into the equilibrium data used to initialise Equilibrium
+
+    Parameters
+    ----------
+    filenames
+        G-EQDSK files of each time slice, on the same (R, z) grid.
+    times
+        Time (s) of each slice.
+    include_error
+        Assign zero errors as the readers do.
+    """
+    database_results = geqdsk_to_database_results(
+        [read_geqdsk(filename) for filename in filenames], times
+    )
+    return build_dataarrays(
+        database_results,
+        READER_QUANTITIES["get_equilibrium"],
+        transform=TrivialTransform(),
+        include_error=include_error,
+    )
+
+
+class EquilibriumStore:
+    """Local store of equilibria for offline use, each entry packing all the
+    time slices of an equilibrium in a single binary file which is read
+    memory-mapped, with a JSON index of its arrays.
+
+    Parameters
+    ----------
+    path
+        Directory of the store.
+    """
+
+    def __init__(self, path: Union[str, Path] = STORE_PATH):
+        self.path = Path(path)
+
+    def keys(self) -> List[str]:
+        """Entries available in the store"""
+        return sorted(index.stem for index in self.path.glob("*.json"))
+
+    def _paths(self, key: str):
+        filename = to_filename(key)
+        return self.path / f"{filename}.bin", self.path / f"{filename}.json"
+
+    def write(self, key: str, equilibrium_data: Dict[str, DataArray]):
+        """
+        Write equilibrium data (e.g. from a reader or read_equilibrium_data)
+        to the store, replacing any previous entry with the same key
+
+        Parameters
+        ----------
+        key
+            Name of the entry, e.g. "st40_11560_efit".
+        equilibrium_data
+            Data used to initialise Equilibrium.
+        """
+        arrays: Dict[str, np.ndarray] = {}
+        for name, data in equilibrium_data.items():
+            arrays[name] = np.ascontiguousarray(data.values)
+            if "error" in data.coords:
+                arrays[f"{name}_error"] = np.ascontiguousarray(data.error.values)
+
+        index: Dict[str, dict] = {}
+        offset = 0
+        data_file, index_file = self._paths(key)
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(data_file, "wb") as f:
+            for name, values in arrays.items():
+                index[name] = {
+                    "dtype": values.dtype.str,
+                    "shape": list(values.shape),
+                    "offset": offset,
+                }
+                f.write(values.tobytes())
+                offset += values.nbytes
+        # Index written last: an entry is complete only if it exists
+        with open(index_file, "w") as f:
+            json.dump(index, f)
+
+    def read(self, key: str, include_error: bool = True) -> Dict[str, DataArray]:
+        """
+        Read equilibrium data from the store, memory-mapping its values
+
+        Parameters
+        ----------
+        key
+            Name of the entry.
+        include_error
+            Assign the errors as coordinates as the readers do.
+        """
+        data_file, index_file = self._paths(key)
+        if not index_file.exists():
+            raise KeyError(f"{key} not in equilibrium store {self.path}")
+        with open(index_file, "r") as f:
+            index = json.load(f)
+
+        database_results: Dict[str, np.ndarray] = {}
+        for name, array in index.items():
+            shape = tuple(array["shape"])
+            if np.prod(shape) == 0:
+                database_results[name] = np.empty(shape, dtype=array["dtype"])
+                continue
+            database_results[name] = np.memmap(
+                data_file,
+                dtype=np.dtype(array["dtype"]),
+                mode="r",
+                offset=array["offset"],
+                shape=shape,
+            )
+        return build_dataarrays(
+            database_results,
+            READER_QUANTITIES["get_equilibrium"],
+            transform=TrivialTransform(),
+            include_error=include_error,
+        )
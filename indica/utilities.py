@@ -322,6 +322,8 @@ def format_dataarray(
         Variable data type name (see DATATYPES)
     coords
         Coordinates sequence (see xr.DataArray documentation)
+    make_copy
+        If True, the data array does not share its values with the input data
 
     Returns
     -------
@@ -330,7 +332,11 @@ def format_dataarray(
     """
 
     if make_copy:
-        _data = deepcopy(data)
+        # copy the numerical values only, coordinates and attributes are replaced
+        if isinstance(data, DataArray):
+            _data = data.copy(deep=False, data=np.array(data))
+        else:
+            _data = np.array(data)
     else:
         _data = data
 
@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Callable
 import warnings
 
@@ -6,6 +5,8 @@ import flatdict
 from flatdict import FlatDict
 import mpmath as mp
 import numpy as np
+import pandas as pd
+import xarray as xr
 
 from indica.plasma import PlasmaProfiler
 
@@ -34,6 +35,14 @@ def deep_update(mapping: dict, *updating_mappings: dict) -> dict:
     return updated_mapping
 
 
+def stack_parameters(parameters: list) -> dict:
+    """Stack a list of parameter dictionaries to a dictionary of arrays"""
+    return {
+        name: np.array([_parameters[name] for _parameters in parameters])
+        for name in parameters[0].keys()
+    }
+
+
 def mp_log_gauss_wrapper(x, mean, sigma):
     # dropping nans to speed up calculation
     nan_idx = np.isnan(x) | np.isnan(mean) | np.isnan(sigma)
@@ -79,17 +88,21 @@ class BayesBlackBox:
         self.build_bckc = build_bckc
 
         self.plasma_profiler = plasma_profiler
+        self.blob_templates: dict = {}
 
         missing_data = list(set(quant_to_optimise).difference(opt_data.keys()))
         if missing_data:
             raise ValueError(f"{missing_data} not found in data given")
 
-    def ln_likelihood(self):
+    def ln_likelihood(self, sample: int = None):
         ln_likelihood = 0
         time_coord = self.plasma_profiler.plasma.time_to_calculate
 
         for key in self.quant_to_optimise:
-            model_data = self.bckc[key].values
+            model_data = self.bckc[key]
+            if sample is not None and "sample" in model_data.dims:
+                model_data = model_data.isel(sample=sample)
+            model_data = model_data.values
             exp_data = self.opt_data[key].sel(t=time_coord).values
             exp_error = self.opt_data[key].sel(t=time_coord).error.values
 
@@ -114,7 +127,8 @@ class BayesBlackBox:
         ln_posterior
             log of posterior probability
         blob
-           outputs from model bckc and plasma attributes
+           values of the outputs from model bckc and plasma attributes,
+           see format_blobs
         """
 
         _ln_prior = self.ln_prior(parameters)
@@ -137,5 +151,111 @@ class BayesBlackBox:
         _ln_likelihood = self.ln_likelihood()  # compare results to data
         ln_posterior = _ln_likelihood + _ln_prior
 
-        blob = deepcopy({**self.bckc, **plasma_attributes})
+        blob = self.make_blob({**self.bckc, **plasma_attributes})
         return ln_posterior, blob
+
+    def make_blob(self, outputs: dict, sample: int = None) -> dict:
+        """
+        Store only the values of the outputs, keeping their coordinates and
+        attributes as templates to rebuild the DataArrays with format_blobs
+
+        Parameters
+        ----------
+        outputs
+            DataArrays of model bckc and plasma attributes
+        sample
+            index of the sample dimension to select, if present
+        """
+        blob = {}
+        for key, value in outputs.items():
+            if sample is not None and "sample" in value.dims:
+                value = value.isel(sample=sample, drop=True)
+            self.blob_templates[key] = value
+            blob[key] = np.array(value.values)
+        return blob
+
+    def format_blobs(self, blobs: list) -> dict:
+        """
+        Rebuild DataArrays from a list of blobs, concatenated along the
+        "sample_idx" dimension
+        """
+        sample_idx = pd.Index(np.arange(len(blobs)), name="sample_idx")
+        formatted_blobs = {}
+        for key, template in self.blob_templates.items():
+            formatted_blobs[key] = xr.DataArray(
+                np.stack([blob[key] for blob in blobs]),
+                coords={"sample_idx": sample_idx, **template.coords},
+                dims=("sample_idx",) + template.dims,
+                name=template.name,
+                attrs=template.attrs,
+            )
+        return formatted_blobs
+
+    def ln_posterior_vectorized(self, parameters: list, **kwargs):
+        """
+        Posterior probability of an ensemble of parameter sets, as given by
+        emcee.EnsembleSampler(vectorize=True)
+
+        The prior of all parameter sets is calculated at once. Only parameter
+        sets inside the priors are passed to the models, in batches of
+        plasma.n_samples along the "sample" dimension of the plasma, the last
+        batch being padded with copies of its last parameter set. Without a
+        sample dimension each parameter set is evaluated with ln_posterior.
+
+        Parameters
+        ----------
+        parameters
+            list of inputs to optimise
+        kwargs
+            kwargs for models
+
+        Returns
+        -------
+        list of (ln_posterior, blob) for each parameter set
+        """
+        n_samples = self.plasma_profiler.plasma.n_samples
+        if n_samples is None:
+            return [
+                self.ln_posterior(_parameters, **kwargs) for _parameters in parameters
+            ]
+
+        parameters = list(parameters)
+        _ln_prior = np.broadcast_to(
+            self.ln_prior(stack_parameters(parameters)), (len(parameters),)
+        )
+        # Don't call models if outside priors
+        results: list = [(-1e4, {})] * len(parameters)
+        inside_priors = np.flatnonzero(_ln_prior != -np.inf)
+        for start in range(0, inside_priors.size, n_samples):
+            indices = list(inside_priors[start : start + n_samples])
+            indices += [indices[-1]] * (n_samples - len(indices))
+            batch_results = self._ln_posterior_batch(
+                [parameters[idx] for idx in indices], _ln_prior[indices], **kwargs
+            )
+            for idx, result in zip(indices, batch_results):
+                results[idx] = result
+        return results
+
+    def _ln_posterior_batch(self, parameters: list, ln_prior: np.ndarray, **kwargs):
+        stacked_parameters = stack_parameters(parameters)
+        self.plasma_profiler(stacked_parameters)
+        plasma_attributes = self.plasma_profiler.plasma_attributes()
+
+        # model parameters vary along the sample dimension of the model outputs
+        flat_parameters = flatdict.FlatDict(
+            {
+                name: xr.DataArray(value, dims="sample")
+                for name, value in stacked_parameters.items()
+            },
+            ".",
+        )
+        nested_parameters = flat_parameters.as_dict()
+        bckc = self.build_bckc(**deep_update(kwargs, nested_parameters))
+        self.bckc = FlatDict(bckc, ".")
+
+        results: list = []
+        for sample in range(len(parameters)):
+            ln_posterior = self.ln_likelihood(sample) + ln_prior[sample]
+            blob = self.make_blob({**self.bckc, **plasma_attributes}, sample)
+            results.append((ln_posterior, blob))
+        return results
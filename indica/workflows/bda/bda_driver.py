@@ -38,7 +38,14 @@ class BDADriver:
             build_bckc=self.modelreader.__call__,
         )
 
-        self.optimiser_context.init_optimiser(self.blackbox.ln_posterior)
+        optimiser_settings = getattr(self.optimiser_context, "optimiser_settings", None)
+        if getattr(optimiser_settings, "vectorize", False):
+            blackbox_func = self.blackbox.ln_posterior_vectorized
+        else:
+            blackbox_func = self.blackbox.ln_posterior
+        self.optimiser_context.init_optimiser(
+            blackbox_func, blob_formatter=self.blackbox.format_blobs
+        )
 
     def _build_inputs_dict(self):
         """
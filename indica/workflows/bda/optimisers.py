@@ -6,6 +6,7 @@ from dataclasses import field
 from functools import partial
 import logging
 from operator import itemgetter
+from typing import Optional
 
 from dime_sampler import DIMEMove
 import emcee
@@ -131,12 +132,58 @@ def bo_wrapper(params: list, dims: list = None, blackbox: callable = None, **kwa
     return -ln_post  # probability -> cost function
 
 
+def emcee_wrapper_vectorized(
+    params: np.ndarray, dims: list = None, blackbox: callable = None, **kwargs
+):
+    # emcee does not support named parameters with vectorize=True
+    if dims is None:
+        raise ValueError("emcee wrapper is missing dims")
+    if blackbox is None:
+        raise ValueError("emcee wrapper is missing blackbox")
+    params = [{dim: _params[idx] for idx, dim in enumerate(dims)} for _params in params]
+    return blackbox(params, **kwargs)
+
+
+def bo_wrapper_vectorized(
+    params: np.ndarray, dims: list = None, blackbox: callable = None, **kwargs
+):
+    if dims is None:
+        raise ValueError("BO wrapper is missing dims")
+    if blackbox is None:
+        raise ValueError("BO wrapper is missing blackbox")
+    params = [
+        {dim: _params[idx] for idx, dim in enumerate(dims)}
+        for _params in np.atleast_2d(params)
+    ]
+    results = blackbox(params, **kwargs)
+    return np.array([-ln_post for ln_post, _ in results])
+
+
 class OptimiserContext(ABC):
     def __init__(
         self,
     ):
         self.start_points = None
         self.optimiser = None
+        self.blob_formatter: Optional[Callable] = None
+
+    def format_blobs(self, blobs: list) -> dict:
+        """
+        Concatenate blobs along the "sample_idx" dimension, using the
+        blob_formatter given to init_optimiser if blobs only store values
+        """
+        if self.blob_formatter is not None:
+            return self.blob_formatter(blobs)
+
+        blob_names = blobs[0].keys()
+        samples = np.arange(0, blobs.__len__())
+        return {
+            blob_name: xr.concat(
+                [data[blob_name] for data in blobs],
+                dim=pd.Index(samples, name="sample_idx"),
+            )
+            for blob_name in blob_names
+        }
 
     @abstractmethod
     def init_optimiser(self, *args, **kwargs):
@@ -174,6 +221,7 @@ class EmceeSettings:
     stopping_criteria_factor: float = 0.01
     stopping_criteria_sample: int = 10
     stopping_criteria_debug: bool = False
+    vectorize: bool = False
     move: list = field(default_factory=lambda: [(DIMEMove(aimh_prob=0.2), 1.0)])
 
 
@@ -194,15 +242,31 @@ class EmceeOptimiser(OptimiserContext):
     def init_optimiser(
         self,
         blackbox_func: Callable,
+        blob_formatter: Callable = None,
     ):  # type: ignore
-        self.optimiser = emcee.EnsembleSampler(
-            self.optimiser_settings.nwalkers,
-            self.ndim,
-            log_prob_fn=blackbox_func,
-            kwargs=self.model_kwargs,
-            parameter_names=self.optimiser_settings.param_names,
-            moves=self.optimiser_settings.move,
-        )
+        self.blob_formatter = blob_formatter
+        if self.optimiser_settings.vectorize:
+            self.optimiser = emcee.EnsembleSampler(
+                self.optimiser_settings.nwalkers,
+                self.ndim,
+                log_prob_fn=partial(
+                    emcee_wrapper_vectorized,
+                    dims=self.optimiser_settings.param_names,
+                    blackbox=blackbox_func,
+                ),
+                kwargs=self.model_kwargs,
+                moves=self.optimiser_settings.move,
+                vectorize=True,
+            )
+        else:
+            self.optimiser = emcee.EnsembleSampler(
+                self.optimiser_settings.nwalkers,
+                self.ndim,
+                log_prob_fn=blackbox_func,
+                kwargs=self.model_kwargs,
+                parameter_names=self.optimiser_settings.param_names,
+                moves=self.optimiser_settings.move,
+            )
 
     def sample_start_points(
         self,
@@ -255,16 +319,7 @@ class EmceeOptimiser(OptimiserContext):
         )
         blobs = [blob for blob in _blobs if blob]  # remove empty blobs
 
-        blob_names = blobs[0].keys()
-        samples = np.arange(0, blobs.__len__())
-
-        results["blobs"] = {
-            blob_name: xr.concat(
-                [data[blob_name] for data in blobs],
-                dim=pd.Index(samples, name="sample_idx"),
-            )
-            for blob_name in blob_names
-        }
+        results["blobs"] = self.format_blobs(blobs)
         results["convergence"]["accept_frac"] = self.optimiser.acceptance_fraction.sum()
         results["prior_sample"] = sample_from_priors(
             self.optimiser_settings.param_names,
@@ -309,6 +364,7 @@ class BOSettings:
     boundary_samples: int = int(1e3)
     model_samples: int = 50
     posterior_samples: int = int(1e5)
+    vectorize: bool = False
 
 
 class BOOptimiser(OptimiserContext):
@@ -342,15 +398,25 @@ class BOOptimiser(OptimiserContext):
     def init_optimiser(
         self,
         blackbox_func: Callable,
+        blob_formatter: Callable = None,
     ):  # type: ignore
+        self.blob_formatter = blob_formatter
         self.optimiser = skopt.gp_minimize
         self.blackbox_func = partial(blackbox_func, **self.model_kwargs)
-        self.wrapped_blackbox_func = partial(
-            bo_wrapper,
-            dims=self.optimiser_settings.param_names,
-            blackbox=blackbox_func,
-            **self.model_kwargs,
-        )
+        if self.optimiser_settings.vectorize:
+            self.wrapped_blackbox_func = partial(
+                bo_wrapper_vectorized,
+                dims=self.optimiser_settings.param_names,
+                blackbox=blackbox_func,
+                **self.model_kwargs,
+            )
+        else:
+            self.wrapped_blackbox_func = partial(
+                bo_wrapper,
+                dims=self.optimiser_settings.param_names,
+                blackbox=blackbox_func,
+                **self.model_kwargs,
+            )
 
     def reset_optimiser(self):
         self.optimiser = skopt.gp_minimize
@@ -372,14 +438,23 @@ class BOOptimiser(OptimiserContext):
                 self.prior_manager.priors,
                 self.wrapped_blackbox_func,
                 self.optimiser_settings.n_initial_points,
+                vectorize=self.optimiser_settings.vectorize,
             )
             self.start_points = start_points.tolist()
 
     def run(
         self,
     ):
+        if self.optimiser_settings.vectorize:
+            # gp_minimize evaluates one point at a time
+            def objective(params):
+                return self.wrapped_blackbox_func(params)[0]
+
+        else:
+            objective = self.wrapped_blackbox_func
+
         self.result = self.optimiser(
-            self.wrapped_blackbox_func,
+            objective,
             self.bounds,
             acq_func=self.optimiser_settings.acq_func,
             x0=self.start_points,
@@ -420,29 +495,22 @@ class BOOptimiser(OptimiserContext):
 
         params = posterior_fit.resample(size=self.optimiser_settings.model_samples)
 
-        blobs = []
-        for model_sample_idx in range(self.optimiser_settings.model_samples):
-            _params = {
+        _params = [
+            {
                 param_name: params[name_idx, model_sample_idx]
                 for name_idx, param_name in enumerate(
                     self.optimiser_settings.param_names
                 )
             }
+            for model_sample_idx in range(self.optimiser_settings.model_samples)
+        ]
+        if self.optimiser_settings.vectorize:
+            _results = self.blackbox_func(_params)
+        else:
+            _results = [self.blackbox_func(__params) for __params in _params]
+        blobs = [_blobs for post, _blobs in _results if _blobs]
 
-            post, _blobs = self.blackbox_func(_params)
-            if _blobs:
-                blobs.append(_blobs)
-
-        blob_names = blobs[0].keys()
-        samples = np.arange(0, blobs.__len__())
-
-        results["blobs"] = {
-            blob_name: xr.concat(
-                [data[blob_name] for data in blobs],
-                dim=pd.Index(samples, name="sample_idx"),
-            )
-            for blob_name in blob_names
-        }
+        results["blobs"] = self.format_blobs(blobs)
         results["prior_sample"] = sample_from_priors(
             self.optimiser_settings.param_names,
             self.prior_manager.priors,
@@ -231,12 +231,20 @@ def sample_from_priors(param_names: list, priors: dict, size=10) -> np.ndarray:
 
 
 def sample_best_half(
-    param_names: list, priors: dict, wrappedblackbox: callable, size=10
+    param_names: list,
+    priors: dict,
+    wrappedblackbox: callable,
+    size=10,
+    vectorize: bool = False,
 ) -> np.ndarray:
     start_points = sample_from_priors(param_names, priors, size=2 * size)
-    ln_post = []
-    for idx in range(start_points.shape[0]):
-        ln_post.append(wrappedblackbox(start_points[idx, :]))
+    if vectorize:
+        # wrappedblackbox evaluates all start points in one call
+        ln_post = wrappedblackbox(start_points)
+    else:
+        ln_post = []
+        for idx in range(start_points.shape[0]):
+            ln_post.append(wrappedblackbox(start_points[idx, :]))
     index_best_half = np.argsort(ln_post)[:size]
     best_points = start_points[index_best_half, :]
     return best_points
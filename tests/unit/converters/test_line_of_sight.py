@@ -7,6 +7,7 @@ import pytest
 from xarray import DataArray
 
 from indica.converters import line_of_sight
+from indica.converters.abstractconverter import find_wall_intersections
 from indica.defaults.load_defaults import load_default_objects
 
 
@@ -96,6 +97,68 @@ class TestHelike:
 
         assert pytest.approx(np.abs(dl - dl_out) / dl, abs=1.0e-2) == 0
 
+    def test_find_wall_intersections(self):
+        machine_dims = ((0.15, 0.85), (-0.75, 0.75))
+        origin = (
+            np.array([2.0, 2.0, 0.5]),
+            np.array([0.0, 0.5, 0.0]),
+            np.array([0.0, 0.0, -2.0]),
+        )
+        direction = (np.array([-1.0, -1.0, 0.0]), 0.0, np.array([0.0, 0.0, 1.0]))
+
+        start, end = find_wall_intersections(origin, direction, machine_dims)
+
+        x_outer = np.sqrt(0.85**2 - 0.5**2)
+        np.testing.assert_allclose(start[0], [0.85, x_outer, 0.5])
+        np.testing.assert_allclose(end[0], [0.15, -x_outer, 0.5])
+        np.testing.assert_allclose(start[2], [0.0, 0.0, -0.75])
+        np.testing.assert_allclose(end[2], [0.0, 0.0, 0.75])
+
+    def test_set_dl_equals_single_beamlet_intersections(self):
+        xrcs = self.los_transform
+        los_transform = line_of_sight.LineOfSightTransform(
+            xrcs.origin_x,
+            xrcs.origin_y,
+            xrcs.origin_z,
+            xrcs.direction_x,
+            xrcs.direction_y,
+            xrcs.direction_z,
+            machine_dimensions=self.machine_dims,
+            beamlets=9,
+            spot_width=0.05,
+        )
+        for channel, beamlet in np.ndindex(los_transform.beamlet_origin_x.shape):
+            start, end = find_wall_intersections(
+                (
+                    los_transform.beamlet_origin_x[channel, beamlet],
+                    los_transform.beamlet_origin_y[channel, beamlet],
+                    los_transform.beamlet_origin_z[channel, beamlet],
+                ),
+                (
+                    los_transform.beamlet_direction_x[channel, beamlet],
+                    los_transform.beamlet_direction_y[channel, beamlet],
+                    los_transform.beamlet_direction_z[channel, beamlet],
+                ),
+                self.machine_dims,
+            )
+            for name, value in zip(["x_start", "y_start", "z_start"], start):
+                position = getattr(los_transform, name)[channel, beamlet]
+                np.testing.assert_allclose(position, value)
+            for name, value in zip(["x_end", "y_end", "z_end"], end):
+                position = getattr(los_transform, name)[channel, beamlet]
+                np.testing.assert_allclose(position, value)
+
+        length = np.sqrt(
+            (los_transform.x_end - los_transform.x_start) ** 2
+            + (los_transform.y_end - los_transform.y_start) ** 2
+            + (los_transform.z_end - los_transform.z_start) ** 2
+        )
+        assert los_transform.x.dims == ("channel", "beamlet", "los_position")
+        np.testing.assert_allclose(
+            los_transform.x.count("los_position"),
+            np.floor(length / los_transform.dl + 1.0e-6) + 1,
+        )
+
     def test_missing_los(self):
         # TODO: substitute print with better testing assertion
         origin = np.array(
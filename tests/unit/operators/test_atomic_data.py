@@ -1,9 +1,13 @@
 import numpy as np
 import pytest
+import xarray as xr
 from xarray import DataArray
 
+from indica.operators.atomic_data import AtomicDataRegistry
 from indica.operators.atomic_data import FractionalAbundance
 from indica.operators.atomic_data import PowerLoss
+from indica.operators.atomic_data import RateInterpolator
+from indica.operators.atomic_data_tables import AtomicDataTable
 from indica.readers import ADASReader
 
 ELEMENT = "be"
@@ -450,6 +454,91 @@ def test_frac_abund_full_run(test_fractional_abundance_init):
         assert np.abs(test_normalization - 1.0) <= 2e-2
 
 
+def test_frac_abund_tridiagonal_solver(test_fractional_abundance_init):
+    """Test vectorised tridiagonal solver against null space reference."""
+    (
+        example_frac_abundance,
+        example_frac_abundance_no_optional,
+    ) = test_fractional_abundance_init
+
+    input_Ne = np.logspace(19.0, 16.0, 10)
+    input_Ne = DataArray(
+        data=input_Ne,
+        coords={"rhop": np.linspace(0.0, 1.0, 10)},
+        dims=["rhop"],
+    )
+
+    input_Te = np.logspace(4.6, 2, 10)
+    input_Te = DataArray(
+        data=input_Te,
+        coords={"rhop": np.linspace(0.0, 1.0, 10)},
+        dims=["rhop"],
+    )
+
+    input_Nh = 1e-5 * input_Ne
+
+    for frac_abundance, Nh in [
+        (example_frac_abundance_no_optional, None),
+        (example_frac_abundance, input_Nh),
+    ]:
+        F_z_reference = frac_abundance(
+            input_Te, input_Ne, Nh, full_run=True, solver="null_space"
+        )
+        F_z_t = frac_abundance(
+            input_Te, input_Ne, Nh, full_run=True, solver="tridiagonal"
+        )
+
+        assert F_z_t.shape == (5, 10)
+        assert np.allclose(F_z_t, F_z_reference, atol=1e-8)
+        assert np.allclose(F_z_t.sum("ion_charge"), 1.0)
+
+    with pytest.raises(ValueError):
+        example_frac_abundance(input_Te, input_Ne, full_run=True, solver="unknown")
+
+    # A charge with neither ionisation nor recombination empties higher charges
+    F_z_t = example_frac_abundance(input_Te, input_Ne, input_Nh, full_run=True)
+    for rates in ["scd_spec", "acd_spec", "ccd_spec"]:
+        getattr(example_frac_abundance, rates)[2, 0] = 0.0
+    F_z_decoupled = example_frac_abundance.calc_F_z_tinf_tridiagonal(input_Ne, input_Nh)
+
+    assert not np.any(np.isnan(F_z_decoupled))
+    assert np.all(F_z_decoupled[3:, 0] == 0)
+    assert np.allclose(F_z_decoupled[:3, 0], F_z_t[:3, 0] / F_z_t[:3, 0].sum())
+    assert np.allclose(F_z_decoupled[:, 1:], F_z_t[:, 1:])
+
+
+def test_frac_abund_batched_tau(test_fractional_abundance_init):
+    """Test batched time evolution against point by point reference."""
+    example_frac_abundance, _ = test_fractional_abundance_init
+
+    rhop = np.linspace(0.0, 1.0, 10)
+    input_Ne = DataArray(data=np.logspace(19.0, 16.0, 10), coords=[("rhop", rhop)])
+    input_Te = DataArray(data=np.logspace(4.6, 2, 10), coords=[("rhop", rhop)])
+    input_Nh = 1e-5 * input_Ne
+
+    for tau in [1e-4, DataArray(data=np.logspace(0, -10, 10), coords=[("rhop", rhop)])]:
+        F_z_reference = example_frac_abundance(
+            input_Te, input_Ne, input_Nh, tau=tau, full_run=True, solver="null_space"
+        )
+        F_z_t = example_frac_abundance(
+            input_Te, input_Ne, input_Nh, tau=tau, full_run=True, solver="tridiagonal"
+        )
+
+        assert F_z_t.shape == (5, 10)
+        assert np.allclose(F_z_t, F_z_reference, atol=1e-8)
+
+    # Scan of tau values re-using the same eigendecomposition
+    tau_scan = DataArray(data=np.logspace(-8, 0, 4), dims=["tau_scan"])
+    F_z_scan = example_frac_abundance.calculate_abundance_batched(tau_scan)
+
+    assert F_z_scan.shape == (5, 10, 4)
+    for itau, tau in enumerate(tau_scan.values):
+        F_z_t = example_frac_abundance(
+            input_Te, input_Ne, input_Nh, tau=tau, full_run=True
+        )
+        assert np.allclose(F_z_scan.isel(tau_scan=itau), F_z_t)
+
+
 @pytest.fixture
 def test_power_loss_init():
     """Test initialisation of PowerLoss class."""
@@ -671,3 +760,144 @@ def test_power_loss_full_run(test_power_loss_init):
 
     assert np.all(np.logical_not(np.isnan(cooling_factor)))
     assert np.all(np.logical_not(np.isinf(cooling_factor)))
+
+
+def test_power_loss_time_and_radius(test_power_loss_init):
+    """Test that cooling factors for (t, rhop) inputs match slice by slice ones."""
+    example_power_loss, _ = test_power_loss_init
+
+    coords = [("t", np.array([0.01, 0.02, 0.03])), ("rhop", np.linspace(0, 1.0, 10))]
+    input_Te = DataArray(data=np.logspace(4.6, 2, 30).reshape(3, 10), coords=coords)
+    input_Ne = DataArray(data=np.logspace(19.0, 16.0, 30).reshape(3, 10), coords=coords)
+    input_Nh = 1e-5 * input_Ne
+
+    example_frac_abundance = FractionalAbundance(scd, acd, ccd=ccd)
+    F_z_t = example_frac_abundance(input_Te, input_Ne, input_Nh, full_run=True)
+
+    cooling_factor = example_power_loss(
+        input_Te, F_z_t, Ne=input_Ne, Nh=input_Nh, full_run=True
+    )
+
+    assert cooling_factor.shape == (5, 3, 10)
+
+    for t in input_Te.t:
+        _cooling_factor = example_power_loss(
+            input_Te.sel(t=t),
+            F_z_t.sel(t=t),
+            Ne=input_Ne.sel(t=t),
+            Nh=input_Nh.sel(t=t),
+            full_run=True,
+        )
+        assert np.allclose(_cooling_factor, cooling_factor.sel(t=t))
+
+    # Densities are aligned by dimension name, not by position
+    _cooling_factor = example_power_loss(
+        input_Te,
+        F_z_t,
+        Ne=input_Ne.transpose(),
+        Nh=input_Nh.transpose(),
+        full_run=True,
+    )
+    assert np.allclose(_cooling_factor, cooling_factor)
+
+
+def test_atomic_data_table(test_power_loss_init, tmp_path):
+    """Test atomic data tables against direct calculation and write/read to file."""
+    example_power_loss, _ = test_power_loss_init
+    example_frac_abundance = FractionalAbundance(scd, acd, ccd=ccd)
+
+    Te_grid = np.logspace(1, 4, 31)
+    Ne_grid = np.logspace(18, 20, 3)
+    table = AtomicDataTable(
+        example_frac_abundance,
+        example_power_loss,
+        Te=Te_grid,
+        Ne=Ne_grid,
+        Nh_Ne=np.array([0.0, 1.0e-5]),
+        tau=np.logspace(-6, 0, 7),
+    )
+    table.build()
+
+    # Grid nodes must be reproduced exactly
+    rhop = np.linspace(0.0, 1.0, 5)
+    input_Te = DataArray(data=Te_grid[::6][:5], coords=[("rhop", rhop)])
+    input_Ne = DataArray(data=np.full(5, Ne_grid[1]), coords=[("rhop", rhop)])
+    input_Nh = 1e-5 * input_Ne
+
+    fz, cooling_factor = table(input_Te, input_Ne, Nh=input_Nh)
+    F_z_t = example_frac_abundance(input_Te, input_Ne, input_Nh, full_run=True)
+    _cooling_factor = example_power_loss(
+        input_Te, F_z_t, Ne=input_Ne, Nh=input_Nh, full_run=True
+    )
+
+    assert fz.shape == (5, 5)
+    assert np.allclose(fz, F_z_t)
+    assert np.allclose(cooling_factor, _cooling_factor)
+
+    fz, _ = table(input_Te, input_Ne, Nh=input_Nh, tau=1.0e-3)
+    F_z_t = example_frac_abundance(
+        input_Te, input_Ne, input_Nh, tau=1.0e-3, full_run=True
+    )
+    assert np.allclose(fz, F_z_t)
+
+    # Off-grid values and extrapolation
+    input_Te = DataArray(data=np.logspace(4.5, 0.5, 5), coords=[("rhop", rhop)])
+    fz, _ = table(input_Te, input_Ne)
+    assert np.all(np.isfinite(fz))
+    assert np.allclose(fz.sum("ion_charge"), 1.0)
+
+    filename = tmp_path / "table.nc"
+    table.write(filename)
+    _table = AtomicDataTable(example_frac_abundance, example_power_loss)
+    _table.read(filename)
+    assert np.allclose(_table(input_Te, input_Ne)[0], fz)
+
+    _table = AtomicDataTable(
+        example_frac_abundance, example_power_loss, Te=Te_grid, Ne=Ne_grid
+    )
+    with pytest.raises(ValueError):
+        _table(input_Te, input_Ne, tau=1.0e-3)
+
+
+def test_atomic_data_registry():
+    """Test sharing and invalidation of atomic data in AtomicDataRegistry."""
+    registry = AtomicDataRegistry(maxsize=1)
+    fract_abu, power_loss = registry.get(ELEMENT)
+    fract_abu_other, _ = registry.get(ELEMENT)
+    assert ELEMENT in registry
+    assert fract_abu is not fract_abu_other
+    assert fract_abu.scd is fract_abu_other.scd
+    assert not fract_abu.scd.values.flags.writeable
+    F_z_t_default = fract_abu_other.F_z_t
+
+    Te = DataArray(np.logspace(2, 3, 5), coords={"rhop": np.linspace(0, 1, 5)})
+    Ne = 5.0e19 * xr.ones_like(Te)
+    F_z_t = fract_abu(Ne=Ne, Te=Te)
+    assert F_z_t.shape == (scd.ion_charge.size + 1, 5)
+    assert registry.get(ELEMENT)[0].F_z_t is F_z_t_default
+
+    registry.get("h")
+    assert len(registry) == 1
+    assert ELEMENT not in registry
+    registry.invalidate()
+    assert len(registry) == 0
+
+
+def test_rate_interpolator():
+    """Test RateInterpolator reproduces the rate table on its grid."""
+    interpolator = RateInterpolator(scd)
+    Te = scd.electron_temperature.values[2:8]
+    Ne = np.full_like(Te, scd.electron_density.values[3])
+    coords = {"rhop": np.linspace(0.0, 1.0, Te.size)}
+    result = interpolator(
+        DataArray(Te, coords=coords, dims=["rhop"]),
+        DataArray(Ne, coords=coords, dims=["rhop"]),
+    )
+    assert result.dims == ("ion_charge", "rhop")
+    np.testing.assert_allclose(
+        result.values, scd.values[:, 2:8, 3], rtol=1e-10, atol=0.0
+    )
+
+    Te_out = DataArray([0.1 * Te[0]], coords={"rhop": [0.0]}, dims=["rhop"])
+    Ne_out = DataArray([Ne[0]], coords={"rhop": [0.0]}, dims=["rhop"])
+    assert np.all(np.isnan(interpolator(Te_out, Ne_out)))
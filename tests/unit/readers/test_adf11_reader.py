@@ -1,3 +1,72 @@
 """Implement ADF11 reader test similar to test_adf15_reader"""
 
 # Check against results for a synthetic ADF11 file with simple data
+
+import os
+
+import numpy as np
+from xarray.testing import assert_identical
+
+from indica.readers import adas
+from indica.readers import ADASReader
+
+DENSITIES = np.array([13.0, 14.0])
+TEMPERATURES = np.array([0.0, 1.0, 2.0])
+
+
+def write_synthetic_adf11(path, offset=0.0):
+    """Write a synthetic ADF11 file for helium with simple data"""
+    filename = path / "adf11" / "scd96" / "scd96_he.dat"
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    lines = [
+        f"    2    {DENSITIES.size}    {TEMPERATURES.size}    1    2     /HE  /",
+        "-" * 80,
+        " ".join(f"{d:.5f}" for d in DENSITIES),
+        " ".join(f"{t:.5f}" for t in TEMPERATURES),
+    ]
+    for z1 in range(1, 3):
+        lines.append(f"-------/ Z1=  {z1}   / DATE= 18/09/96")
+        values = -10.0 - z1 + offset + np.arange(TEMPERATURES.size * DENSITIES.size)
+        lines.append(" ".join(f"{v:.5f}" for v in values))
+    filename.write_text("\n".join(lines) + "\n")
+    return filename
+
+
+def test_read_synthetic(tmp_path):
+    write_synthetic_adf11(tmp_path)
+    data = ADASReader(tmp_path, cache=False).get_adf11("scd", "he", "96")
+    assert data.dims == ("ion_charge", "electron_temperature", "electron_density")
+    np.testing.assert_array_equal(data.ion_charge, [0, 1])
+    np.testing.assert_allclose(data.electron_temperature, 10**TEMPERATURES)
+    np.testing.assert_allclose(data.electron_density, 10 ** (DENSITIES + 6))
+    np.testing.assert_allclose(data.sel(ion_charge=0)[0, 0], 10 ** (-11.0 - 6))
+    assert data.attrs["element"] == "he"
+
+
+def test_cache(tmp_path, monkeypatch):
+    """Checks cached reads are identical to parsing the file, that
+    modifying the file invalidates the cache and that rebuilding the cache
+    leaves previously read arrays unchanged"""
+    monkeypatch.setattr(adas, "CACHE_PATH", tmp_path / "cache")
+    filename = write_synthetic_adf11(tmp_path)
+    reader = ADASReader(tmp_path)
+
+    parsed = ADASReader(tmp_path, cache=False).get_adf11("scd", "he", "96")
+    first = reader.get_adf11("scd", "he", "96")
+    assert len(list((tmp_path / "cache").glob("*.npy"))) == 1
+    cached = reader.get_adf11("scd", "he", "96")
+    assert not cached.data.flags.writeable
+    assert_identical(cached, parsed)
+    assert_identical(first, parsed)
+    assert cached.attrs == parsed.attrs
+
+    write_synthetic_adf11(tmp_path, offset=1.0)
+    stat = filename.stat()
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    modified = reader.get_adf11("scd", "he", "96")
+    np.testing.assert_allclose(modified, parsed * 10)
+    assert len(list((tmp_path / "cache").glob("*.npy"))) == 1
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+    # Arrays mapped from the previous cache entry are not modified
+    assert_identical(cached, parsed)
+    np.testing.assert_allclose(reader.get_adf11("scd", "he", "96"), modified)
@@ -0,0 +1,70 @@
+import numpy as np
+from xarray.testing import assert_identical
+
+from indica import Equilibrium
+from indica.defaults.load_defaults import load_default_objects
+from indica.readers import EquilibriumStore
+from indica.readers.geqdsk import read_equilibrium_data
+from indica.readers.geqdsk import read_geqdsk
+from indica.readers.geqdsk import write_geqdsk
+
+
+class TestGEQDSK:
+    def setup_class(self):
+        self.equilibrium = load_default_objects("st40", "equilibrium")
+        self.t = self.equilibrium.t.values[[10, 20]]
+
+    def test_read_write_round_trip(self, tmp_path):
+        filename = tmp_path / "g_10"
+        self.equilibrium.write_to_geqdsk(filename, self.t[0])
+        geqdsk = read_geqdsk(filename)
+        assert geqdsk["psirz"].shape == (geqdsk["nh"], geqdsk["nw"])
+        np.testing.assert_allclose(
+            geqdsk["psirz"],
+            self.equilibrium.psi.sel(t=self.t[0]).transpose("z", "R"),
+            rtol=1e-8,
+        )
+
+        write_geqdsk(tmp_path / "g_copy", geqdsk)
+        copy = read_geqdsk(tmp_path / "g_copy")
+        assert copy.keys() == geqdsk.keys()
+        for name, value in geqdsk.items():
+            np.testing.assert_array_equal(copy[name], value)
+
+    def test_equilibrium_from_geqdsk(self, tmp_path):
+        filenames = [tmp_path / f"g_{i}" for i in range(self.t.size)]
+        for filename, t in zip(filenames, self.t):
+            self.equilibrium.write_to_geqdsk(filename, t)
+        equilibrium = Equilibrium(read_equilibrium_data(filenames, self.t))
+
+        expected = self.equilibrium
+        np.testing.assert_allclose(
+            equilibrium.rhop, expected.rhop.sel(t=self.t), atol=1e-6
+        )
+        np.testing.assert_allclose(equilibrium.f, expected.f.sel(t=self.t), rtol=1e-6)
+        np.testing.assert_allclose(
+            equilibrium.rhot, expected.rhot.sel(t=self.t), atol=2e-3
+        )
+        np.testing.assert_allclose(
+            equilibrium.rmjo, expected.rmjo.sel(t=self.t), atol=5e-3
+        )
+        R, z = expected.rhop.R, expected.rhop.z
+        np.testing.assert_allclose(
+            equilibrium.flux_coords(R, z, self.t)[0],
+            expected.flux_coords(R, z, self.t)[0],
+            atol=1e-6,
+        )
+
+
+def test_equilibrium_store(tmp_path):
+    equilibrium = load_default_objects("st40", "equilibrium")
+    store = EquilibriumStore(tmp_path)
+    store.write("st40_11560_efit", equilibrium._data)
+    assert store.keys() == ["st40_11560_efit"]
+
+    data = store.read("st40_11560_efit")
+    assert isinstance(data["psi"].data.base, np.memmap)
+    assert not data["psi"].data.flags.writeable
+    for name, value in equilibrium._data.items():
+        assert_identical(data[name], value)
+    np.testing.assert_array_equal(Equilibrium(data).rhop, equilibrium.rhop)
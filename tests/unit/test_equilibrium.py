@@ -0,0 +1,185 @@
+import numpy as np
+import xarray as xr
+
+from indica import equilibrium
+from indica.defaults.load_defaults import load_default_objects
+
+
+class TestEquilibrium:
+    def setup_method(self):
+        self.equilibrium = load_default_objects("st40", "equilibrium")
+        self.transform = load_default_objects("st40", "geometry")["xrcs"]
+
+    def test_flux_coords_equal_xarray_interpolation(self):
+        equilibrium = self.equilibrium
+        R, z = self.transform.R, self.transform.z
+        t = equilibrium.t.values[[10, 20]] + 1.0e-4
+        rhop, theta, _ = equilibrium.flux_coords(R, z, t=t)
+
+        expected = equilibrium.rhop.interp(t=t, method="nearest").interp(R=R, z=z)
+        expected = xr.where((expected < 0.0) * (expected > -1e-12), 0.0, expected)
+        assert rhop.dims == expected.dims
+        np.testing.assert_allclose(rhop, expected, rtol=1e-12)
+
+        _rhop, _theta = equilibrium.flux_coords_values(R.values, z.values, t[1])
+        np.testing.assert_allclose(_rhop, rhop.sel(t=t[1]), rtol=1e-12)
+        np.testing.assert_allclose(_theta, theta.sel(t=t[1]).transpose(*R.dims))
+
+    def test_time_slice_cache_bounded(self, monkeypatch):
+        monkeypatch.setattr(equilibrium, "TIME_SLICE_CACHE_SIZE", 2)
+        _equilibrium = self.equilibrium
+        t = _equilibrium.t.values
+        time_slice = _equilibrium.time_slice(t[0])
+        interpolant = time_slice.interpolant("rhop")
+        assert _equilibrium.time_slice(t[0] + 1.0e-4) is time_slice
+        assert time_slice.interpolant("rhop") is interpolant
+        _equilibrium.time_slice(t[1])
+        _equilibrium.time_slice(t[2])
+        assert len(_equilibrium._time_slices) == 2
+        assert _equilibrium.time_slice(t[0]) is not time_slice
+
+    def test_linear_time_interpolation(self):
+        data = self.equilibrium._data
+        t = self.equilibrium.t.values
+        # Equilibrium with every other time slice, evaluated at the missing ones
+        sparse = equilibrium.Equilibrium(
+            {
+                key: value.isel(t=slice(None, None, 2)) if "t" in value.dims else value
+                for key, value in data.items()
+            },
+            t_method="linear",
+        )
+        R, z = self.transform.R, self.transform.z
+        _t = t[1:-1:2]
+        rhop, _, _ = self.equilibrium.flux_coords(R, z, t=_t)
+        rhop_linear, _, _ = sparse.flux_coords(R, z, t=_t)
+        sparse.t_method = "nearest"
+        rhop_nearest, _, _ = sparse.flux_coords(R, z, t=_t)
+        error_linear = np.abs(rhop_linear - rhop).mean()
+        assert error_linear < np.abs(rhop_nearest - rhop).mean()
+
+        sparse.t_method = "linear"
+        t_mid = (sparse.t.values[3] + sparse.t.values[4]) / 2
+        expected = np.sqrt((sparse.rhop.isel(t=[3, 4]) ** 2).mean("t"))
+        np.testing.assert_allclose(
+            sparse.select_time("rhop", t_mid), expected, rtol=1e-6
+        )
+        np.testing.assert_allclose(
+            sparse.select_time("rmag", [t_mid]), sparse.rmag.isel(t=[3, 4]).mean()
+        )
+        _rhop, _ = sparse.flux_coords_values(R.values, z.values, t_mid)
+        np.testing.assert_allclose(
+            _rhop, sparse.select_time("rhop", t_mid).interp(R=R, z=z), rtol=1e-12
+        )
+
+    def test_bfield_equal_psi_gradient(self):
+        equilibrium = self.equilibrium
+        R, z = self.transform.R, self.transform.z
+        t = equilibrium.t.values[15]
+        b_R, b_z, b_T, _ = equilibrium.Bfield(R, z, t=t)
+
+        psi = equilibrium.psi.sel(t=t)
+        expected_b_R = -psi.differentiate("z").interp(R=R, z=z) / R
+        expected_b_z = psi.differentiate("R").interp(R=R, z=z) / R
+        np.testing.assert_allclose(b_R, expected_b_R.T, rtol=1e-12)
+        np.testing.assert_allclose(b_z, expected_b_z.T, rtol=1e-12)
+
+        _b_R, _b_z, _b_T = equilibrium.Bfield_values(R.values, z.values, t)
+        np.testing.assert_allclose(_b_R, expected_b_R, rtol=1e-12)
+        np.testing.assert_allclose(_b_z, expected_b_z, rtol=1e-12)
+        np.testing.assert_allclose(_b_T, b_T.transpose(*R.dims), rtol=1e-10)
+
+    def test_spatial_coords_inverse_of_flux_coords(self):
+        equilibrium = self.equilibrium
+        rho = xr.DataArray(np.linspace(0.1, 0.9, 9), dims="rhop")
+        theta = xr.DataArray(
+            np.linspace(0, 2 * np.pi, 16, endpoint=False), dims="theta"
+        )
+        t = equilibrium.t.values[[10, 20]]
+        R, z, _ = equilibrium.spatial_coords(rho, theta, t)
+        assert R.dims == ("t", "rhop", "theta")
+
+        for _t in t:
+            _rho, _theta = equilibrium.flux_coords_values(
+                R.sel(t=_t).values, z.sel(t=_t).values, _t
+            )
+            np.testing.assert_allclose(
+                _rho, np.broadcast_to(rho.values[:, np.newaxis], _rho.shape), atol=2e-3
+            )
+            np.testing.assert_allclose(
+                np.cos(_theta),
+                np.cos(np.broadcast_to(theta.values, _theta.shape)),
+                atol=1e-6,
+            )
+
+    def test_convert_flux_coords_equal_rhot_and_invertible(self):
+        equilibrium = self.equilibrium
+        t = equilibrium.t.values[[10, 20]]
+        rhot = equilibrium.rhot.sel(t=t)
+        rhop = rhot.rhop
+
+        _rhot, _ = equilibrium.convert_flux_coords(-rhop, t)
+        assert _rhot.dims == ("t", "rhop")
+        np.testing.assert_allclose(_rhot, rhot.transpose(*_rhot.dims), atol=1e-5)
+
+        _rhop, _ = equilibrium.convert_flux_coords(_rhot, t, "toroidal", "poloidal")
+        np.testing.assert_allclose(_rhop.isel(t=0), rhop, atol=1e-5)
+        _rhop, _ = equilibrium.convert_flux_coords(1.5, t[0], "toroidal", "poloidal")
+        assert np.isnan(_rhop) and _rhop.t == t[0]
+
+    def test_volume_and_area_without_jacobians(self):
+        data = {
+            key: value
+            for key, value in self.equilibrium._data.items()
+            if key not in ("vjac", "ajac")
+        }
+        _equilibrium = equilibrium.Equilibrium(data)
+        # Calculated from the flux surfaces on first use
+        assert _equilibrium._volume is None and _equilibrium._area is None
+        t = self.equilibrium.t.values[[10, 20]]
+        for name in ["volume", "area"]:
+            np.testing.assert_allclose(
+                getattr(_equilibrium, name).sel(t=t, rhop=1.0),
+                getattr(self.equilibrium, name).sel(t=t, rhop=1.0),
+                rtol=0.03,
+            )
+        # Cross-sectional area of the boundary polygon
+        rbnd, zbnd = self.equilibrium.rbnd.sel(t=t), self.equilibrium.zbnd.sel(t=t)
+        area = 0.5 * np.abs(
+            (rbnd * zbnd.roll(index=1) - zbnd * rbnd.roll(index=1)).sum("index")
+        )
+        np.testing.assert_allclose(
+            _equilibrium.area.sel(t=t, rhop=1.0), area, rtol=5e-3
+        )
+
+        volume, _ = _equilibrium.enclosed_volume(0.5, t=t[0])
+        np.testing.assert_allclose(
+            volume, _equilibrium.volume.sel(t=t[0]).interp(rhop=0.5)
+        )
+
+    def test_flux_surface_average_and_volume_integral(self):
+        _equilibrium = self.equilibrium
+        t = _equilibrium.t.values[[10, 20]]
+        rhop = np.linspace(0.1, 1.0, 10)
+        average = _equilibrium.flux_surface_average(_equilibrium.rhop, t=t, rhop=rhop)
+        assert average.dims == ("t", "rhop")
+        np.testing.assert_allclose(average, np.broadcast_to(rhop, (2, 10)), atol=1e-4)
+
+        profile = xr.DataArray(
+            np.outer(np.linspace(0, 1.2, 25) ** 2, np.ones(16)),
+            coords={
+                "rhop": np.linspace(0, 1.2, 25),
+                "theta": np.linspace(-np.pi, np.pi, 16, endpoint=False),
+            },
+            dims=("rhop", "theta"),
+        )
+        average = _equilibrium.flux_surface_average(profile, t=t[0], rhop=rhop)
+        np.testing.assert_allclose(average, rhop**2, atol=1e-3)
+
+        ones = xr.concat([xr.ones_like(_equilibrium.rhop)] * 2, "element")
+        volume = _equilibrium.volume_integral(ones, t=t)
+        assert volume.dims == ("element", "t", "rhop")
+        expected, _ = _equilibrium.flux_surface_volume_area()
+        np.testing.assert_allclose(
+            volume.isel(element=1), expected.sel(t=t), rtol=1e-2, atol=1e-3
+        )
@@ -0,0 +1,266 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from indica.defaults.load_defaults import load_default_objects
+from indica.examples.example_plasma import example_plasma
+from indica.plasma import INDEPENDENT_QUANTITIES
+from indica.plasma import Plasma
+
+
+class TestPlasma:
+    def setup_method(self):
+        self.plasma = load_default_objects("st40", "plasma")
+        self.equilibrium = load_default_objects("st40", "equilibrium")
+        self.plasma.set_equilibrium(self.equilibrium)
+
+    def test_fz_lz_tot_equal_time_by_time_evaluation(self):
+        plasma = self.plasma
+        plasma.full_run = True
+        fz = plasma.fz
+        lz_tot = plasma.lz_tot
+        for elem in plasma.elements:
+            for t in plasma.t.values:
+                Te = plasma.electron_temperature.sel(t=t)
+                Ne = plasma.electron_density.sel(t=t)
+                _fz = plasma.fract_abu[elem](Te, Ne=Ne, full_run=True)
+                _lz_tot = plasma.power_loss_tot[elem](Te, _fz, Ne=Ne, full_run=True)
+                np.testing.assert_allclose(fz[elem].sel(t=t), _fz.transpose())
+                np.testing.assert_allclose(lz_tot[elem].sel(t=t), _lz_tot.transpose())
+
+    def test_fz_interpolated_after_full_run(self):
+        plasma = self.plasma
+        plasma.full_run = True
+        plasma.electron_temperature.values *= 2.0
+        plasma.bump_generation("electron_temperature")
+        fz_full_run = {elem: plasma.fz[elem].copy() for elem in plasma.elements}
+
+        # Te-only interpolation of the full run state, returning its values on
+        # the same electron temperature
+        plasma.full_run = False
+        plasma.bump_generation("electron_temperature")
+        for elem in plasma.elements:
+            np.testing.assert_allclose(plasma.fz[elem], fz_full_run[elem], atol=0.02)
+            assert np.all(np.isfinite(plasma.lz_tot[elem]))
+
+        t0, t1 = plasma.t.values[:2]
+        plasma.electron_temperature.loc[dict(t=t1)] = plasma.electron_temperature.sel(
+            t=t0
+        )
+        plasma.bump_generation("electron_temperature")
+        for elem in plasma.elements:
+            fz = plasma.fz[elem].sel(t=t1)
+            assert np.all(np.isfinite(fz))
+            np.testing.assert_allclose(fz.sum("ion_charge"), 1.0, rtol=1e-3)
+            assert not np.allclose(fz, fz_full_run[elem].sel(t=t1))
+
+    def test_fz_skips_times_without_profiles(self):
+        plasma = self.plasma
+        t = plasma.t.values[0]
+        fz_t = plasma.fz[plasma.main_ion].sel(t=t).copy()
+        plasma.electron_temperature.loc[dict(t=t)] = 0.0
+        plasma.electron_density.loc[dict(t=t)] *= 2.0
+        plasma.bump_generation("electron_temperature", "electron_density")
+        np.testing.assert_array_equal(plasma.fz[plasma.main_ion].sel(t=t), fz_t)
+
+    def test_geometry_cached_until_equilibrium_set(self):
+        plasma = self.plasma
+        volume = plasma.volume
+        assert plasma.volume is volume
+        np.testing.assert_array_equal(
+            volume, plasma.equilibrium.volume.interp(rhop=plasma.rhop, t=plasma.t)
+        )
+        assert plasma.rmag.dims == ("t",)
+
+        plasma.set_equilibrium(self.equilibrium)
+        assert plasma.volume is not volume
+
+    def test_volume_integrals_equal_trapz(self):
+        plasma = self.plasma
+        wth, wfast, prad_tot = plasma.wth, plasma.wfast, plasma.prad_tot
+        for t in plasma.t.values:
+            volume = plasma.volume.sel(t=t)
+            np.testing.assert_allclose(
+                wth.sel(t=t),
+                3 / 2 * np.trapz(plasma.thermal_pressure.sel(t=t), volume),
+            )
+            np.testing.assert_allclose(
+                wfast.sel(t=t),
+                3 / 2 * np.trapz(plasma.fast_ion_pressure.sel(t=t), volume),
+            )
+            for elem in plasma.elements:
+                np.testing.assert_allclose(
+                    prad_tot.sel(element=elem, t=t),
+                    np.trapz(plasma.total_radiation.sel(element=elem, t=t), volume),
+                )
+
+    def test_ensemble_equals_single_sample_evaluation(self):
+        plasma = example_plasma()
+        ensemble = example_plasma(n_samples=2)
+        for _plasma in (plasma, ensemble):
+            _plasma.set_equilibrium(self.equilibrium)
+        ensemble.electron_temperature.loc[dict(sample=1)] *= 1.5
+        ensemble.bump_generation("electron_temperature")
+
+        assert ensemble.zeff.dims[0] == "sample"
+        for name in ["zeff", "total_radiation", "wth", "prad_tot"]:
+            single = getattr(plasma, name)
+            np.testing.assert_allclose(
+                getattr(ensemble, name).isel(sample=0).transpose(*single.dims), single
+            )
+        for elem in plasma.elements:
+            np.testing.assert_allclose(
+                ensemble.fz[elem].isel(sample=0), plasma.fz[elem]
+            )
+        assert not np.allclose(ensemble.meanz.isel(sample=1), plasma.meanz)
+
+    def test_only_modified_time_slices_recalculated(self):
+        plasma = self.plasma
+        plasma.full_run = True
+        zeff = plasma.zeff.copy()
+        total_radiation = plasma.total_radiation.copy()
+
+        t = plasma.t.values[1]
+        plasma.time_to_calculate = t
+        plasma.electron_temperature.loc[dict(t=t)] *= 1.5
+        plasma.impurity_density.loc[dict(t=t)] *= 2.0
+        plasma.bump_generation("electron_temperature", "impurity_density", t=t)
+        assert plasma.Total_radiation._dirty_times == {t}
+        zeff_sliced = plasma.zeff.copy()
+        total_radiation_sliced = plasma.total_radiation.copy()
+        assert plasma.Total_radiation._dirty_times == set()
+
+        other_times = plasma.t.values[plasma.t.values != t]
+        np.testing.assert_array_equal(
+            zeff_sliced.sel(t=other_times), zeff.sel(t=other_times)
+        )
+        assert not np.allclose(
+            total_radiation_sliced.sel(t=t), total_radiation.sel(t=t)
+        )
+
+        plasma.time_to_calculate = plasma.t.values
+        plasma.bump_generation("electron_temperature")
+        assert plasma.Total_radiation._dirty_times is None
+        np.testing.assert_allclose(zeff_sliced, plasma.zeff)
+        np.testing.assert_allclose(total_radiation_sliced, plasma.total_radiation)
+
+    def test_cached_quantities_are_read_only_views(self):
+        plasma = self.plasma
+        zeff = plasma.zeff
+        assert not zeff.data.flags.writeable
+        assert not plasma.fz[plasma.main_ion].data.flags.writeable
+        with pytest.raises(ValueError):
+            zeff.loc[dict(t=plasma.t[0])] = 0.0
+
+        zeff_copy = zeff.copy()
+        zeff_copy.loc[dict(t=plasma.t[0])] = 0.0
+        np.testing.assert_array_equal(plasma.zeff, zeff)
+
+    def test_snapshot_round_trip(self, tmp_path):
+        plasma = self.plasma
+        plasma.time_to_calculate = plasma.t.values[1]
+        filename = tmp_path / "plasma.nc"
+        plasma.write_snapshot(filename, equilibrium_reference="efit 11560")
+
+        snapshot = Plasma.read_snapshot(filename, equilibrium=self.equilibrium)
+        for name in INDEPENDENT_QUANTITIES:
+            xr.testing.assert_identical(getattr(snapshot, name), getattr(plasma, name))
+        np.testing.assert_array_equal(snapshot.rhop, plasma.rhop)
+        np.testing.assert_array_equal(snapshot.time_to_calculate, [plasma.t.values[1]])
+        # Atomic data attached on first use
+        assert "fract_abu" not in snapshot.__dict__
+        np.testing.assert_allclose(snapshot.zeff, plasma.zeff)
+        for elem in plasma.elements:
+            np.testing.assert_allclose(snapshot.lz_tot[elem], plasma.lz_tot[elem])
+        assert snapshot.impurities == plasma.impurities
+        assert snapshot.equilibrium is self.equilibrium
+
+    def test_map_to_2d_equals_interpolation(self):
+        plasma = self.plasma
+        rhop_2d = self.equilibrium.rhop.interp(t=plasma.t, R=plasma.R, z=plasma.z)
+        R_0 = self.equilibrium.rmjo.interp(t=plasma.t).interp(rhop=rhop_2d)
+        asymmetry_parameter = plasma.ion_temperature * 0.0 + 1.0
+
+        ion_density_2d = plasma.map_to_2d(plasma.ion_density, asymmetry_parameter)
+        assert plasma.map_to_2d().dims == ("element", "t", "z", "R")
+        assert plasma.flux_surface_map is plasma.flux_surface_map
+
+        expected = plasma.ion_density.interp(rhop=rhop_2d) * np.exp(
+            rhop_2d.R**2 - R_0**2
+        )
+        np.testing.assert_allclose(
+            ion_density_2d.transpose(*expected.dims), expected, rtol=1e-10
+        )
+
+    def test_atomic_data_tables_with_tau(self):
+        plasma = self.plasma
+        plasma.atomic_data_tables_grid = {
+            "Ne": np.logspace(17, 21, 5),
+            "tau": np.logspace(-6, 0, 4),
+        }
+        plasma.use_atomic_data_tables = True
+        plasma.build_atomic_data()
+        fz_equilibrium = plasma.fz[plasma.main_ion].copy()
+
+        plasma.tau.values[...] = 1.0e-3
+        plasma.bump_generation("tau")
+        fz = plasma.fz[plasma.main_ion]
+        assert np.all(np.isfinite(fz))
+        np.testing.assert_allclose(fz.sum("ion_charge"), 1.0)
+        assert not np.allclose(fz, fz_equilibrium)
+
+        atomic_data_tables = plasma.atomic_data_tables
+        plasma.build_atomic_data()
+        for elem in plasma.elements:
+            assert plasma.atomic_data_tables[elem] is atomic_data_tables[elem]
+
+    def test_atomic_data_tables_built_on_first_use(self):
+        plasma = self.plasma
+        plasma.atomic_data_tables_grid = {"Ne": np.logspace(17, 21, 5)}
+        fz = {elem: plasma.fz[elem].copy() for elem in plasma.elements}
+        assert "atomic_data_tables" not in plasma.__dict__
+
+        plasma.use_atomic_data_tables = True
+        for elem in plasma.elements:
+            _fz = plasma.fz[elem]
+            assert np.all(np.isfinite(_fz))
+            np.testing.assert_allclose(_fz.sum("ion_charge"), 1.0)
+            assert not _fz.equals(fz[elem])
+        assert set(plasma.atomic_data_tables) == set(plasma.elements)
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_parallel_atomic_data_equals_sequential(self, executor):
+        plasma = self.plasma
+        plasma.full_run = True
+        parallel = deepcopy(plasma)
+        parallel.n_workers = 2
+        parallel.executor = executor
+        with parallel:
+            for elem in plasma.elements:
+                np.testing.assert_array_equal(parallel.fz[elem], plasma.fz[elem])
+                np.testing.assert_array_equal(
+                    parallel.lz_tot[elem], plasma.lz_tot[elem]
+                )
+            executor_pool = parallel._executor_pool
+            assert executor_pool is not None
+
+            # Interpolation of the operator states set by the full run
+            for _plasma in [plasma, parallel]:
+                _plasma.full_run = False
+                _plasma.electron_temperature.values *= 1.01
+                _plasma.bump_generation("electron_temperature")
+            for elem in plasma.elements:
+                np.testing.assert_array_equal(parallel.fz[elem], plasma.fz[elem])
+                np.testing.assert_array_equal(
+                    parallel.lz_tot[elem], plasma.lz_tot[elem]
+                )
+            assert parallel._executor_pool is executor_pool
+
+            parallel.n_workers = 3
+            assert parallel._executor_pool is None
+            parallel.bump_generation("electron_temperature")
+            parallel.fz
+            assert parallel._executor_pool._max_workers == 3
+        assert parallel._executor_pool is None
@@ -1,4 +1,8 @@
+import numpy as np
+
 from indica.profilers.profiler_gauss import ProfilerGauss
+from indica.profilers.profiler_spline import ProfilerCubicSpline
+from indica.profilers.profiler_spline import ProfilerMonoSpline
 
 
 class TestProfilerGauss:
@@ -24,7 +28,8 @@ class TestProfilerGauss:
     def test_calls(self):
         for datatype in self.datatypes:
             prof = ProfilerGauss(datatype=datatype)
-            prof.__call__()
+            with np.errstate(divide="raise", invalid="raise"):
+                prof.__call__()
             assert hasattr(prof, "ydata")
 
     def test_extra_parameters_during_init(self):
@@ -37,6 +42,29 @@ class TestProfilerGauss:
             prof = ProfilerGauss(datatype=datatype, parameters={"y0": -1})
             assert getattr(prof, "y0") == -1
 
+    def test_array_parameters_give_sample_dimension(self):
+        for datatype in self.datatypes:
+            prof = ProfilerGauss(datatype=datatype)
+            profile = prof()
+            y0 = prof.y0 * np.array([1.0, 1.5])
+            prof.set_parameters(y0=y0)
+            profiles = prof()
+            assert profiles.dims == ("sample", profile.dims[0])
+            np.testing.assert_array_equal(profiles.isel(sample=0), profile)
+
+            prof.set_parameters(y0=y0[1])
+            np.testing.assert_array_equal(profiles.isel(sample=1), prof())
+
+
+def test_spline_array_parameters_give_sample_dimension():
+    for profiler in [ProfilerMonoSpline, ProfilerCubicSpline]:
+        prof = profiler(datatype="ion_temperature")
+        profile = prof()
+        prof.set_parameters(y0=prof.y0 * np.array([1.0, 1.1, 1.2]))
+        profiles = prof()
+        assert profiles.dims == ("sample", profile.dims[0])
+        np.testing.assert_array_equal(profiles.isel(sample=0), profile)
+
 
 if __name__ == "__main__":
     test = TestProfilerGauss()
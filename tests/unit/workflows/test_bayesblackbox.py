@@ -0,0 +1,215 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from indica import PlasmaProfiler
+from indica.defaults.load_defaults import load_default_objects
+from indica.examples.example_plasma import example_plasma
+from indica.profilers.profiler_gauss import initialise_gauss_profilers
+from indica.workflows.bda.bayesblackbox import BayesBlackBox
+from indica.workflows.bda.optimisers import bo_wrapper
+from indica.workflows.bda.optimisers import bo_wrapper_vectorized
+from indica.workflows.bda.optimisers import BOOptimiser
+from indica.workflows.bda.optimisers import BOSettings
+from indica.workflows.bda.optimisers import emcee_wrapper_vectorized
+from indica.workflows.bda.optimisers import EmceeOptimiser
+from indica.workflows.bda.optimisers import EmceeSettings
+from indica.workflows.bda.priors import PriorManager
+from indica.workflows.bda.priors import sample_best_half
+
+PARAM_NAMES = ["electron_temperature.y0", "electron_density.y0"]
+N_SAMPLES = 3
+
+
+def build_bckc(plasma, calls: list, **kwargs):
+    calls.append(kwargs)
+    t = plasma.time_to_calculate
+    return {
+        "model": {
+            "te": plasma.electron_temperature.sel(t=t),
+            "zeff": plasma.zeff.sel(t=t).sum("element"),
+        }
+    }
+
+
+class TestBayesBlackBox:
+    def setup_class(self):
+        equilibrium = load_default_objects("st40", "equilibrium")
+        self.prior_manager = PriorManager(
+            basic_prior_info={
+                "electron_temperature.y0": ["get_uniform", 1.0e3, 1.0e4],
+                "electron_density.y0": ["get_uniform", 1.0e19, 1.0e20],
+            },
+            cond_prior_info={},
+        )
+
+        self.calls: dict = {}
+        self.blackboxes = {}
+        for n_samples in [None, N_SAMPLES]:
+            plasma = example_plasma(n_samples=n_samples)
+            plasma.set_equilibrium(equilibrium)
+            plasma.time_to_calculate = plasma.t.values[3]
+            profilers = initialise_gauss_profilers(
+                plasma.rhop, ["electron_temperature", "electron_density"]
+            )
+            plasma_profiler = PlasmaProfiler(
+                plasma=plasma,
+                profilers=profilers,
+                plasma_attribute_names=["electron_temperature", "zeff"],
+            )
+
+            te = plasma.electron_temperature * 1.1
+            zeff = plasma.zeff.sum("element") * 1.1
+            if n_samples is not None:
+                te, zeff = te.isel(sample=0), zeff.isel(sample=0)
+            opt_data = {
+                "model.te": te.assign_coords(error=te * 0.1 + 10.0),
+                "model.zeff": zeff.assign_coords(error=zeff * 0.1),
+            }
+
+            self.calls[n_samples] = []
+            self.blackboxes[n_samples] = BayesBlackBox(
+                opt_data=opt_data,
+                quant_to_optimise=list(opt_data.keys()),
+                ln_prior=self.prior_manager.ln_prior,
+                build_bckc=partial(build_bckc, plasma, self.calls[n_samples]),
+                plasma_profiler=plasma_profiler,
+            )
+
+        # Two batches of N_SAMPLES, the second padded, with one parameter set
+        # outside the priors
+        self.parameters = [
+            dict(zip(PARAM_NAMES, values))
+            for values in [
+                (2.0e3, 4.0e19),
+                (3.0e3, 5.0e19),
+                (2.0e4, 5.0e19),
+                (4.0e3, 3.0e19),
+                (5.0e3, 6.0e19),
+            ]
+        ]
+
+    def test_vectorized_posterior_equals_single_evaluation(self):
+        blackbox = self.blackboxes[None]
+        blackbox_vectorized = self.blackboxes[N_SAMPLES]
+        self.calls[N_SAMPLES].clear()
+
+        results = blackbox_vectorized.ln_posterior_vectorized(self.parameters)
+
+        assert len(results) == len(self.parameters)
+        for parameters, (ln_posterior, blob) in zip(self.parameters, results):
+            _ln_posterior, _blob = blackbox.ln_posterior(parameters)
+            np.testing.assert_allclose(ln_posterior, _ln_posterior, rtol=1e-8)
+            assert blob.keys() == _blob.keys()
+            for key in blob:
+                np.testing.assert_allclose(blob[key], _blob[key], rtol=1e-8)
+        assert results[2] == (-1e4, {})
+
+        # Models are not called with parameters outside the priors
+        assert len(self.calls[N_SAMPLES]) == 2
+        for kwargs in self.calls[N_SAMPLES]:
+            assert np.all(kwargs["electron_temperature"]["y0"] <= 1.0e4)
+
+        blobs = blackbox_vectorized.format_blobs([blob for _, blob in results if blob])
+        assert blobs["model.te"].dims == ("sample_idx", "rhop")
+        assert blobs["model.te"].sample_idx.size == 4
+
+    def test_vectorized_wrappers(self):
+        blackbox = self.blackboxes[None]
+        blackbox_vectorized = self.blackboxes[N_SAMPLES]
+        points = np.array([list(parameters.values()) for parameters in self.parameters])
+
+        results = emcee_wrapper_vectorized(
+            points,
+            dims=PARAM_NAMES,
+            blackbox=blackbox_vectorized.ln_posterior_vectorized,
+        )
+        expected = [blackbox.ln_posterior(parameters) for parameters in self.parameters]
+        np.testing.assert_allclose(
+            [ln_posterior for ln_posterior, _ in results],
+            [ln_posterior for ln_posterior, _ in expected],
+            rtol=1e-8,
+        )
+
+        cost = bo_wrapper_vectorized(
+            points,
+            dims=PARAM_NAMES,
+            blackbox=blackbox_vectorized.ln_posterior_vectorized,
+        )
+        _cost = [
+            bo_wrapper(point, dims=PARAM_NAMES, blackbox=blackbox.ln_posterior)
+            for point in points
+        ]
+        np.testing.assert_allclose(cost, _cost, rtol=1e-8)
+
+        with pytest.raises(ValueError):
+            emcee_wrapper_vectorized(
+                points, blackbox=blackbox_vectorized.ln_posterior_vectorized
+            )
+
+    def test_sample_best_half_vectorized(self):
+        best_points = {}
+        for vectorize, wrapper, blackbox in [
+            (False, bo_wrapper, self.blackboxes[None].ln_posterior),
+            (
+                True,
+                bo_wrapper_vectorized,
+                self.blackboxes[N_SAMPLES].ln_posterior_vectorized,
+            ),
+        ]:
+            np.random.seed(0)
+            best_points[vectorize] = sample_best_half(
+                PARAM_NAMES,
+                self.prior_manager.priors,
+                partial(wrapper, dims=PARAM_NAMES, blackbox=blackbox),
+                size=N_SAMPLES,
+                vectorize=vectorize,
+            )
+        np.testing.assert_array_equal(best_points[True], best_points[False])
+
+    def test_emcee_optimiser_vectorized(self):
+        np.random.seed(0)
+        blackbox = self.blackboxes[N_SAMPLES]
+        optimiser = EmceeOptimiser(
+            EmceeSettings(
+                param_names=PARAM_NAMES, iterations=5, nwalkers=8, vectorize=True
+            ),
+            prior_manager=self.prior_manager,
+        )
+        optimiser.init_optimiser(
+            blackbox.ln_posterior_vectorized, blob_formatter=blackbox.format_blobs
+        )
+        optimiser.sample_start_points()
+        optimiser.run()
+        results = optimiser.post_process_results()
+
+        assert optimiser.optimiser.iteration == 5
+        assert results["blobs"]["model.te"].dims == ("sample_idx", "rhop")
+
+    def test_bo_optimiser_vectorized(self):
+        np.random.seed(0)
+        blackbox = self.blackboxes[N_SAMPLES]
+        optimiser = BOOptimiser(
+            BOSettings(
+                param_names=PARAM_NAMES,
+                n_calls=4,
+                n_initial_points=3,
+                boundary_samples=100,
+                model_samples=4,
+                posterior_samples=100,
+                vectorize=True,
+            ),
+            prior_manager=self.prior_manager,
+        )
+        optimiser.init_optimiser(
+            blackbox.ln_posterior_vectorized, blob_formatter=blackbox.format_blobs
+        )
+        optimiser.sample_start_points()
+        optimiser.run()
+        results = optimiser.post_process_results()
+
+        assert len(optimiser.result.func_vals) == 4
+        # Posterior samples outside the priors return empty blobs
+        assert results["blobs"]["model.te"].dims == ("sample_idx", "rhop")
+        assert results["blobs"]["model.te"].sample_idx.size <= 4
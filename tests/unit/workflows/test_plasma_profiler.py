@@ -1,7 +1,9 @@
+import numpy as np
 import pytest
 
 from indica import PlasmaProfiler
 from indica.defaults.load_defaults import load_default_objects
+from indica.examples.example_plasma import example_plasma
 from indica.profilers.profiler_gauss import initialise_gauss_profilers
 
 
@@ -35,10 +37,37 @@ class TestPlasmaProfiler:
         self.plasma_profiler({"impurity_density:ar.y0": 1.02e19})
         assert all(self.plasma.impurity_density.sel(element="ar", rhop=0) == 1.02e19)
 
+    def test_dependent_quantities_updated(self):
+        generation = self.plasma._generations["electron_density"]
+        zeff = self.plasma.zeff.copy()
+        assert self.plasma.zeff is self.plasma.zeff
+
+        self.plasma_profiler({"electron_density.y0": 1.02e19})
+        assert self.plasma._generations["electron_density"] > generation
+        assert not self.plasma.zeff.equals(zeff)
+
+    def test_hash_check_detects_in_place_changes(self):
+        self.plasma.hash_check = True
+        meanz = self.plasma.meanz.copy()
+        self.plasma.electron_temperature.loc[dict(t=self.plasma.t[0])] *= 2.0
+        with pytest.warns(UserWarning):
+            assert not self.plasma.meanz.equals(meanz)
+
     def test_change_plasma_profiles_outside_time_range_fails(self):
         with pytest.raises(KeyError):
             self.plasma_profiler({"electron_density.y0": 1.02e19}, t=10)
 
+    def test_change_ensemble_plasma_profiles(self):
+        plasma = example_plasma(n_samples=3)
+        plasma.set_equilibrium(load_default_objects("st40", "equilibrium"))
+        plasma_profiler = PlasmaProfiler(plasma=plasma, profilers=self.profilers)
+
+        y0 = np.array([1.01e19, 1.02e19, 1.03e19])
+        plasma_profiler({"electron_density.y0": y0}, t=plasma.t[0])
+        np.testing.assert_array_equal(
+            plasma.electron_density.sel(t=plasma.t[0], rhop=0), y0
+        )
+
 
 if __name__ == "__main__":
     test = TestPlasmaProfiler()